@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from pysiral.catalog import get_product_catalog
 from pysiral.config import (ConfigInfo, DefaultCommandLineArguments,
                             TimeRangeRequest)
 from pysiral.errorhandler import ErrorStatus
@@ -48,7 +49,8 @@ def pysiral_l2preproc():
 
     # Prepare DataHandler
     # The l2 pre-processor requires l2i input files
-    l2i_handler = L2iDataHandler(args.l2i_product_dir)
+    l2i_handler = L2iDataHandler(args.l2i_product_dir,
+                                 catalog=get_product_catalog())
 
     # Get list of days for processing
     # start and/or stop can be ommitted. In this case fall back to the
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from pysiral.catalog import get_product_catalog
 from pysiral.config import (ConfigInfo, DefaultCommandLineArguments,
                             TimeRangeRequest)
 from pysiral.errorhandler import ErrorStatus
@@ -62,9 +63,10 @@ def pysiral_l2proc_time_range_job(args):
 
     # Prepare DataHandler
     l1b_data_handler = DefaultL1bDataHandler(mission_id, hemisphere,
-                                             version=args.l1b_version)
+                                             version=args.l1b_version,
+                                             catalog=get_product_catalog())
     # Processor Initialization
-    l2proc = Level2Processor(product_def)
+    l2proc = Level2Processor(product_def, workers=args.workers)
 
 #    # Loop over iterations (one per month)
     for time_range in job.iterations:
@@ -105,7 +107,7 @@ def pysiral_l2proc_l1b_predef_job(args):
             args.l2_output, overwrite_protection=args.overwrite_protection)
 
     # Processor Initialization
-    l2proc = Level2Processor(product_def)
+    l2proc = Level2Processor(product_def, workers=args.workers)
     l2proc.process_l1b_files(args.l1b_predef_files)
 
     # All done
@@ -181,7 +183,8 @@ class Level2ProcArgParser(DefaultLoggingClass):
             ("--no-overwrite-protection", "no-overwrite-protection",
              "overwrite_protection", False),
             ("--overwrite-protection", "overwrite-protection",
-             "overwrite_protection", False)]
+             "overwrite_protection", False),
+            ("--workers", "workers", "workers", False)]
 
         # create the parser
         parser = argparse.ArgumentParser()
@@ -237,6 +240,10 @@ class Level2ProcArgParser(DefaultLoggingClass):
         run_tag = re.split(r'[\\|/]', run_tag)
         return run_tag
 
+    @property
+    def workers(self):
+        return self._args.workers
+
     @property
     def exclude_month(self):
         return self._args.exclude_month
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from pysiral.catalog import get_product_catalog
 from pysiral.config import (ConfigInfo, DefaultCommandLineArguments,
                             TimeRangeRequest)
 from pysiral.datahandler import L2iDataHandler
@@ -32,7 +33,8 @@ def pysiral_l3proc():
     grid = Level3GridDefinition(args.l3_griddef)
 
     # Initialize the interface to the l2i products
-    l2i_handler = L2iDataHandler(args.l2i_product_directory)
+    l2i_handler = L2iDataHandler(args.l2i_product_directory,
+                                 catalog=get_product_catalog())
 
     # Initialize the output handler
     # Currently the overwrite protection is disabled per default
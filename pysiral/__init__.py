@@ -2,7 +2,7 @@
 
 """ """
 
-__all__ = ["bnfunc", "cryosat2", "envisat", "ers", "esa", "icesat", "sentinel3", "auxdata", "classifier", "clocks",
+__all__ = ["bnfunc", "cryosat2", "envisat", "ers", "esa", "icesat", "sentinel3", "auxdata", "catalog", "classifier", "clocks",
            "config", "datahandler", "errorhandler", "filter", "flag", "frb", "grid", "io_adapter",
            "iotools", "l1bdata", "l1bpreproc", "l2data", "l2preproc", "l2proc", "l3proc", "legacy",
            "logging", "maptools", "mask", "mss", "orbit", "output", "path", "proj", "retracker", "roi",
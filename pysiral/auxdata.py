@@ -7,11 +7,13 @@ Created on Fri May 19 14:42:35 2017
 
 import os
 import re
+from collections import OrderedDict
 
 import numpy as np
 
 import scipy.ndimage as ndimage
 from pyproj import Proj
+from treedict import TreeDict
 
 from pysiral.config import options_from_dictionary
 from pysiral.errorhandler import ErrorStatus
@@ -50,9 +52,13 @@ class AuxdataBaseClass(object):
         # currently loaded product is designated as current_date  This date is compared to the
         # requested date and if a new product is loaded upon mismatch of current & requested data
         # NOTE: This will be bypassed by static auxiliary data classes
-        # TODO: Load all auxiliary products for processing period in memory (allow parallel processing)
+        # Previously loaded products are kept in the shared auxdata cache (see AuxdataCache)
         self._current_date = [0, 0, 0]
         self._requested_date = [-1, -1, -1]
+        self._current_cache_key = None
+
+        # Hemisphere of the requested product (part of the cache key)
+        self.hemisphere_code = None
 
         # A dictionary with the output variables of the auxiliary data set
         self._auxvars = {}
@@ -91,22 +97,55 @@ class AuxdataBaseClass(object):
 
     def set_requested_date_from_l2(self, l2):
         """ Convenience method, Use first timestamp as reference, date changes are ignored """
-        year = l2.track.timestamp[0].year
-        month = l2.track.timestamp[0].month
-        day = l2.track.timestamp[0].day
+        year = l2.track.start_datetime.year
+        month = l2.track.start_datetime.month
+        day = l2.track.start_datetime.day
         self.set_requested_date(year, month, day)
 
     def update_external_data(self):
         """ This method will check if the requested date matches current data
-        and call the subclass data loader method if not """
-        # Check if data for day is already loaded
-        if self._requested_date != self._current_date:
-            # NOTE: The implementation of this method needs to be in the subclass
-            self.load_requested_auxdata()
-            self._current_date = self._requested_date
-            self._msg = self.__class__.__name__ + ": Load "+self.requested_filepath
-        else:
+        and call the subclass data loader method if not (and if the data is
+        not in the shared auxdata cache) """
+        path = self.requested_filepath
+        cache_key = self.get_cache_key(path)
+        if self.set_data_from_cache(cache_key):
+            return
+        # NOTE: The implementation of this method needs to be in the subclass
+        self.load_requested_auxdata()
+        self._msg = self.__class__.__name__ + ": Load "+path
+        self.add_data_to_cache(cache_key)
+
+    def set_data_from_cache(self, cache_key):
+        """ Sets the data for the requested date from the current product or
+        the shared auxdata cache. Returns False if the data needs to be
+        loaded """
+        if cache_key == self._current_cache_key:
             self._msg = self.__class__.__name__+": Data already present"
+            return True
+        data = AUXDATA_CACHE.get(cache_key)
+        if data is None:
+            return False
+        self._data = data
+        self._msg = self.__class__.__name__+": Data from cache"
+        self._current_date = self._requested_date
+        self._current_cache_key = cache_key
+        return True
+
+    def add_data_to_cache(self, cache_key):
+        """ Adds the loaded data to the shared auxdata cache (only if the
+        data could be loaded) """
+        if self.error.status:
+            return
+        AUXDATA_CACHE.add(cache_key, self._data)
+        self._current_date = self._requested_date
+        self._current_cache_key = cache_key
+
+    def get_cache_key(self, product):
+        """ Returns the key of the requested data in the shared auxdata
+        cache (class, product, hemisphere). The product is the file path
+        for the requested date, products that do not change daily
+        (e.g. monthly climatologies) are only cached once """
+        return (self.pyclass, product, self.hemisphere_code)
 
     def initialize(self, *args, **kwargs):
         """ Initialize before Level-2 processing """
@@ -208,22 +247,15 @@ class GridTrackInterpol(object):
         self._get_track_image_coordinates()
 
     def _set_projection(self):
-        self.p = Proj(**self.griddef.projection)
+        # Projection and grid origin only depend on the grid (cached)
+        self.geometry = get_grid_geometry(
+            self.grid_lons, self.grid_lats, self.griddef)
+        self.p = self.geometry.p
 
     def _get_track_image_coordinates(self):
         """ Computes the image coordinates that will be used for the m"""
-
-        # Convert track coordinates to grid projection coordinates
-        tr_x, tr_y = self.p(self.lons, self.lats)
-
-        # Convert grid coordinates to grid projection coordinates
-        x, y = self.p(self.grid_lons, self.grid_lats)
-
-        # Convert track projection coordinates to image coordinates
-        # x: 0 < n_lines; y: 0 < n_cols
-        dim = self.griddef.dimension
-        x_min, y_min = np.nanmin(x), np.nanmin(y)
-        self.ix, self.iy = (tr_x-x_min)/dim.dx, (tr_y-y_min)/dim.dy
+        self.ix, self.iy = self.geometry.get_image_coordinates(
+            self.lons, self.lats)
 
     def get_from_grid_variable(self, gridvar, order=0, flipud=False):
         """ Returns a along-track data from a grid variable"""
@@ -237,3 +269,205 @@ class GridTrackInterpol(object):
         # track_var = self.get_from_grid_variable(*args, **kwargs)
 
 
+class GridGeometry(object):
+    """ Projection and image coordinate origin of an auxiliary data grid.
+    Use get_grid_geometry() to get a cached instance, the full grid is
+    only projected once per grid. The origin is either the minimum of the
+    projection coordinates of the grid (default) or the projection
+    coordinates of a single grid cell (origin_cell), shifted by
+    origin_offset grid cells (e.g. 0.5 for the corner of a grid cell) """
+
+    def __init__(self, grid_lons, grid_lats, griddef, origin_cell=None,
+                 origin_offset=0.0):
+        self.griddef = griddef
+        self.p = Proj(**griddef.projection)
+        self.dx = griddef.dimension.dx
+        self.dy = griddef.dimension.dy
+        if origin_cell is None:
+            # Convert grid coordinates to grid projection coordinates
+            x, y = self.p(grid_lons, grid_lats)
+            x_min, y_min = np.nanmin(x), np.nanmin(y)
+        else:
+            # Only the origin grid cell needs to be projected
+            x_min, y_min = self.p(np.ma.getdata(grid_lons)[origin_cell],
+                                  np.ma.getdata(grid_lats)[origin_cell])
+        self.x_min = x_min - origin_offset*self.dx
+        self.y_min = y_min - origin_offset*self.dy
+
+    def get_image_coordinates(self, lons, lats):
+        """ Converts track coordinates to image coordinates
+        (x: 0 < n_lines; y: 0 < n_cols). Only the track is projected """
+        tr_x, tr_y = self.p(lons, lats)
+        return (tr_x-self.x_min)/self.dx, (tr_y-self.y_min)/self.dy
+
+    def get_track_values(self, gridvar, lons, lats, order=0, flipud=False):
+        """ Returns along-track data from a grid variable """
+        ix, iy = self.get_image_coordinates(lons, lats)
+        if flipud:
+            gridvar = np.flipud(gridvar)
+        return ndimage.map_coordinates(gridvar, [iy, ix], order=order)
+
+
+def get_grid_geometry(grid_lons, grid_lats, griddef, origin_cell=None,
+                      origin_offset=0.0):
+    """ Returns the (cached) GridGeometry of an auxiliary data grid """
+    key = get_grid_geometry_key(grid_lons, grid_lats, griddef)
+    if origin_cell is not None:
+        origin_cell = tuple(origin_cell)
+    key += (origin_cell, origin_offset)
+    geometry = GRID_GEOMETRY_CACHE.get(key)
+    if geometry is None:
+        geometry = GridGeometry(grid_lons, grid_lats, griddef,
+                                origin_cell=origin_cell,
+                                origin_offset=origin_offset)
+        GRID_GEOMETRY_CACHE.add(key, geometry)
+    return geometry
+
+
+def get_grid_geometry_key(grid_lons, grid_lats, griddef):
+    """ Hashable identifier of a grid: projection and dimension of the grid
+    definition, shape of the grid and the coordinates of the grid corners
+    (different grids with the same definition are not mixed up). Invalid
+    (NaN or masked) corner coordinates are replaced by a fixed value """
+    grid_lons, grid_lats = np.ma.asarray(grid_lons), np.ma.asarray(grid_lats)
+    projection = griddef.projection
+    projection_key = tuple(sorted(
+        (name, str(projection[name])) for name in projection.keys()))
+    dimension_key = (griddef.dimension.dx, griddef.dimension.dy)
+    if grid_lons.ndim == 2:
+        corners = ([0, 0, -1, -1], [0, -1, 0, -1])
+    else:
+        corners = ([0, -1], )
+    corner_values = []
+    for grid_coords in [grid_lons, grid_lats]:
+        values = np.ma.filled(grid_coords[corners].astype(np.float64), np.nan)
+        values[~np.isfinite(values)] = GRID_CORNER_INVALID
+        corner_values.extend(values.tolist())
+    return (projection_key, dimension_key, grid_lons.shape,
+            tuple(corner_values))
+
+
+class AuxdataCache(object):
+    """ Least recently used (LRU) cache of decoded auxiliary data products
+    (e.g. daily sea ice concentration grids). The cache is shared by all
+    auxdata handlers (see AUXDATA_CACHE), the size of the cache is bounded
+    by the memory of the numpy arrays of the cached data objects and
+    (optional) by the number of items """
+
+    def __init__(self, enabled=True, max_size_mb=2048., max_items=None):
+        self.enabled = enabled
+        self.max_size_mb = max_size_mb
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._nbytes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, enabled=None, max_size_mb=None):
+        """ Change the cache settings (from the `cache` branch of
+        auxdata_def.yaml). Items that do not fit anymore are removed """
+        if enabled is not None:
+            self.enabled = enabled
+        if max_size_mb is not None:
+            self.max_size_mb = max_size_mb
+        if not self.enabled:
+            self.clear()
+        self._remove_least_recently_used()
+
+    def get(self, key):
+        """ Returns the cached data object (None if not in cache) """
+        if key not in self._items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = self._items.pop(key)
+        self._items[key] = data
+        return data
+
+    def add(self, key, data):
+        """ Adds a data object to the cache. Objects larger than the cache
+        size are not cached """
+        if not self.enabled or data is None:
+            return
+        self.remove(key)
+        nbytes = get_object_nbytes(data)
+        if nbytes > self.max_size_bytes:
+            return
+        self._items[key] = data
+        self._nbytes[key] = nbytes
+        self._remove_least_recently_used()
+
+    def remove(self, key):
+        if key in self._items:
+            del self._items[key]
+            del self._nbytes[key]
+
+    def clear(self):
+        self._items.clear()
+        self._nbytes.clear()
+
+    def reset_counters(self):
+        self.hits, self.misses = 0, 0
+
+    def _remove_least_recently_used(self):
+        while self._items and self.nbytes > self.max_size_bytes:
+            self.remove(next(iter(self._items)))
+        if self.max_items is not None:
+            while len(self._items) > self.max_items:
+                self.remove(next(iter(self._items)))
+
+    @property
+    def n_items(self):
+        return len(self._items)
+
+    @property
+    def nbytes(self):
+        return sum(self._nbytes.values())
+
+    @property
+    def max_size_bytes(self):
+        return self.max_size_mb * 1024. * 1024.
+
+    @property
+    def counters(self):
+        return self.hits, self.misses
+
+    @property
+    def summary(self):
+        return "%g hits, %g misses, %g items (%.1f MB)" % (
+            self.hits, self.misses, self.n_items, self.nbytes/1024./1024.)
+
+
+def get_object_nbytes(data, _visited=None):
+    """ Memory estimate of a data object: sum of the size of all numpy
+    arrays in the data object, including arrays in lists, dictionaries,
+    TreeDicts and the attributes of (nested) objects. Each object is only
+    counted once """
+    if _visited is None:
+        _visited = set()
+    if id(data) in _visited:
+        return 0
+    _visited.add(id(data))
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, TreeDict):
+        values = data.values()
+    elif isinstance(data, dict):
+        values = data.values()
+    elif isinstance(data, (list, tuple)):
+        values = data
+    elif hasattr(data, "__dict__"):
+        values = data.__dict__.values()
+    else:
+        return 0
+    return sum(get_object_nbytes(value, _visited) for value in values)
+
+
+# Decoded auxiliary data products of all auxdata handlers
+AUXDATA_CACHE = AuxdataCache()
+
+# Grid geometries by grid definition, grid shape & grid corner coordinates
+GRID_GEOMETRY_CACHE = AuxdataCache(max_items=32)
+
+# Grid corner coordinate in the grid geometry key for NaN or masked values
+GRID_CORNER_INVALID = -999.
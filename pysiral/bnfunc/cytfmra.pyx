@@ -13,6 +13,9 @@ import bottleneck as bn
 
 cimport cython
 cimport numpy as np
+from cython.parallel cimport parallel, prange
+from libc.math cimport INFINITY, isfinite, isnan
+from libc.stdlib cimport free, malloc
 # cimport bottleneck as bn
 
 DTYPE = np.float64
@@ -101,3 +104,175 @@ def cytfmra_normalize_wfm(np.ndarray[DTYPE_t, ndim=1] y):
     cdef double norm = bn.nanmax(y)
     cdef np.ndarray[DTYPE_t, ndim=1] normed_y = y/norm
     return normed_y, norm
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+def cytfmra_retrack(double[:, ::1] rng, double[:, ::1] wfm,
+                    signed char[::1] radar_mode, double[::1] threshold,
+                    int oversampling, int[::1] window_size,
+                    double[::1] first_maximum_normalized_threshold,
+                    bint last_crossing=False, int num_threads=1):
+    """
+    Whole orbit TFMRA kernel: Retracks all waveforms in one call without
+    per-record python objects (the records are processed in parallel
+    with OpenMP if the extension has been compiled with OpenMP support).
+
+    :param rng: range of the waveform bins (n_records, n_range_bins)
+    :param wfm: echo power waveforms (n_records, n_range_bins)
+    :param radar_mode: radar mode flag for each record
+    :param threshold: TFMRA threshold for each record
+    :param oversampling: waveform oversampling factor
+    :param window_size: smoothing window size for each radar mode
+    :param first_maximum_normalized_threshold: minimum normalized power
+        of the first maximum above the noise level for each radar mode
+    :param last_crossing: retrack at the start of the last contiguous
+        segment above the threshold before the first maximum instead of
+        the first threshold crossing
+    :param num_threads: number of OpenMP threads
+    :return: tfmra_range, tfmra_power (NaN if retracking failed)
+    """
+
+    cdef Py_ssize_t n_records = wfm.shape[0]
+    cdef Py_ssize_t n_os = wfm.shape[1] * oversampling
+    cdef Py_ssize_t i
+    cdef int mode
+    cdef double *wfm_os
+    cdef double *wfm_filt
+
+    tfmra_range = np.full(n_records, np.nan)
+    tfmra_power = np.full(n_records, np.nan)
+    cdef double[::1] range_view = tfmra_range
+    cdef double[::1] power_view = tfmra_power
+
+    with nogil, parallel(num_threads=num_threads):
+
+        # Scratch buffers for oversampled and filtered waveforms (per thread)
+        wfm_os = <double *> malloc(n_os * sizeof(double))
+        wfm_filt = <double *> malloc(n_os * sizeof(double))
+
+        for i in prange(n_records, schedule="static"):
+            if wfm_os == NULL or wfm_filt == NULL:
+                continue
+            mode = radar_mode[i]
+            _tfmra_retrack_record(
+                rng, wfm, i, threshold[i], oversampling, window_size[mode],
+                first_maximum_normalized_threshold[mode], last_crossing,
+                wfm_os, wfm_filt, &range_view[i], &power_view[i])
+
+        free(wfm_os)
+        free(wfm_filt)
+
+    return tfmra_range, tfmra_power
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef int _tfmra_retrack_record(double[:, ::1] rng, double[:, ::1] wfm,
+                               Py_ssize_t i, double threshold,
+                               int oversampling, int window_size,
+                               double fmnt, bint last_crossing,
+                               double *wfm_os, double *wfm_filt,
+                               double *tfmra_range,
+                               double *tfmra_power) nogil:
+    """ TFMRA retracking of a single record (returns -1 on failure) """
+
+    cdef Py_ssize_t n = rng.shape[1]
+    cdef Py_ssize_t n_os = n * oversampling
+    cdef Py_ssize_t j, k, lo, amax, fmi, i0, i1, n_noise, n_norm
+    cdef Py_ssize_t right = (window_size - 1) / 2
+    cdef Py_ssize_t left = window_size - 1 - right
+    cdef double x0 = rng[i, 0]
+    cdef double x1 = rng[i, n-1]
+    cdef double step, x, slope, total, norm, noise, power, r0, r1, gradient
+
+    # Oversampling: linear interpolation on equidistant range grid
+    # between first and last range bin
+    if not isfinite(x0) or not isfinite(x1) or x1 <= x0:
+        return -1
+    step = (x1 - x0) / <double> (n_os - 1)
+    lo = 0
+    slope = (wfm[i, 1] - wfm[i, 0]) / (rng[i, 1] - rng[i, 0])
+    for k in range(n_os):
+        x = <double> k * step + x0 if k < n_os - 1 else x1
+        if lo < n - 2 and rng[i, lo+1] < x:
+            while lo < n - 2 and rng[i, lo+1] < x:
+                lo += 1
+            slope = (wfm[i, lo+1] - wfm[i, lo]) / (rng[i, lo+1] - rng[i, lo])
+        wfm_os[k] = slope * (x - rng[i, lo]) + wfm[i, lo]
+
+    # Boxcar smoothing (zero padding) with running sum and
+    # search of the absolute maximum
+    amax = -1
+    norm = -INFINITY
+    total = 0.0
+    for k in range(min(right + 1, n_os)):
+        total += wfm_os[k]
+    for k in range(n_os):
+        wfm_filt[k] = total * (1.0 / <double> window_size)
+        if wfm_filt[k] > norm:
+            norm = wfm_filt[k]
+            amax = k
+        if k + right + 1 < n_os:
+            total += wfm_os[k + right + 1]
+        if k - left >= 0:
+            total -= wfm_os[k - left]
+    if amax <= 0:
+        return -1
+
+    # Normalization (only the part of the waveform that is used below)
+    n_norm = max(amax + 1, min(5 * oversampling, n_os))
+    for k in range(n_norm):
+        wfm_filt[k] = wfm_filt[k] / norm
+    if n_norm < n_os:
+        wfm_filt[n_os - 1] = wfm_filt[n_os - 1] / norm
+
+    # Noise level in normalized units
+    noise = 0.0
+    n_noise = 0
+    for k in range(min(5 * oversampling, n_os)):
+        if not isnan(wfm_filt[k]):
+            noise += wfm_filt[k]
+            n_noise += 1
+    if n_noise > 0:
+        noise = noise / <double> n_noise
+
+    # First maximum: first local maximum before the absolute maximum
+    # above noise level + threshold (absolute maximum if none)
+    fmi = amax
+    for j in range(amax):
+        if j > 0 and not wfm_filt[j] > wfm_filt[j-1]:
+            continue
+        if j < amax - 1 and not wfm_filt[j] > wfm_filt[j+1]:
+            continue
+        if wfm_filt[j] >= fmnt + noise:
+            fmi = j
+            break
+
+    # Threshold crossing before the first maximum
+    power = threshold * wfm_filt[fmi]
+    i1 = -1
+    for j in range(fmi):
+        if wfm_filt[j] > power:
+            if not last_crossing:
+                i1 = j
+                break
+            if j == 0 or not wfm_filt[j-1] > power:
+                i1 = j
+    if i1 < 0:
+        return -1
+
+    # Linear interpolation of the range at the threshold power
+    # (i0 = -1 refers to the last bin as in the python implementation)
+    i0 = i1 - 1 if i1 > 0 else n_os - 1
+    r0 = <double> i0 * step + x0 if i0 < n_os - 1 else x1
+    r1 = <double> i1 * step + x0
+    gradient = (wfm_filt[i1] - wfm_filt[i0]) / (r1 - r0)
+    tfmra_range[0] = (power - wfm_filt[i0]) / gradient + r0
+    tfmra_power[0] = power * norm
+
+    return 0
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Local catalogue of pysiral product files (l1bdata, l2i, l2p)
+
+The catalogue is a SQLite file with the filename attributes (data level,
+mission, hemisphere, version, start & stop time) of all netCDF files below
+the product directories. The index is updated incrementally: a directory is
+only listed again if its modification time has changed since the last
+update, otherwise the known subdirectories are visited from the catalogue.
+
+The catalogue is optional and enabled with the `product_catalog` entry
+(filename of the SQLite file) in `local_machine_def.yaml`.
+"""
+
+from pysiral.config import ConfigInfo
+from pysiral.errorhandler import ErrorStatus
+from pysiral.logging import DefaultLoggingClass
+from pysiral.output import PysiralOutputFilenaming
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import sqlite3
+import time
+import os
+import re
+
+
+ProductFile = namedtuple("ProductFile", ["path", "directory", "data_level",
+                                         "mission_id", "hemisphere",
+                                         "version", "start", "stop"])
+
+
+def get_product_catalog(config=None):
+    """ Returns the product catalogue defined in local_machine_def.yaml
+    or None if no catalogue is configured """
+    if config is None or not isinstance(config, ConfigInfo):
+        config = ConfigInfo()
+    filename = config.local_machine.get("product_catalog", None)
+    if filename is None or filename == "":
+        return None
+    return ProductCatalog(os.path.expanduser(filename),
+                          mission_ids=config.mission_ids)
+
+
+class ProductCatalog(DefaultLoggingClass):
+    """ SQLite index of pysiral product files """
+
+    # Directories modified within this number of seconds before the
+    # update are listed again with the next update (mtime resolution)
+    MTIME_TOLERANCE = 2.0
+
+    # start & stop time are stored as microseconds since this epoch
+    EPOCH = datetime(1970, 1, 1)
+
+    # Hemisphere codes in product filenames without registered filenaming
+    HEMISPHERE_CODES = {"nh": "north", "sh": "south",
+                        "north": "north", "south": "south"}
+
+    def __init__(self, filename, mission_ids=None, timeout=60.):
+        super(ProductCatalog, self).__init__(self.__class__.__name__)
+        self.error = ErrorStatus(caller_id=self.__class__.__name__)
+        self._filename = filename
+        if mission_ids is None:
+            mission_ids = ConfigInfo().mission_ids
+        self._mission_ids = list(mission_ids)
+        self._updated_roots = set()
+        self._max_duration = {}
+        catalog_dir = os.path.dirname(os.path.abspath(filename))
+        if not os.path.isdir(catalog_dir):
+            os.makedirs(catalog_dir)
+        self._connection = sqlite3.connect(filename, timeout=timeout)
+        self._create_tables()
+
+    def close(self):
+        self._connection.close()
+
+    def update(self, root):
+        """ Updates the catalogue for all files below a root directory,
+        returns the number of directories that have been listed """
+        root = self._normpath(root)
+        n_listed = 0
+        with self._connection:
+            directories = [root]
+            while len(directories) > 0:
+                directory = directories.pop()
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    self._remove_directory(directory)
+                    continue
+                if mtime == self._get_directory_mtime(directory):
+                    directories.extend(self._get_subdirectories(directory))
+                    continue
+                directories.extend(self._update_directory(directory, mtime))
+                n_listed += 1
+        self._updated_roots.add(root)
+        self._max_duration = {}
+        return n_listed
+
+    def get_products(self, data_level, root=None, directory=None,
+                     mission_id=None, hemisphere=None, version=None,
+                     start=None, stop=None, refresh=False):
+        """ Returns a list of ProductFile entries (sorted by path).
+        The catalogue is updated for `root` once per catalogue instance
+        (or always with refresh=True). start & stop select all products
+        with overlapping time coverage """
+        conditions, args = ["data_level = ?"], [data_level]
+        if root is not None:
+            root = self._normpath(root)
+            if refresh or root not in self._updated_roots:
+                self.update(root)
+            conditions.append(
+                "(directory = ? OR substr(directory, 1, ?) = ?)")
+            args.extend([root, len(root)+1, root+os.sep])
+        if directory is not None:
+            conditions.append("directory = ?")
+            args.append(self._normpath(directory))
+        for column, value in [("mission_id", mission_id),
+                              ("hemisphere", hemisphere),
+                              ("version", version)]:
+            if value is not None:
+                conditions.append("%s = ?" % column)
+                args.append(value)
+        # Overlap with start & stop. The additional lower bound for the
+        # product start time (from the longest product duration) limits
+        # the search to a range of the start time index
+        if stop is not None:
+            conditions.append("start <= ?")
+            args.append(self._to_microseconds(stop))
+        if start is not None:
+            conditions.extend(["stop >= ?", "start >= ?"])
+            start = self._to_microseconds(start)
+            args.extend([start, start-self._get_max_duration(data_level)])
+        sql = "SELECT * FROM products WHERE %s ORDER BY path"
+        rows = self._connection.execute(sql % " AND ".join(conditions), args)
+        return [self._get_product_file(row) for row in rows]
+
+    def get_files(self, data_level, **kwargs):
+        """ Same as get_products, but returns only the filenames """
+        return [product.path for product in
+                self.get_products(data_level, **kwargs)]
+
+    def get_directories(self, root, refresh=False):
+        """ Returns a sorted list of all directories below root """
+        root = self._normpath(root)
+        if refresh or root not in self._updated_roots:
+            self.update(root)
+        sql = "SELECT path FROM directories WHERE substr(path, 1, ?) = ? " + \
+            "ORDER BY path"
+        rows = self._connection.execute(sql, [len(root)+1, root+os.sep])
+        return [row[0] for row in rows]
+
+    def parse_filename(self, filename):
+        """ Returns a ProductFile entry from the filename or None if the
+        filename is not recognized """
+        basename = os.path.basename(filename)
+        if basename.startswith("l1bdata_") or basename.startswith("l2i_"):
+            filenaming = PysiralOutputFilenaming()
+            filenaming.parse_filename(basename)
+            if filenaming.data_level is None:
+                return None
+            return ProductFile(
+                filename, os.path.dirname(filename), filenaming.data_level,
+                filenaming.mission_id, filenaming.hemisphere,
+                filenaming.version, filenaming.start, filenaming.stop)
+        return self._parse_product_filename(filename)
+
+    def _parse_product_filename(self, filename):
+        """ Filename attributes of products with configurable filenaming
+        (e.g. l2p-awi-seaice-cryosat2-nh-20150301-v1.0.nc). The first
+        timestamp is the start time, the stop time is either the second
+        timestamp or the end of the day for daily files """
+        basename = os.path.basename(filename)
+        tokens = re.split(r"[-_]", os.path.splitext(basename)[0])
+        timestamps = re.findall(r"(?<!\d)(\d{8}(?:T\d{6})?)(?!\d)", basename)
+        if len(timestamps) == 0:
+            return None
+        if len(timestamps[0]) == 8:
+            start = datetime.strptime(timestamps[0], "%Y%m%d")
+            stop = start + timedelta(days=1, microseconds=-1)
+        else:
+            start = datetime.strptime(timestamps[0], "%Y%m%dT%H%M%S")
+            stop = start
+            if len(timestamps) > 1 and len(timestamps[1]) == 15:
+                stop = datetime.strptime(timestamps[1], "%Y%m%dT%H%M%S")
+        mission_ids = [t for t in tokens if t in self._mission_ids]
+        hemispheres = [self.HEMISPHERE_CODES[t] for t in tokens
+                       if t in self.HEMISPHERE_CODES]
+        return ProductFile(
+            filename, os.path.dirname(filename), tokens[0],
+            mission_ids[0] if len(mission_ids) > 0 else None,
+            hemispheres[0] if len(hemispheres) > 0 else None,
+            None, start, stop)
+
+    def _update_directory(self, directory, mtime):
+        """ Lists a directory, updates the product files and returns the
+        list of subdirectories """
+
+        # Get files and subdirectories
+        filenames, subdirectories = [], []
+        for entry in sorted(os.listdir(directory)):
+            path = os.path.join(directory, entry)
+            if entry.endswith(".nc"):
+                filenames.append(path)
+            elif os.path.isdir(path):
+                subdirectories.append(path)
+
+        # Add new and remove deleted product files
+        sql = "SELECT path FROM products WHERE directory = ?"
+        known_files = set(
+            row[0] for row in self._connection.execute(sql, [directory]))
+        for filename in known_files.difference(filenames):
+            sql = "DELETE FROM products WHERE path = ?"
+            self._connection.execute(sql, [filename])
+        for filename in set(filenames).difference(known_files):
+            product = self.parse_filename(filename)
+            if product is None:
+                self.log.debug("Unrecognized product file: %s" % filename)
+                continue
+            self._add_product(product)
+
+        # Remove deleted subdirectories
+        for subdirectory in set(self._get_subdirectories(directory)).\
+                difference(subdirectories):
+            self._remove_directory(subdirectory)
+
+        # Store the directory modification time. Recently modified
+        # directories will be listed again with the next update
+        if time.time() - mtime < self.MTIME_TOLERANCE:
+            mtime = -1.0
+        sql = "INSERT OR REPLACE INTO directories VALUES (?, ?, ?)"
+        self._connection.execute(
+            sql, [directory, os.path.dirname(directory), mtime])
+        return subdirectories
+
+    def _add_product(self, product):
+        values = list(product)
+        for i in [6, 7]:
+            values[i] = self._to_microseconds(values[i])
+        sql = "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        self._connection.execute(sql, values)
+
+    def _remove_directory(self, directory):
+        """ Removes a directory and all subdirectories and files """
+        for table, column in [("directories", "path"),
+                              ("products", "directory")]:
+            sql = "DELETE FROM %s WHERE %s = ? OR substr(%s, 1, ?) = ?"
+            self._connection.execute(
+                sql % (table, column, column),
+                [directory, len(directory)+1, directory+os.sep])
+
+    def _get_directory_mtime(self, directory):
+        sql = "SELECT mtime FROM directories WHERE path = ?"
+        row = self._connection.execute(sql, [directory]).fetchone()
+        return None if row is None else row[0]
+
+    def _get_subdirectories(self, directory):
+        sql = "SELECT path FROM directories WHERE parent = ?"
+        return [row[0] for row in
+                self._connection.execute(sql, [directory])]
+
+    def _get_max_duration(self, data_level):
+        """ Longest product duration in microseconds """
+        if data_level not in self._max_duration:
+            sql = "SELECT MAX(stop - start) FROM products " + \
+                "WHERE data_level = ?"
+            row = self._connection.execute(sql, [data_level]).fetchone()
+            self._max_duration[data_level] = row[0] or 0
+        return self._max_duration[data_level]
+
+    def _get_product_file(self, row):
+        values = list(row)
+        for i in [6, 7]:
+            values[i] = self.EPOCH + timedelta(microseconds=values[i])
+        return ProductFile(*values)
+
+    def _to_microseconds(self, dt):
+        delta = dt - self.EPOCH
+        return (delta.days*86400 + delta.seconds)*1000000 + \
+            delta.microseconds
+
+    def _create_tables(self):
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS directories (
+                    path TEXT PRIMARY KEY, parent TEXT, mtime REAL);
+                CREATE INDEX IF NOT EXISTS directories_parent
+                    ON directories (parent);
+                CREATE TABLE IF NOT EXISTS products (
+                    path TEXT PRIMARY KEY, directory TEXT, data_level TEXT,
+                    mission_id TEXT, hemisphere TEXT, version TEXT,
+                    start INTEGER, stop INTEGER);
+                CREATE INDEX IF NOT EXISTS products_start
+                    ON products (data_level, start);
+                CREATE INDEX IF NOT EXISTS products_directory
+                    ON products (directory);
+                """)
+
+    def _normpath(self, path):
+        return os.path.normpath(os.path.abspath(path))
+
+    @property
+    def filename(self):
+        return self._filename
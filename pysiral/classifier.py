@@ -29,13 +29,14 @@ class CS2OCOGParameter(BaseClassifier):
         self._calc_parameters(wfm_counts)
 
     def _calc_parameters(self, wfm_counts):
-        for i in np.arange(self._n):
-            y = wfm_counts[i, :].flatten().astype(np.float32)
-            y -= np.nanmean(y[0:11])  # Remove Noise
-            y[np.where(y < 0.0)[0]] = 0.0  # Set negative counts to zero
-            y2 = y**2.0
-            self._amplitude[i] = np.sqrt((y2**2.0).sum() / y2.sum())
-            self._width[i] = ((y2.sum())**2.0) / (y2**2.0).sum()
+        y = get_noise_corrected_counts(wfm_counts)
+        y2 = y**2.0
+        y2_sum = y2.sum(axis=1)
+        y4_sum = (y2**2.0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._amplitude[:] = np.sqrt(y4_sum / y2_sum)
+            # (squared sum in double precision as for numpy scalars)
+            self._width[:] = (y2_sum.astype(np.float64)**2.0) / y4_sum
 
     @property
     def amplitude(self):
@@ -66,23 +67,30 @@ class CS2PulsePeakiness(BaseClassifier):
         self._calc_parameters(wfm_counts)
 
     def _calc_parameters(self, wfm_counts):
-        for i in np.arange(self._n):
-            try:
-                y = wfm_counts[i, :].flatten().astype(np.float32)
-                y -= np.nanmean(y[0:11])  # Remove Noise
-                y[np.where(y < 0.0)[0]] = 0.0  # Set negative counts to zero
-                yp = np.nanmax(y)  # Waveform peak value
-                ypi = np.nanargmax(y)  # Waveform peak index
-                if ypi > 3*self._pad and ypi < self._n_range_bins-4*self._pad:
-                    self._peakiness_l[i] = yp/np.nanmean(
-                        y[ypi-3*self._pad:ypi-1*self._pad+1])*3.0
-                    self._peakiness_r[i] = yp/np.nanmean(y[
-                        ypi+1*self._pad:ypi+3*self._pad+1])*3.0
-                    self._peakiness[i] = yp/y.sum()*self._n_range_bins
-            except ValueError:
-                self._peakiness_l[i] = np.nan
-                self._peakiness_r[i] = np.nan
-                self._peakiness[i] = np.nan
+        y = get_noise_corrected_counts(wfm_counts)
+
+        # Waveform peak value and index (all-NaN waveforms are invalid)
+        is_nan = np.isnan(y)
+        ypi = np.argmax(np.where(is_nan, -np.inf, y), axis=1)
+        rows = np.arange(self._n)
+        yp = y[rows, ypi]
+
+        # Peakiness windows must be inside the range window
+        pad = self._pad
+        valid = np.logical_and(ypi > 3*pad, ypi < self._n_range_bins-4*pad)
+        valid = np.logical_and(valid, ~np.all(is_nan, axis=1))
+        if not valid.any():
+            return
+        rows, ypi, yp = rows[valid], ypi[valid], yp[valid]
+        left = ypi[:, np.newaxis] + np.arange(-3*pad, -1*pad+1)
+        right = ypi[:, np.newaxis] + np.arange(1*pad, 3*pad+1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._peakiness_l[valid] = yp/nanmean_by_row(
+                y[rows[:, np.newaxis], left])*3.0
+            self._peakiness_r[valid] = yp/nanmean_by_row(
+                y[rows[:, np.newaxis], right])*3.0
+            self._peakiness[valid] = yp/y[valid].sum(axis=1) * \
+                self._n_range_bins
 
     @property
     def peakiness(self):
@@ -121,19 +129,38 @@ class EnvisatWaveformParameter(BaseClassifier):
         self.peakiness = np.ndarray(shape=(self._n), dtype=np.float32)*np.nan
 
     def _calc_parameter(self, wfm):
-        for i in np.arange(self._n):
-            # Discard first bins, they are FFT artefacts anyway
-            wave = wfm[i, self.skip:]
-
-            ## old peakiness
-            try:
-                pp = 0.0 + self.t_n * float(max(wave)) / float(sum(wave))
-            except ZeroDivisionError:
-                pp = np.nan
-            self.peakiness_old[i] = pp
-
-            ## new peakiness
-            try:
-                self.peakiness[i] = float(max(wave))/float(sum(wave))*self._n_range_bins
-            except ZeroDivisionError:
-                self.peakiness[i] = np.nan
\ No newline at end of file
+        # Discard first bins, they are FFT artefacts anyway
+        wave = np.asarray(wfm[:, self.skip:], dtype=np.float64)
+        wave_max = np.max(wave, axis=1)
+        # Sequential summation (in double precision) as the Python
+        # builtin sum
+        wave_sum = np.add.accumulate(wave, axis=1)[:, -1]
+        is_zero_sum = wave_sum == 0.0
+        wave_sum[is_zero_sum] = np.nan
+
+        # old peakiness
+        self.peakiness_old[:] = 0.0 + self.t_n * wave_max / wave_sum
+
+        # new peakiness
+        self.peakiness[:] = wave_max / wave_sum * self._n_range_bins
+
+
+def get_noise_corrected_counts(wfm_counts):
+    """ Waveform counts (float32) with the noise level (mean of the first
+    11 range bins) removed and negative counts set to zero """
+    y = np.array(wfm_counts, dtype=np.float32)
+    y -= nanmean_by_row(y[:, 0:11])[:, np.newaxis]
+    with np.errstate(invalid="ignore"):
+        y[y < 0.0] = 0.0
+    return y
+
+
+def nanmean_by_row(x):
+    """ Same as np.nanmean(x, axis=1), but without warnings for all-NaN
+    rows (result: NaN) """
+    is_valid = ~np.isnan(x)
+    x = np.array(x)
+    x[~is_valid] = 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = x.sum(axis=1) / is_valid.sum(axis=1)
+    return mean.astype(x.dtype)
@@ -8,7 +8,7 @@ This module is dedicatet to convert between different time standards
 """
 
 from pysiral import USER_CONFIG_PATH
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import numpy as np
 
@@ -24,37 +24,54 @@ class UTCTAIConverter(object):
         self.url = r"http://www.ietf.org/timezones/data/leap-seconds.list"
         self._get_leap_seconds_from_config_file()
 
-    def tai2utc(self, tai_datetimes, monotonically=True, check_all=False):
+    def tai2utc(self, tai_datetimes, monotonically=True, check_all=True):
         """ Converts TAI datetime into UTC datetimes """
-
-        # prepare inputs
         tai_datetimes = np.asarray(tai_datetimes)
-        utc_datetimes = np.ndarray(shape=tai_datetimes.shape, dtype=object)
+        tai_datetime64 = tai_datetimes.astype("datetime64[us]")
+        utc_datetime64 = self.tai2utc_datetime64(
+            tai_datetime64, monotonically=monotonically, check_all=check_all)
+        return utc_datetime64.astype(object)
+
+    def tai2utc_datetime64(self, tai_datetimes, monotonically=True,
+                           check_all=True):
+        """ Converts TAI datetime64 (or datetime) into UTC datetime64[us] """
+        tai_datetime64 = np.asarray(tai_datetimes, dtype="datetime64[us]")
+        leap_seconds = self._get_leap_seconds(
+            tai_datetime64, monotonically, check_all)
+        return tai_datetime64 - leap_seconds.astype("m8[s]")
+
+    def tai2utc_seconds(self, tai_seconds, epoch=datetime(1970, 1, 1),
+                        monotonically=True, check_all=True):
+        """ Converts TAI in seconds since epoch into UTC seconds since
+        epoch (numeric input and output, e.g. int64 or float) """
+        tai_seconds = np.asarray(tai_seconds)
+        epoch_offset = (self.epoch - epoch).total_seconds()
+        leap_seconds = self._get_leap_seconds(
+            tai_seconds, monotonically, check_all,
+            thresholds=self.leap_seconds_threshold_seconds+epoch_offset)
+        return tai_seconds - leap_seconds
+
+    def _get_leap_seconds(self, times, monotonically, check_all,
+                          thresholds=None):
+        """ Returns the leap seconds for each entry of times (datetime64
+        or numeric with thresholds in the same units) """
+
+        if thresholds is None:
+            thresholds = self.leap_seconds_threshold
 
-        # Use leap seconds for first array entry
-        if monotonically and not check_all:
-            start_time = tai_datetimes[0]
-            single_ls = self._get_leap_seconds_for_utc_time(start_time)
-            leap_seconds = np.full(tai_datetimes.shape, single_ls)
+        # Compute leap second for each entry
+        if check_all:
+            return self._get_leap_seconds_for_utc_time(times, thresholds)
 
+        # Use leap seconds for first array entry
+        if monotonically:
+            reference_time = times.flat[0]
         # use leap second from earliest timestamp
-        elif not monotonically and not check_all:
-            start_time = np.amin(tai_datetimes)
-            single_ls = self._get_leap_seconds_for_utc_time(start_time)
-            leap_seconds = np.full(tai_datetimes.shape, single_ls)
-
-        # Compute leap second for each entry
         else:
-            leap_seconds = np.ndarray(shape=tai_datetimes.shape, dtype=int)
-            for i in np.arange(len(tai_datetimes)):
-                leap_seconds[i] = self._get_leap_seconds_for_utc_time(
-                    tai_datetimes[i])
-
-        # Apply leap seconds
-        for i, tai_time in enumerate(tai_datetimes):
-            utc_datetimes[i] = tai_time - timedelta(seconds=leap_seconds[i])
-
-        return utc_datetimes
+            reference_time = np.amin(times)
+        single_ls = self._get_leap_seconds_for_utc_time(
+            reference_time, thresholds)
+        return np.full(times.shape, single_ls, dtype=np.int64)
 
     def update_definition(self):
         """ Get definition file from web """
@@ -82,30 +99,44 @@ class UTCTAIConverter(object):
             content = fhandle.readlines()
 
         # Parse content
-        self.epoch_seconds = np.array([], dtype=np.int64)
-        self.leap_seconds = np.array([], dtype=np.int)
-        self.leap_seconds_timestamp = np.array([], dtype=object)
+        epoch_seconds, leap_seconds = [], []
         for line in content:
             if re.match("^#", line):
                 continue
             arr = line.strip().split()
-            self.epoch_seconds = np.append(self.epoch_seconds, int(arr[0]))
-            self.leap_seconds = np.append(self.leap_seconds, int(arr[1]))
-            # Compute datetime timestamp of leap seconds occurence
-            timestamp = self.epoch + timedelta(seconds=int(arr[0]))
-            self.leap_seconds_timestamp = np.append(
-                self.leap_seconds_timestamp, timestamp)
-
-    def _get_leap_seconds_for_utc_time(self, datetime):
-        """ Returns applicable leap seconds for given datetime """
-        # find the closet leap seconds change
-        timedeltas = datetime - self.leap_seconds_timestamp
-        positive_day_offsets = np.array([td.days > 0 for td in timedeltas])
-        applicable_ls_indices = np.where(positive_day_offsets)[0]
-        try:
-            return self.leap_seconds[applicable_ls_indices[-1]]
-        except:
-            return 0
+            epoch_seconds.append(int(arr[0]))
+            leap_seconds.append(int(arr[1]))
+        self.epoch_seconds = np.array(epoch_seconds, dtype=np.int64)
+        self.leap_seconds = np.array(leap_seconds, dtype=np.int64)
+
+        # Compute datetime timestamp of leap seconds occurence
+        epoch = np.datetime64(self.epoch, "us")
+        self.leap_seconds_datetime64 = epoch + \
+            self.epoch_seconds.astype("m8[s]")
+        self.leap_seconds_timestamp = self.leap_seconds_datetime64.astype(
+            object)
+
+        # A leap second is applied to times at least one day after the
+        # leap second occurence
+        one_day = 86400
+        self.leap_seconds_threshold_seconds = self.epoch_seconds + one_day
+        self.leap_seconds_threshold = self.leap_seconds_datetime64 + \
+            np.timedelta64(one_day, "s")
+
+    def _get_leap_seconds_for_utc_time(self, datetime, thresholds=None):
+        """ Returns applicable leap seconds for given datetime (scalar or
+        array of datetime/datetime64) """
+        if thresholds is None:
+            thresholds = self.leap_seconds_threshold
+            datetime = np.asarray(datetime, dtype="datetime64[us]")
+        # find the closet leap seconds change (index of the last threshold
+        # before datetime, -1 for times before the first leap second)
+        indices = np.searchsorted(thresholds, datetime, side="right") - 1
+        leap_seconds = np.where(
+            indices >= 0, self.leap_seconds[np.maximum(indices, 0)], 0)
+        if np.ndim(leap_seconds) == 0:
+            return int(leap_seconds)
+        return leap_seconds
 
     @property
     def local_ls_ietf_definition(self):
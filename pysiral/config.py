@@ -59,7 +59,8 @@ class ConfigInfo(DefaultLoggingClass):
     """
     Container for the content of the pysiral definition files
     (in pysiral/configuration) and the local machine definition file
-    (local_machine_definition.yaml)
+    (local_machine_definition.yaml). The definition files are parsed only
+    once per process (see get_cached_yaml_config), the content is read-only
     """
 
     # Global variables
@@ -111,7 +112,8 @@ class ConfigInfo(DefaultLoggingClass):
         return mission_options
 
     def get_mission_info(self, mission):
-        mission_info = self.mission[mission]
+        # Copy of the (read-only) mission definition
+        mission_info = self.mission[mission].copy()
         if mission_info.data_period.start is None:
             mission_info.data_period.start = datetime.utcnow()
         if mission_info.data_period.stop is None:
@@ -185,12 +187,12 @@ class ConfigInfo(DefaultLoggingClass):
     def _read_config_files(self):
         for key in self._DEFINITION_FILES.keys():
             filename = os.path.join(USER_CONFIG_PATH, self._DEFINITION_FILES[key])
-            setattr(self, key, get_yaml_config(filename))
+            setattr(self, key, get_cached_yaml_config(filename))
 
     def _read_local_machine_file(self):
         filename = os.path.join(USER_CONFIG_PATH, self._LOCAL_MACHINE_DEF_FILE)
         try:
-            local_machine_def = get_yaml_config(filename)
+            local_machine_def = get_cached_yaml_config(filename)
         except IOError:
             msg = "local_machine_def.yaml not found (expected: %s)" % filename
             self.error.add_error("local-machine-def-missing", msg)
@@ -840,6 +842,15 @@ class DefaultCommandLineArguments(object):
                 "help": 'enable writing Level-2 output to unique directory ' +
                         '(default)'},
 
+            # number of worker processes for the Level-2 processor
+            "workers": {
+                "action": "store",
+                "dest": "workers",
+                "type": int,
+                "default": 1,
+                "required": False,
+                "help": 'number of parallel worker processes (default: 1)'},
+
             "period": {
                 "action": "store",
                 "dest": "period",
@@ -922,6 +933,38 @@ def get_yaml_config(filename, output="treedict"):
         return content_dict
 
 
+# Parsed definition files: {filename: (file modification time & size, content)}
+_YAML_CONFIG_CACHE = {}
+
+
+def get_cached_yaml_config(filename):
+    """
+    Returns the content of a configuration file in .yaml format as
+    read-only (frozen) treedict object. The file is parsed once per process
+    and only parsed again if the modification time or size of the file
+    changes. Use the copy() method of the treedict for a writeable copy.
+
+    Arguments:
+        filename (str)
+            path the configuration file
+    """
+    filename = os.path.abspath(filename)
+    try:
+        stat = os.stat(filename)
+        file_version = (stat.st_mtime, stat.st_size)
+    except OSError:
+        file_version = None
+
+    cached = _YAML_CONFIG_CACHE.get(filename, None)
+    if cached is None or file_version is None or cached[0] != file_version:
+        # Raises IOError if the file does not exist
+        content = get_yaml_config(filename)
+        content.freeze()
+        cached = (file_version, content)
+        _YAML_CONFIG_CACHE[filename] = cached
+    return cached[1]
+
+
 def td_branches(t):
     """ Convenience function to get only the branches of a treedict object """
     try:
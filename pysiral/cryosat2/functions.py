@@ -10,6 +10,7 @@ import parse
 import xmltodict
 import numpy as np
 from treedict import TreeDict
+from pysiral.esa.functions import get_mdsr_datetime64
 from dateutil import parser as dtparser
 from datetime import datetime, timedelta
 
@@ -118,6 +119,11 @@ def get_tai_datetime_from_timestamp(mdsr_timestamp):
 
     """
     timestamps = np.asarray(mdsr_timestamp)
+
+    # numpy structured array with fields day, sec, msec
+    if timestamps.dtype.names:
+        return get_mdsr_datetime64(timestamps).astype(object)
+
     output = np.ndarray(shape=(len(timestamps)), dtype=object)
     for i, timestamp in enumerate(timestamps):
         output[i] = datetime(2000, 1, 1) + timedelta(
@@ -32,6 +32,17 @@ class Cryosat2L1bMDSDefinition(object):
         single_block_groups = ["corrections"]
         return single_block_groups
 
+    def get_mds_record(self):
+        """ Returns the construct definition of a single MDS record
+        (implemented by the subclasses) """
+        raise NotImplementedError(
+            "%s: MDS record definition missing" % self.__class__.__name__)
+
+    def get_mds_parser(self):
+        """ Returns the construct parser for all n_records MDS records """
+        self.mds = Array(self.n_records, self.get_mds_record())
+        return self.mds
+
 
 class Cryosat2SARBaselineB(Cryosat2L1bMDSDefinition):
 
@@ -44,7 +55,7 @@ class Cryosat2SARBaselineB(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -170,8 +181,7 @@ class Cryosat2SARBaselineB(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-        return self.mds
+        return self.mds_record
 
 
 class Cryosat2SARBaselineC(Cryosat2L1bMDSDefinition):
@@ -185,7 +195,7 @@ class Cryosat2SARBaselineC(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -319,8 +329,7 @@ class Cryosat2SARBaselineC(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-        return self.mds
+        return self.mds_record
 
 
 class Cryosat2SARBaselineCFull(Cryosat2L1bMDSDefinition):
@@ -334,7 +343,7 @@ class Cryosat2SARBaselineCFull(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -465,8 +474,7 @@ class Cryosat2SARBaselineCFull(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-        return self.mds
+        return self.mds_record
 
 
 class Cryosat2SINBaselineCFull(Cryosat2L1bMDSDefinition):
@@ -480,7 +488,7 @@ class Cryosat2SINBaselineCFull(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -613,9 +621,7 @@ class Cryosat2SINBaselineCFull(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-
-        return self.mds
+        return self.mds_record
 
 
 class Cryosat2SINBaselineB(Cryosat2L1bMDSDefinition):
@@ -629,7 +635,7 @@ class Cryosat2SINBaselineB(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -765,9 +771,7 @@ class Cryosat2SINBaselineB(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-
-        return self.mds
+        return self.mds_record
 
 
 class Cryosat2SINBaselineC(Cryosat2L1bMDSDefinition):
@@ -781,7 +785,7 @@ class Cryosat2SINBaselineC(Cryosat2L1bMDSDefinition):
         self.n_records = 0
         self.n_blocks = 20
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.mdsr_timestamp = Struct(
             "tai_timestamp",
@@ -928,9 +932,7 @@ class Cryosat2SINBaselineC(Cryosat2L1bMDSDefinition):
             self.onehz_waveform_group,
             Array(self.n_blocks, self.waveform_group))
 
-        self.mds = Array(self.n_records, self.mds_record)
-
-        return self.mds
+        return self.mds_record
 
 
 def cryosat2_get_mds_def(radar_mode, baseline, n_records):
@@ -7,6 +7,7 @@ Created on Sun Jul 12 13:51:52 2015
 
 from pysiral.errorhandler import FileIOErrorHandler
 from pysiral.esa.header import (ESAProductHeader, ESAScienceDataSetDescriptors)
+from pysiral.esa.mds import MDSNumpyDefinition
 from pysiral.cryosat2.l1b_mds_def import cryosat2_get_mds_def
 from pysiral.cryosat2.functions import (parse_cryosat_l1b_filename,
                                         parse_cryosat_l1b_xml_header)
@@ -195,8 +196,7 @@ class CryoSatL1B(object):
 
     def parse_mds(self):
         # Parse the product file
-        with open(self._filename_product, "rb") as self._fh:
-            self._parse_mds()
+        self._parse_mds()
 
     def get_status(self):
         return self._error.test_errors()
@@ -264,20 +264,20 @@ class CryoSatL1B(object):
 
     def _parse_mds(self):
         """ Read the data blocks """
-        # Just reopened the file in binary mode -
-        # > get start byte and number of data set records
+        # Get start byte and number of data set records
         l1b_data_set_name = self._get_l1b_data_set_name()
         data_set_descriptor = self.dsd.get_by_fieldname(l1b_data_set_name)
         startbyte = int(data_set_descriptor["ds_offset"])
         self.n_msd_records = int(data_set_descriptor["num_dsr"])
-        # Set the file pointer
-        self._fh.seek(startbyte)
-        # Get the parser
+        # Get the record definition
         self.mds_definition = cryosat2_get_mds_def(
             self._radar_mode, self._baseline, self.n_msd_records)
-        mds_parser = self.mds_definition.get_mds_parser()
-        # Parser the binary part of the .DBL file
-        self.mds = mds_parser.parse(self._fh.read(mds_parser.sizeof()))
+        mds_record = self.mds_definition.get_mds_record()
+        # Parse the binary part of the .DBL file in one go with the numpy
+        # equivalent of the record definition (structured array)
+        mds_parser = MDSNumpyDefinition(mds_record)
+        self.mds = mds_parser.read(self._filename_product, offset=startbyte,
+                                   n_records=self.n_msd_records)
 
     def _get_l1b_data_set_name(self):
         radar_mode = self._radar_mode
@@ -300,16 +300,13 @@ class CryoSatL1B(object):
         # Unpack the multiple record groups
         groups = self.mds_definition.get_multiple_block_groups()
         for group in groups:
-            content = np.array(
-                [[record[group]] for record in self.mds]).flatten()
-            setattr(self, group, content)
+            setattr(self, group, self.mds[group].reshape(-1))
         # Unpack the single record groups and replicate by number of
         # multiple rec
         groups = self.mds_definition.get_single_block_groups()
         for group in groups:
-            content = np.array([record[group] for record in self.mds])
             setattr(self, group, np.repeat(
-                content, self.mds_definition.n_blocks))
+                self.mds[group], self.mds_definition.n_blocks))
 
     def _trim(self):
         """
@@ -318,8 +315,7 @@ class CryoSatL1B(object):
         """
         unpacked_groups = self.mds_definition.get_multiple_block_groups()
         unpacked_groups.extend(self.mds_definition.get_single_block_groups())
-        ssc = np.array(
-            [record["source_sequence_counter"] for record in self.time_orbit])
+        ssc = self.time_orbit["source_sequence_counter"]
         no_zero_list = np.where(ssc != 0)[0]
         if len(no_zero_list) == 0:
             return
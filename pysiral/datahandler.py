@@ -9,6 +9,7 @@ from pysiral.config import ConfigInfo
 from pysiral.logging import DefaultLoggingClass
 from pysiral.errorhandler import ErrorStatus, PYSIRAL_ERROR_CODES
 from pysiral.iotools import get_local_l1bdata_files
+from pysiral.auxdata import AUXDATA_CACHE
 from pysiral.sic import get_l2_sic_handler
 from pysiral.sitype import get_l2_sitype_handler
 from pysiral.snow import get_l2_snow_handler
@@ -36,6 +37,7 @@ class DefaultAuxdataHandler(DefaultLoggingClass):
         super(DefaultAuxdataHandler, self).__init__(self.__class__.__name__)
         self.pysiral_config = ConfigInfo()
         self.error = ErrorStatus(caller_id=self.__class__.__name__)
+        self._configure_auxdata_cache()
 
     def get_pyclass(self, auxdata_class, auxdata_id):
         """
@@ -122,6 +124,16 @@ class DefaultAuxdataHandler(DefaultLoggingClass):
 
         return auxdata_handler
 
+    def _configure_auxdata_cache(self):
+        """ Apply the settings of the shared auxdata cache in
+        `config/auxdata_def.yaml` (optional) """
+        if "cache" not in self.pysiral_config.auxdata:
+            return
+        cache_def = self.pysiral_config.auxdata.cache
+        AUXDATA_CACHE.configure(
+            enabled=cache_def.get("enabled", None),
+            max_size_mb=cache_def.get("max_size_mb", None))
+
     def get_local_repository(self, auxdata_class, auxdata_id):
         """ Get the local repository for the the auxdata type and id """
         if auxdata_id is None:
@@ -139,17 +151,19 @@ class DefaultAuxdataHandler(DefaultLoggingClass):
 class DefaultL1bDataHandler(DefaultLoggingClass):
     """ Class for retrieving default l1b directories and filenames """
 
-    def __init__(self, mission_id, hemisphere, version="default"):
+    def __init__(self, mission_id, hemisphere, version="default",
+                 catalog=None):
         super(DefaultL1bDataHandler, self).__init__(self.__class__.__name__)
         self._mission_id = mission_id
         self._hemisphere = hemisphere
         self._version = version
+        self._catalog = catalog
         self._last_directory = None
 
     def get_files_from_time_range(self, time_range):
         files, search_directory = get_local_l1bdata_files(
                 self._mission_id, time_range, self._hemisphere,
-                version=self._version)
+                version=self._version, catalog=self._catalog)
         self._last_directory = search_directory
         return files
 
@@ -159,19 +173,27 @@ class DefaultL1bDataHandler(DefaultLoggingClass):
 
 
 class L2iDataHandler(DefaultLoggingClass):
-    """ Class for retrieving default l1b directories and filenames """
+    """ Class for retrieving default l2i directories and filenames. The
+    files are retrieved from the product catalogue instead of directory
+    listings if `catalog` (pysiral.catalog.ProductCatalog) is set """
 
-    def __init__(self, base_directory, force_l2i_subfolder=True):
+    def __init__(self, base_directory, force_l2i_subfolder=True,
+                 catalog=None):
         super(L2iDataHandler, self).__init__(self.__class__.__name__)
         self.error = ErrorStatus(caller_id=self.__class__.__name__)
         self._base_directory = base_directory
         self._force_l2i_subfolder = force_l2i_subfolder
+        self._catalog = catalog
         self._subdirectory_list = self.get_subdirectory_list()
         self._validate_base_directory()
 
     def get_files_from_time_range(self, time_range):
         """ Get all files that fall into time range (May be spread over
         the different year/ month subfolders """
+        if self._catalog is not None:
+            days = [datetime(*day) for day in time_range.days_list]
+            return self._get_catalog_files(
+                days, time_range.start, time_range.stop)
         l2i_files = []
         for year, month, day in time_range.days_list:
             lookup_directory = self.get_lookup_directory(year, month)
@@ -188,6 +210,13 @@ class L2iDataHandler(DefaultLoggingClass):
         Also specifically looks for files with had a start time on the
         previous day """
 
+        if self._catalog is not None:
+            day_start = datetime(day_dt.year, day_dt.month, day_dt.day)
+            return self._get_catalog_files(
+                [day_start], day_start,
+                day_start + timedelta(days=1, microseconds=-1),
+                previous_month=day_dt.day == 1)
+
         # Get the lookup directory
         lookup_directory = self.get_lookup_directory(day_dt.year, day_dt.month)
 
@@ -215,6 +244,27 @@ class L2iDataHandler(DefaultLoggingClass):
         # All done, return sorted output
         return sorted(l2i_files)
 
+    def _get_catalog_files(self, days, start, stop, previous_month=False):
+        """ Returns the l2i files from the product catalogue with the same
+        selection as the filename search pattern: Files in the yyyy/mm
+        lookup directory of the day with start or stop time on that day
+        (optionally also in the lookup directory of the previous month) """
+        dates = set(day.date() for day in days)
+        lookup_directories = set()
+        for day in days:
+            lookup_directories.add(os.path.normpath(os.path.abspath(
+                self.get_lookup_directory(day.year, day.month))))
+            if previous_month:
+                previous_day = day - timedelta(days=1)
+                lookup_directories.add(os.path.normpath(os.path.abspath(
+                    self.get_lookup_directory(
+                        previous_day.year, previous_day.month))))
+        products = self._catalog.get_products(
+            "l2i", root=self.product_basedir, start=start, stop=stop)
+        return [p.path for p in products
+                if p.directory in lookup_directories and
+                (p.start.date() in dates or p.stop.date() in dates)]
+
     def _validate_base_directory(self):
         """ Performs sanity checks and enforces the l2i subfolder """
         # 1. Path must exist
@@ -232,6 +282,8 @@ class L2iDataHandler(DefaultLoggingClass):
 
     def get_subdirectory_list(self):
         """ Returns a list of all subdirectories of type yyyy/mm """
+        if self._catalog is not None:
+            return self._get_catalog_subdirectory_list()
         subdirectory_list = list()
         try:
             years = sorted(next(os.walk(self.product_basedir))[1])
@@ -248,6 +300,20 @@ class L2iDataHandler(DefaultLoggingClass):
             subdirectory_list.extend([[year, m] for m in months])
         return subdirectory_list
 
+    def _get_catalog_subdirectory_list(self):
+        """ Same as get_subdirectory_list from the product catalogue """
+        root = os.path.normpath(os.path.abspath(self.product_basedir))
+        subdirectory_list = list()
+        for directory in self._catalog.get_directories(root):
+            subfolders = os.path.relpath(directory, root).split(os.sep)
+            if len(subfolders) != 2:
+                continue
+            year, month = subfolders
+            if re.match(r'[1-3][0-9]{3}', year) and \
+                    re.match(r'[0-1][0-9]', month):
+                subdirectory_list.append([year, month])
+        return subdirectory_list
+
     def get_l2i_search_str(self, year=None, month=None, day=None):
         """ Returns a search pattern for l2i files with optional refined
         search for year, month, day. Note: month & day can only be set,
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from pysiral.esa.functions import get_mdsr_datetime64
+
 import numpy as np
 
 NOMINAL_TRACKING_BIN = 45
@@ -7,23 +9,27 @@ BIN_WIDTH_METER = 0.4686
 
 
 def mdsr_timestamp_to_datetime(mdsr_time):
-    """ Interpret the Envisat format time into a datetime object """
+    """
+    Interpret the Envisat format time into a datetime object. mdsr_time
+    can also be a numpy structured array with fields day, sec, msec
+    (returns an array of datetime objects)
+    """
     from datetime import datetime, timedelta
 
-    epoch = 946684800  # 1:st of January 2000 in POSIX time
-    return datetime.fromtimestamp(epoch) + timedelta(
+    # numpy structured array with fields day, sec, msec
+    if isinstance(mdsr_time, np.ndarray) and mdsr_time.dtype.names:
+        return get_mdsr_datetime64(mdsr_time).astype(object)
+
+    return datetime(2000, 1, 1) + timedelta(
         days=mdsr_time.day,
         seconds=mdsr_time.sec,
         microseconds=mdsr_time.msec)
 
 
 def get_envisat_wfm_range(window_delay_meter, n_range_bins):
-    n_records = len(window_delay_meter)
-    wfm_range = np.ndarray(shape=(n_records, n_range_bins), dtype=np.float32)
-    for i in range(n_records):
-        wfm_range[i, :] = np.arange(n_range_bins)*BIN_WIDTH_METER + \
-            window_delay_meter[i]
-    return wfm_range
+    bin_range = np.arange(n_range_bins)*BIN_WIDTH_METER
+    wfm_range = bin_range + np.asarray(window_delay_meter)[:, np.newaxis]
+    return wfm_range.astype(np.float32)
 
 
 def get_envisat_window_delay(tracker_range, doppler_correction,
@@ -15,6 +15,17 @@ class EnvisatSGDRMDS(object):
         self.n_records = 0
         self.n_blocks = 20
 
+    def get_mds_record(self):
+        """ Returns the construct definition of a single MDS record
+        (implemented by the subclasses) """
+        raise NotImplementedError(
+            "%s: MDS record definition missing" % self.__class__.__name__)
+
+    def get_mds_parser(self):
+        """ Returns the construct parser for all n_records MDS records """
+        self.mds = Array(self.n_records, self.get_mds_record())
+        return self.mds
+
 
 class EnvisatSGDRMDSRA2(EnvisatSGDRMDS):
     """
@@ -25,7 +36,7 @@ class EnvisatSGDRMDSRA2(EnvisatSGDRMDS):
     def __init__(self):
         super(EnvisatSGDRMDSRA2, self).__init__()
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.timestamp = Struct(
             "utc_timestamp",
@@ -140,9 +151,7 @@ class EnvisatSGDRMDSRA2(EnvisatSGDRMDS):
             self.mwr_information,
             self.flags)
 
-        self.mds = Array(self.n_records, self.mds_record)
-
-        return self.mds
+        return self.mds_record
 
 
 class EnvisatSGDRMDSRA2Full(EnvisatSGDRMDS):
@@ -150,7 +159,7 @@ class EnvisatSGDRMDSRA2Full(EnvisatSGDRMDS):
     def __init__(self):
         super(EnvisatSGDRMDSRA2Full, self).__init__()
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.timestamp = Struct(
             "utc_timestamp",
@@ -357,9 +366,7 @@ class EnvisatSGDRMDSRA2Full(EnvisatSGDRMDS):
             self.mwr_information,
             self.flags)
 
-        self.mds = Array(self.n_records, self.mds_record)
-
-        return self.mds
+        return self.mds_record
 
 
 class EnvisatSGDRMDSWFM18HZFull(EnvisatSGDRMDS):
@@ -367,7 +374,7 @@ class EnvisatSGDRMDSWFM18HZFull(EnvisatSGDRMDS):
     def __init__(self):
         super(EnvisatSGDRMDSWFM18HZFull, self).__init__()
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.timestamp = Struct(
             "utc_timestamp",
@@ -397,8 +404,7 @@ class EnvisatSGDRMDSWFM18HZFull(EnvisatSGDRMDS):
             Padding(8),
             Array(20, self.waveform_data))
 
-        self.mds = Array(self.n_records, self.mds_record)
-        return self.mds
+        return self.mds_record
 
 
 class EnvisatSGDRMDSWFM18HZ(EnvisatSGDRMDS):
@@ -406,7 +412,7 @@ class EnvisatSGDRMDSWFM18HZ(EnvisatSGDRMDS):
     def __init__(self):
         super(EnvisatSGDRMDSWFM18HZ, self).__init__()
 
-    def get_mds_parser(self):
+    def get_mds_record(self):
 
         self.timestamp = Struct(
             "utc_timestamp",
@@ -428,8 +434,7 @@ class EnvisatSGDRMDSWFM18HZ(EnvisatSGDRMDS):
             Padding(8),
             Array(20, self.waveform_data))
 
-        self.mds = Array(self.n_records, self.mds_record)
-        return self.mds
+        return self.mds_record
 
 
 def envisat_get_mds_def(n_records, mds_target):
@@ -7,6 +7,7 @@ from pysiral.envisat.functions import (mdsr_timestamp_to_datetime,
                                        get_envisat_wfm_range)
 from pysiral.esa.header import (ESAProductHeader, ESAScienceDataSetDescriptors)
 from pysiral.esa.functions import get_structarr_attr
+from pysiral.esa.mds import MDSNumpyDefinition
 
 import numpy as np
 import os
@@ -43,12 +44,11 @@ class EnvisatSGDR(object):
             self._parse_mph()
             self._parse_sph()
             self._parse_dsd()
-        with open(self._filename, "rb") as self._fh:
-            self._parse_mds("ra2")
-            self._parse_mds("wfm18hz")
-            # XXX: mwr: not necessary?, wfmburst: not in the files?
-            # self._parse_mds("mwr")
-            # self._parse_mds("wfmburst")
+        self._parse_mds("ra2")
+        self._parse_mds("wfm18hz")
+        # XXX: mwr: not necessary?, wfmburst: not in the files?
+        # self._parse_mds("mwr")
+        # self._parse_mds("wfmburst")
 
     def get_status(self):
         # XXX: Not much functionality here
@@ -105,20 +105,20 @@ class EnvisatSGDR(object):
 
     def _parse_mds(self, mds_target):
         """ Read the data blocks """
-        # Just reopened the file in binary mode -
-        # > get start byte and number of data set records
+        # Get start byte and number of data set records
         l1b_data_set_name = self._DS_NAME[mds_target].lower()
         data_set_descriptor = self.dsd.get_by_fieldname(l1b_data_set_name)
         startbyte = int(data_set_descriptor["ds_offset"])
         self.n_msd_records = int(data_set_descriptor["num_dsr"])
-        # Set the file pointer
-        self._fh.seek(startbyte)
-        # Get the parser (depending on MDS target)
+        # Get the record definition (depending on MDS target)
         self.mds_definition = envisat_get_mds_def(
             self.n_msd_records, mds_target)
-        mds_parser = self.mds_definition.get_mds_parser()
-        # Parser the binary part of the .DBL file
-        mds = mds_parser.parse(self._fh.read(mds_parser.sizeof()))
+        mds_record = self.mds_definition.get_mds_record()
+        # Parse the binary part of the .DBL file in one go with the numpy
+        # equivalent of the record definition (structured array)
+        mds_parser = MDSNumpyDefinition(mds_record)
+        mds = mds_parser.read(self._filename, offset=startbyte,
+                              n_records=self.n_msd_records)
         setattr(self, "mds_"+mds_target, mds)
 
     def _read_header_lines(self, header):
@@ -231,10 +231,8 @@ class Envisat18HzArrays(object):
     def reform_timestamp(self, mds):
         """ Creates an array of datetime objects for each 18Hz record """
         # XXX: Current no microsecond correction
-        timestamp = np.ndarray(shape=(self.n_records), dtype=object)
         mdsr_timestamp = get_structarr_attr(mds, "utc_timestamp")
-        for i in range(self.n_records):
-            timestamp[i] = mdsr_timestamp_to_datetime(mdsr_timestamp[i])
+        timestamp = mdsr_timestamp_to_datetime(mdsr_timestamp)
         self.timestamp = np.repeat(timestamp, self.n_blocks)
 
     def reform_position(self, mds):
@@ -254,8 +252,6 @@ class Envisat18HzArrays(object):
         self.latitude = np.repeat(latitude, self.n_blocks)
         self.altitude = np.repeat(altitude, self.n_blocks)
         # 4) Apply the increments
-        # XXX: Current version of get_struct_arr returns datatype objects
-        #      for listcontainers => manually set dtype
         self._apply_18Hz_increment(self.longitude, lon_inc.astype(np.float32))
         self._apply_18Hz_increment(self.latitude, lat_inc.astype(np.float32))
         self._apply_18Hz_increment(self.altitude, alt_inc.astype(np.float32))
@@ -267,22 +263,22 @@ class Envisat18HzArrays(object):
         doppler_tag = "18Hz_ku_range_doppler"
         slope_tag = "18Hz_ku_range_doppler_slope"
         # First get the echo power
+        # (records x blocks x range bins => 18Hz records x range bins)
         n_range_bins = 128
         n = self.n_records * self.n_blocks
-        self.power = np.ndarray(shape=(n, n_range_bins), dtype=np.float32)
-        for dsd in range(self.n_records):
-            for block in range(self.n_blocks):
-                i = dsd*self.n_blocks + block
-                self.power[i, :] = mds_wfm18hz[dsd].wfm[block][wfm_tag]
+        power = get_structarr_attr(mds_wfm18hz, "wfm")[wfm_tag]
+        self.power = power.reshape(n, n_range_bins).astype(np.float32)
         # Calculate the window delay for each 18hz waveform
         range_info = get_structarr_attr(mds_ra2, "range_information")
         range_corr = get_structarr_attr(mds_ra2, "range_correction")
+        # (the window delay needs double precision: float32 has a
+        #  resolution of several centimeter at satellite altitude)
         tracker_range = get_structarr_attr(
-            range_info, tracker_range_tag, flat=True)
+            range_info, tracker_range_tag, flat=True).astype(np.float64)
         doppler_correction = get_structarr_attr(
-            range_corr, doppler_tag, flat=True)
+            range_corr, doppler_tag, flat=True).astype(np.float64)
         slope_correction = get_structarr_attr(
-            range_corr, slope_tag, flat=True)
+            range_corr, slope_tag, flat=True).astype(np.float64)
         # Compute the window delay (range to first range bin)
         # given in meter (not in seconds)
         # XXX: Add the instrumental range correction for ku?
@@ -340,16 +336,14 @@ class Envisat18HzArrays(object):
         """
         time_orbit = get_structarr_attr(mds, "time_orbit")
         mcd = get_structarr_attr(time_orbit, "measurement_confidence_data")
-        self.flag_packet_length_error = np.repeat(np.array(
-            [record.flag[0] for record in mcd], dtype=bool), self.n_blocks)
-        self.flag_obdh_invalid = np.repeat(np.array(
-            [record.flag[1] for record in mcd], dtype=bool), self.n_blocks)
-        self.flag_agc_fault = np.repeat(np.array(
-            [record.flag[4] for record in mcd], dtype=bool), self.n_blocks)
-        self.flag_rx_delay_fault = np.repeat(np.array(
-            [record.flag[5] for record in mcd], dtype=bool), self.n_blocks)
-        self.flag_waveform_fault = np.repeat(np.array(
-            [record.flag[6] for record in mcd], dtype=bool), self.n_blocks)
+        # Unpacked MCD bits (n_records x 32, most significant bit first)
+        mcd_flag = get_structarr_attr(mcd, "flag").astype(bool)
+        self.flag_packet_length_error = np.repeat(mcd_flag[:, 0],
+                                                  self.n_blocks)
+        self.flag_obdh_invalid = np.repeat(mcd_flag[:, 1], self.n_blocks)
+        self.flag_agc_fault = np.repeat(mcd_flag[:, 4], self.n_blocks)
+        self.flag_rx_delay_fault = np.repeat(mcd_flag[:, 5], self.n_blocks)
+        self.flag_waveform_fault = np.repeat(mcd_flag[:, 6], self.n_blocks)
         flags = get_structarr_attr(mds, "flag")
         self.ku_chirp_band_id = np.repeat(get_structarr_attr(
             flags, "average_ku_chirp_band"), self.n_blocks)
@@ -359,6 +353,6 @@ class Envisat18HzArrays(object):
             backscatter, "18hz_sea_ice_sigma_ku", flat=True), dtype=np.float32)
 
     def _apply_18Hz_increment(self, data, inc):
-        for i in range(self.n_records):
-            i0, i1 = i*self.n_blocks, (i+1)*self.n_blocks
-            data[i0:i1] += inc[i, :]
+        """ Adds the (n_records x n_blocks) increments in place to the
+        expanded (n_records*n_blocks) 1Hz data """
+        data.reshape(self.n_records, self.n_blocks)[:] += inc
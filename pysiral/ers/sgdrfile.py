@@ -20,7 +20,7 @@ class ERSSGDR(object):
     def parse(self):
         from pysiral.iotools import ReadNC
         self._validate()
-        self.nc = ReadNC(self.filename, nan_fill_value=True)
+        self.nc = ReadNC(self.filename, nan_fill_value=True, lazy=True)
 
 #        for attribute in self.nc.attributes:
 #            print "attribute: %s = %s" % (
@@ -4,4 +4,4 @@
 plib A collection of python libraries
 """
 
-__all__ = ["functions", "header"]
\ No newline at end of file
+__all__ = ["functions", "header", "mds"]
\ No newline at end of file
@@ -3,12 +3,31 @@
 import numpy as np
 
 
+def get_mdsr_datetime64(mdsr_timestamp):
+    """
+    Converts MDSR timestamps (numpy structured array with fields day,
+    sec, msec: days since January 1, 2000, seconds of the day and
+    microseconds of the second) into numpy.datetime64[us] values
+    """
+    epoch = np.datetime64("2000-01-01T00:00:00", "us")
+    microseconds = mdsr_timestamp["day"].astype(np.int64)*86400000000
+    microseconds += mdsr_timestamp["sec"].astype(np.int64)*1000000
+    microseconds += mdsr_timestamp["msec"].astype(np.int64)
+    return epoch + microseconds.astype("m8[us]")
+
+
 def get_structarr_attr(struct_arr, field, flat=False):
     """
     Get all attributes from array of objects that support dict notation
     (e.g. struct_array[:].field <- does not work in python)
 
     """
+    # numpy structured arrays (see pysiral.esa.mds)
+    if isinstance(struct_arr, np.ndarray) and struct_arr.dtype.names:
+        data = struct_arr[field]
+        if flat:
+            data = data.flatten()
+        return data
     dtype = type(struct_arr[0][field])
     data = np.array([record[field] for record in struct_arr], dtype=dtype)
     if flat:
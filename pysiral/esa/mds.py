@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized parsing of the measurement data sets (MDS) of ESA binary
+products (e.g. CryoSat-2 L1b, Envisat SGDR).
+
+The record layouts of the MDS are defined with `construct` in the mission
+modules (e.g. pysiral.cryosat2.l1b_mds_def). Instead of parsing the data
+with construct, which creates one Python object per field and record,
+the definitions are translated into (big-endian) numpy structured dtypes,
+the records are read in a single pass with numpy and the unit conversions
+of the adapters in pysiral.units are applied as vectorized operations.
+
+Usage:
+
+    mds_def = MDSNumpyDefinition(mds_record_construct)
+    mds = mds_def.read(filename, offset=ds_offset, n_records=num_dsr)
+
+The result is a numpy structured array with the same (nested) field names
+as the construct definition. Padding is skipped, bit fields are unpacked
+into unsigned integer fields.
+"""
+
+from pysiral.units import UnitAdapter
+
+from construct.core import (Struct, FormatField, MetaArray, Buffered,
+                            Restream, StaticField)
+from construct.adapters import PaddingAdapter, BitIntegerAdapter
+
+import numpy as np
+
+
+# Map of struct format characters (standard sizes) to numpy types
+FORMAT_CHAR_DTYPE = {
+    "b": "i1", "B": "u1", "h": "i2", "H": "u2", "i": "i4", "I": "u4",
+    "l": "i4", "L": "u4", "q": "i8", "Q": "u8", "f": "f4", "d": "f8"}
+
+
+class MDSNumpyDefinition(object):
+    """ Numpy representation of a construct MDS record definition """
+
+    def __init__(self, construct):
+        self._node = get_mds_node(construct)
+
+    @property
+    def raw_dtype(self):
+        """ numpy dtype of the binary record in the file (big-endian) """
+        return self._node.raw_dtype
+
+    @property
+    def dtype(self):
+        """ numpy dtype of the decoded record (native byte order, unit
+        conversions applied) """
+        return self._node.dtype
+
+    @property
+    def itemsize(self):
+        return self._node.raw_dtype.itemsize
+
+    def read(self, filename, offset=0, n_records=None):
+        """ Read and decode n_records starting at byte offset """
+        raw = np.memmap(filename, dtype=self.raw_dtype, mode="r",
+                        offset=offset, shape=n_records)
+        return self.decode(raw)
+
+    def frombuffer(self, data, offset=0, n_records=-1):
+        """ Decode records from a buffer (e.g. a string) """
+        raw = np.frombuffer(data, dtype=self.raw_dtype, count=n_records,
+                            offset=offset)
+        return self.decode(raw)
+
+    def decode(self, raw):
+        """ Convert an array of raw records into decoded records """
+        return self._node.decode(raw)
+
+
+class MDSNode(object):
+    """ Description of one construct element: raw (binary) dtype, decoded
+    dtype and the decoding function """
+
+    def __init__(self, name, raw_dtype, dtype, decoder):
+        self.name = name
+        self.raw_dtype = np.dtype(raw_dtype)
+        self.dtype = np.dtype(dtype)
+        self.decoder = decoder
+
+    def decode(self, raw):
+        return self.decoder(raw)
+
+
+def get_mds_node(con):
+    """ Translates a construct definition into a MDSNode. Returns None
+    for padding """
+
+    if isinstance(con, PaddingAdapter):
+        return None
+
+    # Unit conversion (e.g. MilliMeter(SBInt32(...)))
+    if isinstance(con, UnitAdapter):
+        node = get_mds_node(con.subcon)
+        dtype = con.decode(np.zeros(0, dtype=node.dtype)).dtype
+        decode = con.decode
+        return MDSNode(con.name, node.raw_dtype, dtype,
+                       lambda raw: decode(node.decode(raw)))
+
+    # Integers and floats
+    if isinstance(con, FormatField):
+        endianity, format_char = con.packer.format[0], con.packer.format[1:]
+        dtype = FORMAT_CHAR_DTYPE[format_char]
+        native_dtype = np.dtype(dtype)
+        return MDSNode(con.name, endianity+dtype, dtype,
+                       lambda raw: raw.astype(native_dtype))
+
+    # Array with fixed number of elements
+    if isinstance(con, MetaArray):
+        count = con.countfunc(None)
+        node = get_mds_node(con.subcon)
+        return MDSNode(con.subcon.name, (node.raw_dtype, (count, )),
+                       (node.dtype, (count, )), node.decode)
+
+    # Structures
+    if isinstance(con, Struct):
+        return _get_mds_struct_node(con)
+
+    # Bit structures
+    if isinstance(con, (Buffered, Restream)) and isinstance(con.subcon, Struct):
+        return _get_mds_bitstruct_node(con.subcon)
+
+    msg = "construct type not supported for numpy parsing: %s"
+    raise ValueError(msg % str(con))
+
+
+def _get_mds_struct_node(con):
+    """ Structured dtypes with byte offsets (padding is skipped) """
+    names, raw_formats, offsets, formats, nodes = [], [], [], [], []
+    offset = 0
+    for subcon in con.subcons:
+        if isinstance(subcon, PaddingAdapter):
+            offset += _get_static_length(subcon.subcon)
+            continue
+        node = get_mds_node(subcon)
+        names.append(node.name)
+        raw_formats.append(node.raw_dtype)
+        offsets.append(offset)
+        formats.append(node.dtype)
+        nodes.append(node)
+        offset += node.raw_dtype.itemsize
+
+    raw_dtype = np.dtype({"names": names, "formats": raw_formats,
+                          "offsets": offsets, "itemsize": offset})
+    dtype = np.dtype(zip(names, formats))
+
+    def decoder(raw):
+        decoded = np.empty(raw.shape, dtype=dtype)
+        for name, node in zip(names, nodes):
+            decoded[name] = node.decode(raw[name])
+        return decoded
+
+    return MDSNode(con.name, raw_dtype, dtype, decoder)
+
+
+def _get_mds_bitstruct_node(con):
+    """ Bit fields are read as bytes and unpacked (most significant bit
+    first, as in construct). Arrays of bit fields (e.g. flag words) are
+    unpacked into arrays of unsigned integers """
+    fields = []
+    n_bits = 0
+    for subcon in con.subcons:
+        if isinstance(subcon, PaddingAdapter):
+            n_bits += _get_static_length(subcon.subcon)
+            continue
+        count = None
+        if isinstance(subcon, MetaArray):
+            count = subcon.countfunc(None)
+            subcon = subcon.subcon
+        if not isinstance(subcon, BitIntegerAdapter) or subcon.signed or \
+                subcon.swapped:
+            msg = "bit field type not supported for numpy parsing: %s"
+            raise ValueError(msg % str(subcon))
+        width = _get_static_length(subcon.subcon)
+        fields.append((subcon.name, n_bits, width, count))
+        n_bits += width * (1 if count is None else count)
+
+    if n_bits % 8 != 0:
+        raise ValueError("bit structure not byte aligned: %s" % str(con))
+    n_bytes = n_bits // 8
+
+    formats = []
+    for name, start, width, count in fields:
+        field_dtype = "u1" if width <= 8 else "u2" if width <= 16 else \
+            "u4" if width <= 32 else "u8"
+        if count is None:
+            formats.append((name, field_dtype))
+        else:
+            formats.append((name, field_dtype, (count, )))
+    dtype = np.dtype(formats)
+
+    def decoder(raw):
+        bits = np.unpackbits(raw, axis=-1)
+        decoded = np.empty(raw.shape[:-1], dtype=dtype)
+        for name, start, width, count in fields:
+            n_values = 1 if count is None else count
+            field_bits = bits[..., start:start+width*n_values]
+            # single bit flags need no conversion
+            if width == 1:
+                value = field_bits
+            else:
+                field_bits = field_bits.reshape(
+                    field_bits.shape[:-1] + (n_values, width))
+                weights = 2**np.arange(width-1, -1, -1, dtype=np.uint64)
+                value = np.dot(field_bits.astype(np.uint64), weights)
+            if count is None:
+                value = value[..., 0]
+            decoded[name] = value
+        return decoded
+
+    return MDSNode(con.name, ("u1", (n_bytes, )), dtype, decoder)
+
+
+def _get_static_length(field):
+    """ Length of a construct field (bytes, or bits in bit structures) """
+    if isinstance(field, StaticField):
+        return field.length
+    raise ValueError("dynamic field length not supported: %s" % str(field))
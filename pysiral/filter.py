@@ -7,6 +7,7 @@ Created on Sat Apr 23 15:30:53 2016
 from pysiral.config import options_from_dictionary
 from pysiral.logging import DefaultLoggingClass
 from pysiral.flag import FlagContainer, ORCondition
+from pysiral.rolling import window_nanmean
 
 from scipy.interpolate import interp1d
 from astropy.convolution import convolve
@@ -101,16 +102,22 @@ def astropy_smooth(x, window):
 
 
 def idl_smooth(x, window):
-    """ Implementation of the IDL smooth(x, window, /EDGGE_TRUNCATE, /NAN)"""
+    """ Implementation of the IDL smooth(x, window, /EDGGE_TRUNCATE, /NAN)
+    The window is centered on each element and shrinks symmetrically
+    towards the edges of the array. NaN's are ignored (result is NaN if
+    all values in the window are NaN) """
     smoothed = np.copy(x)*np.nan
     n = len(x)
-    for i in np.arange(n):
-        kernel_halfsize = np.floor((window-1)/2).astype(int)
-        if (i < kernel_halfsize):
-            kernel_halfsize = i
-        if (n-1-i < kernel_halfsize):
-            kernel_halfsize = n-1-i
-        smoothed[i] = np.nanmean(x[i-kernel_halfsize:i+kernel_halfsize+1])
+    if n == 0:
+        return smoothed
+
+    # Half size of the window for each element (shrinking at the edges)
+    kernel_halfsize = max(int(np.floor((window-1)/2)), 0)
+    index = np.arange(n)
+    halfsize = np.minimum(kernel_halfsize, np.minimum(index, n-1-index))
+
+    # Mean of each window from cumulative sums
+    smoothed[:] = window_nanmean(x, index-halfsize, index+halfsize+1)
     return smoothed
 
 
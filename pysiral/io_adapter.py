@@ -12,9 +12,8 @@ from pysiral.ers.sgdrfile import ERSSGDR
 from pysiral.icesat.glah13 import GLAH13HDF
 from pysiral.sentinel3.sral_l1b import Sentinel3SRALL1b
 
-from pysiral.cryosat2.functions import (
-    get_tai_datetime_from_timestamp, get_cryosat2_wfm_power,
-    get_cryosat2_wfm_range)
+from pysiral.cryosat2.functions import get_cryosat2_wfm_range
+from pysiral.esa.functions import get_mdsr_datetime64
 from pysiral.classifier import (CS2OCOGParameter, CS2PulsePeakiness,
                                 EnvisatWaveformParameter)
 
@@ -22,14 +21,12 @@ from pysiral.clocks import UTCTAIConverter
 from pysiral.esa.functions import get_structarr_attr
 from pysiral.flag import ORCondition
 from pysiral.helper import parse_datetime_str
+from pysiral.output import NCDateNumDef
 from pysiral.path import filename_from_path
 from pysiral.surface_type import ESA_SURFACE_TYPE_DICT
 from pysiral.waveform import (get_waveforms_peak_power, TFMRALeadingEdgeWidth,
                               get_sar_sigma0)
 
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
-from netCDF4 import num2date
 import numpy as np
 
 
@@ -166,43 +163,46 @@ class L1bAdapterCryoSat(object):
         # Transfer the timestamp
         tai_objects = get_structarr_attr(
             self.cs2l1b.time_orbit, "tai_timestamp")
-        tai_timestamp = get_tai_datetime_from_timestamp(tai_objects)
+        tai_timestamp = get_mdsr_datetime64(tai_objects)
 
         # Convert the TAI timestamp to UTC
-        # XXX: Note, the leap seconds are only corrected based on the
-        # first timestamp to avoid having identical timestamps.
-        # In the unlikely case this will cause problems in orbits that
-        # span over a leap seconds change, set check_all=True
+        # NOTE: The leap seconds are only looked up for the first timestamp
+        # (the converter default is a lookup for each record). In orbits
+        # that span over a leap second change, a lookup for each record
+        # would set the timestamps back by one second, but the l1b
+        # timestamps need to be monotonic (e.g. for the gap detection)
         converter = UTCTAIConverter()
-        utc_timestamp = converter.tai2utc(tai_timestamp, check_all=False)
+        utc_timestamp = converter.tai2utc_datetime64(
+            tai_timestamp, check_all=False)
         self.l1b.time_orbit.timestamp = utc_timestamp
 
     def _transfer_waveform_collection(self):
 
-        # Create the numpy arrays for power & range
-        dtype = np.float32
-        n_records = len(self.cs2l1b.waveform)
-        n_range_bins = len(self.cs2l1b.waveform[0].wfm)
-        echo_power = np.ndarray(shape=(n_records, n_range_bins), dtype=dtype)
-        echo_range = np.ndarray(shape=(n_records, n_range_bins), dtype=dtype)
+        # Waveform counts and scaling factors of all records
+        waveform = self.cs2l1b.waveform
+        counts = waveform["wfm"].astype(np.float32)
+        n_range_bins = counts.shape[1]
+        window_delay = self.cs2l1b.measurement["window_delay"]
 
         # Set the echo power in dB and calculate range
         # XXX: This might need to be switchable
-        for i, record in enumerate(self.cs2l1b.waveform):
-            echo_power[i, :] = get_cryosat2_wfm_power(
-                np.array(record.wfm).astype(np.float32),
-                record.linear_scale, record.power_scale)
-            echo_range[i, :] = get_cryosat2_wfm_range(
-                self.cs2l1b.measurement[i].window_delay, n_range_bins)
-
-            # Transfer to L1bData
+        # (the scaling factors are applied in single precision as in the
+        #  record-by-record computation with get_cryosat2_wfm_power)
+        linear_scale = waveform["linear_scale"]*1e-9
+        power_scale = 2.0**waveform["power_scale"]
+        echo_power = counts * linear_scale.astype(np.float32)[:, np.newaxis]
+        echo_power *= power_scale.astype(np.float32)[:, np.newaxis]
+        echo_range = get_cryosat2_wfm_range(
+            window_delay[:, np.newaxis], n_range_bins).astype(np.float32)
+
+        # Transfer to L1bData
         self.l1b.waveform.set_waveform_data(
             echo_power, echo_range, self.cs2l1b.radar_mode)
 
     def _transfer_range_corrections(self):
         # Transfer all the correction in the list
         # TODO: This is too complicated. The unification of grc names should be handled in the l1p config files
-        for key in self.cs2l1b.corrections[0].keys():
+        for key in self.cs2l1b.corrections.dtype.names:
             if key in self._config.CORRECTION_LIST:
                 self.l1b.correction.set_parameter(
                     key, get_structarr_attr(self.cs2l1b.corrections, key))
@@ -226,9 +226,9 @@ class L1bAdapterCryoSat(object):
         beam_parameter_list = [
             "stack_standard_deviation", "stack_centre",
             "stack_scaled_amplitude", "stack_skewness", "stack_kurtosis"]
+        recs = get_structarr_attr(self.cs2l1b.waveform, "beam")
         for beam_parameter_name in beam_parameter_list:
-            recs = get_structarr_attr(self.cs2l1b.waveform, "beam")
-            beam_parameter = [rec[beam_parameter_name] for rec in recs]
+            beam_parameter = recs[beam_parameter_name]
             self.l1b.classifier.add(beam_parameter, beam_parameter_name)
 
         # Calculate Parameters from waveform counts
@@ -249,12 +249,12 @@ class L1bAdapterCryoSat(object):
 
         # Add the peak power (in Watts)
         # (use l1b waveform power array that is already in physical units)
-        peak_power = get_waveforms_peak_power(self.l1b.waveform.power, dB=True)
+        peak_power = get_waveforms_peak_power(self.l1b.waveform.power_view, dB=True)
         self.l1b.classifier.add(peak_power, "peak_power_db")
 
         # Compute the leading edge width (requires TFMRA retracking)
-        wfm = self.l1b.waveform.power
-        rng = self.l1b.waveform.range
+        wfm = self.l1b.waveform.power_view
+        rng = self.l1b.waveform.range_view
         radar_mode = self.l1b.waveform.radar_mode
         is_ocean = self.l1b.surface_type.get_by_name("ocean").flag
         lew = TFMRALeadingEdgeWidth(rng, wfm, radar_mode, is_ocean)
@@ -265,12 +265,13 @@ class L1bAdapterCryoSat(object):
         self.l1b.classifier.add(lew.fmi, "first_maximum_index")
 
         # Compute sigma nought
-        peak_power = get_waveforms_peak_power(self.l1b.waveform.power)
+        peak_power = get_waveforms_peak_power(self.l1b.waveform.power_view)
         tx_power = get_structarr_attr(self.cs2l1b.measurement, "tx_power")
+        tx_power = tx_power.astype(float)
         altitude = self.l1b.time_orbit.altitude
         v = get_structarr_attr(self.cs2l1b.time_orbit, "satellite_velocity")
+        v = v.astype(float)
         vx2, vy2, vz2 = v[:, 0]**2., v[:, 1]**2., v[:, 2]**2
-        vx2, vy2, vz2 = vx2.astype(float), vy2.astype(float), vz2.astype(float)
         velocity = np.sqrt(vx2+vy2+vz2)
         sigma0 = get_sar_sigma0(peak_power, tx_power, altitude, velocity)
         self.l1b.classifier.add(sigma0, "sigma0")
@@ -386,8 +387,8 @@ class L1bAdapterEnvisat(object):
         self.l1b.classifier.add(sigma0, "sigma0")
 
         # Compute the leading edge width (requires TFMRA retracking)
-        wfm = self.l1b.waveform.power
-        rng = self.l1b.waveform.range
+        wfm = self.l1b.waveform.power_view
+        rng = self.l1b.waveform.range_view
         radar_mode = self.l1b.waveform.radar_mode
         is_ocean = self.l1b.surface_type.get_by_name("ocean").flag
         lew = TFMRALeadingEdgeWidth(rng, wfm, radar_mode, is_ocean)
@@ -460,9 +461,10 @@ class L1bAdapterERS(object):
 
         # Transfer the timestamp
         sgdr_timestamp = self.sgdr.nc.time_20hz.flatten()
-        units = self.settings.sgdr_timestamp_units
-        calendar = self.settings.sgdr_timestamp_calendar
-        timestamp = num2date(sgdr_timestamp, units, calendar)
+        time_def = NCDateNumDef()
+        time_def.units = self.settings.sgdr_timestamp_units
+        time_def.calendar = self.settings.sgdr_timestamp_calendar
+        timestamp = time_def.num_to_datetime64(sgdr_timestamp)
         self.l1b.time_orbit.timestamp = timestamp
 
         # Update meta data container
@@ -518,7 +520,7 @@ class L1bAdapterERS(object):
             self.l1b.classifier.add(nc_parameter.flatten(), parameter_name)
 
         # Add consistent definition of pulse peakiness
-        parameter = EnvisatWaveformParameter(self.l1b.waveform.power)
+        parameter = EnvisatWaveformParameter(self.l1b.waveform.power_view)
         self.l1b.classifier.add(parameter.pulse_peakiness, "pulse_peakiness")
 
     def _transfer_surface_type_data(self):
@@ -605,7 +607,6 @@ class L1bAdapterSentinel3(object):
 
     def _transfer_timeorbit(self):
         """ Extracts the time/orbit data group from the SGDR data """
-        from netCDF4 import num2date
 
         # Transfer the orbit position
         self.l1b.time_orbit.set_position(
@@ -614,10 +615,11 @@ class L1bAdapterSentinel3(object):
             self.sral.nc.alt_20_ku)
 
         # Transfer the timestamp
-        units = self.settings.time_units
-        calendar = self.settings.time_calendar
+        time_def = NCDateNumDef()
+        time_def.units = self.settings.time_units
+        time_def.calendar = self.settings.time_calendar
         seconds = self.sral.nc.time_20_ku
-        timestamp = num2date(seconds, units, calendar)
+        timestamp = time_def.num_to_datetime64(seconds)
         self.l1b.time_orbit.timestamp = timestamp
 
     def _transfer_waveform_collection(self):
@@ -709,7 +711,7 @@ class L1bAdapterSentinel3(object):
             self.l1b.classifier.add(classifier, name)
 
         # Compute sar specific waveform classifiers after Ricker et al. 2014
-        wfm = self.l1b.waveform.power
+        wfm = self.l1b.waveform.power_view
 
         # Get sigma0 (as peak power)
         sigma0 = get_waveforms_peak_power(wfm, dB=True)
@@ -959,12 +961,11 @@ class L1bAdapterICESat(object):
         # Transfer the orbit position
         self.l1b.time_orbit.set_position(lon, lat, alt)
 
-        # Transfer the timestamp (needs to be datetime)
+        # Transfer the timestamp
         # time in glah13 is: seconds since 2000-01-01 12:00:00 UTC
-        timestamp = np.ndarray(time.shape, dtype=object)
-        datum = datetime(2000, 1, 1, 12, 0, 0)
-        for i in np.arange(len(timestamp)):
-            timestamp[i] = datum + relativedelta(seconds=time[i])
+        time_def = NCDateNumDef()
+        time_def.units = "seconds since 2000-01-01 12:00:00"
+        timestamp = time_def.num_to_datetime64(time)
 
         self.l1b.time_orbit.timestamp = timestamp
 
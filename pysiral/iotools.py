@@ -22,9 +22,17 @@ class ReadNC(object):
     """
     Quick & dirty method to parse content of netCDF file into a python object
     with attributes from file variables
+
+    Optional keywords:
+        variables (list): Only read these variables (default: all)
+        selection (dict): Index (int, slice or index list) per dimension
+            name, applied to all variables with this dimension
+            (e.g. {"time": 0, "lat": slice(100, 200)})
+        lazy (bool): Variables are read on first attribute access
     """
     def __init__(self, filename, verbose=False, autoscale=True,
-                 nan_fill_value=False, global_attrs_only=False):
+                 nan_fill_value=False, global_attrs_only=False,
+                 variables=None, selection=None, lazy=False):
         self.error = ErrorStatus()
         self.time_def = NCDateNumDef()
         self.parameters = []
@@ -33,11 +41,30 @@ class ReadNC(object):
         self.autoscale = autoscale
         self.global_attrs_only = global_attrs_only
         self.nan_fill_value = nan_fill_value
+        self.variables = variables
+        self.selection = selection if selection is not None else {}
+        self.lazy = lazy
         self.filename = filename
         self.parameters = []
+        self._lazy_variables = []
         self.read_globals()
         self.read_content()
 
+    def __getattr__(self, name):
+        """ Read lazy variables on first access """
+        lazy_variables = self.__dict__.get("_lazy_variables", [])
+        if name not in lazy_variables:
+            raise AttributeError("%s object has no attribute %s" % (
+                self.__class__.__name__, name))
+        f = self._open()
+        try:
+            variable = self._read_variable(f, name)
+        finally:
+            f.close()
+        setattr(self, name, variable)
+        lazy_variables.remove(name)
+        return variable
+
     def read_globals(self):
         pass
 #        self.gobal_attributes = {}
@@ -50,14 +77,7 @@ class ReadNC(object):
         self.keys = []
 
         # Open the file
-        try:
-            f = Dataset(self.filename)
-        except RuntimeError:
-            msg = "Cannot option netCDF file: %s" % self.filename
-            self.error.add_error("nc-runtime-error", msg)
-            self.error.raise_on_error()
-
-        f.set_auto_scale(self.autoscale)
+        f = self._open()
 
         # Get the global attributes
         for attribute_name in f.ncattrs():
@@ -75,28 +95,56 @@ class ReadNC(object):
 
         # Get the variables
         if not self.global_attrs_only:
-            for key in f.variables.keys():
-
-                variable = f.variables[key][:]
+            if self.variables is None:
+                keys = f.variables.keys()
+            else:
+                keys = [key for key in self.variables if key in f.variables]
+            for key in keys:
 
-                try:
-                    is_float = variable.dtype in ["float32", "float64"]
-                    has_mask = hasattr(variable, "mask")
-                except:
-                    is_float, has_mask = False, False
-
-                if self.nan_fill_value and has_mask and is_float:
-                    is_fill_value = np.where(variable.mask)
-                    variable[is_fill_value] = np.nan
-
-                setattr(self, key, variable)
                 self.keys.append(key)
                 self.parameters.append(key)
+                if self.lazy:
+                    self._lazy_variables.append(key)
+                    continue
+
+                setattr(self, key, self._read_variable(f, key))
                 if self.verbose:
                     print key
-            self.parameters = f.variables.keys()
         f.close()
 
+    def _open(self):
+        try:
+            f = Dataset(self.filename)
+        except RuntimeError:
+            msg = "Cannot option netCDF file: %s" % self.filename
+            self.error.add_error("nc-runtime-error", msg)
+            self.error.raise_on_error()
+        f.set_auto_scale(self.autoscale)
+        return f
+
+    def _read_variable(self, f, key):
+        """ Read a variable (with selection) from the open netCDF file """
+
+        nc_variable = f.variables[key]
+        if len(nc_variable.dimensions) > 0:
+            index = tuple(self.selection.get(dimension, slice(None))
+                          for dimension in nc_variable.dimensions)
+        else:
+            index = slice(None)
+        variable = nc_variable[index]
+
+        try:
+            is_float = variable.dtype in ["float32", "float64"]
+            has_mask = hasattr(variable, "mask")
+        except:
+            is_float, has_mask = False, False
+
+        if self.nan_fill_value and has_mask and is_float:
+            is_fill_value = np.where(variable.mask)
+            variable[is_fill_value] = np.nan
+
+        return variable
+
 
 class NCMaskedGridData(object):
 
@@ -146,10 +194,13 @@ def get_l1bdata_files(mission_id, hemisphere, year, month, config=None,
 
 
 def get_local_l1bdata_files(mission_id, time_range, hemisphere, config=None,
-                            version="default", allow_multiple_baselines=True):
+                            version="default", allow_multiple_baselines=True,
+                            catalog=None):
     """
     Returns a list of l1bdata files for a given mission, hemisphere, version
-    and time range
+    and time range. The files are retrieved from the product catalogue
+    (pysiral.catalog.ProductCatalog) instead of the directory listing if
+    `catalog` is set.
     XXX: Note: this function will slowly replace `get_l1bdata_files`, which
          is limited to full month
     """
@@ -174,11 +225,22 @@ def get_local_l1bdata_files(mission_id, time_range, hemisphere, config=None,
     yyyy, mm = "%04g" % time_range.start.year, "%02g" % time_range.start.month
     l1b_repo = config.local_machine.l1b_repository[mission_id][version].l1bdata
     directory = os.path.join(l1b_repo, hemisphere, yyyy, mm)
-    all_l1bdata_files = sorted(glob.glob(os.path.join(directory, "*.nc")))
+    # (list of filenames and parsed filename attributes)
+    if catalog is not None:
+        products = catalog.get_products(
+            "l1bdata", root=os.path.join(l1b_repo, hemisphere),
+            directory=directory)
+        all_l1bdata = [(product.path, product) for product in products]
+    else:
+        all_l1bdata = []
+        for l1bdata_file in sorted(glob.glob(os.path.join(directory, "*.nc"))):
+            fnattr = PysiralOutputFilenaming()
+            fnattr.parse_filename(l1bdata_file)
+            all_l1bdata.append((l1bdata_file, fnattr))
 
     # 2) First filtering step: Check if different algorithm baseline values
     # exist in the list of l1bdata files
-    algorithm_baselines = [l1bdata_get_baseline(f) for f in all_l1bdata_files]
+    algorithm_baselines = [fnattr.version for f, fnattr in all_l1bdata]
     baselines = np.unique(np.array(algorithm_baselines))
     n_baselines = len(baselines)
     if not allow_multiple_baselines and n_baselines > 1:
@@ -192,8 +254,9 @@ def get_local_l1bdata_files(mission_id, time_range, hemisphere, config=None,
     # 3) Check if files are in requested time range
     # This serves two purporses: a) filter out files with timestamps that do
     # not belong in the directory. b) get a subset if required
-    l1bdata_files_checked = [l1bdata_file for l1bdata_file in all_l1bdata_files
-                             if l1bdata_in_trange(l1bdata_file, time_range)]
+    l1bdata_files_checked = [l1bdata_file for l1bdata_file, fnattr
+                             in all_l1bdata
+                             if filename_in_trange(fnattr, time_range)]
 
     # Done return list (empty or not)
     return l1bdata_files_checked, directory
@@ -204,6 +267,12 @@ def l1bdata_in_trange(fn, tr):
     # Parse infos from l1bdata filename
     fnattr = PysiralOutputFilenaming()
     fnattr.parse_filename(fn)
+    return filename_in_trange(fnattr, tr)
+
+
+def filename_in_trange(fnattr, tr):
+    """ Returns flag if parsed filename attributes (start, stop) are
+    within time range """
     # Compute overlap between two start/stop pairs
     is_overlap = fnattr.start <= tr.stop and fnattr.stop >= tr.start
     return is_overlap
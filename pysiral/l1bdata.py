@@ -93,16 +93,14 @@ from pysiral.surface_type import SurfaceType
 from pysiral.output import NCDateNumDef
 from pysiral.config import RadarModes
 
-from netCDF4 import Dataset, num2date, date2num
+from netCDF4 import Dataset, num2date
 from collections import OrderedDict
+from contextlib import contextmanager
 import numpy as np
 import copy
 import os
 
 
-DATE2NUM_UNIT = "seconds since 1970-01-01 00:00:00.0"
-
-
 class Level1bData(object):
     """
     Unified L1b Data Class
@@ -187,8 +185,7 @@ class Level1bData(object):
 
         # Get the time stamp and the time increment in seconds
         time = self.time_orbit.timestamp
-        timedelta = np.ediff1d(time)
-        timedelta_secs = [td.seconds+td.microseconds/1e6 for td in timedelta]
+        timedelta_secs = np.diff(time) / np.timedelta64(1, "s")
 
         # Compute thresholds
         median_timedelta_secs = np.nanmedian(timedelta_secs)
@@ -251,8 +248,10 @@ class Level1bData(object):
         info.set_attribute("lat_max", np.nanmax(self.time_orbit.latitude))
         info.set_attribute("lon_min", np.nanmin(self.time_orbit.longitude))
         info.set_attribute("lon_max", np.nanmax(self.time_orbit.longitude))
-        info.set_attribute("start_time", self.time_orbit.timestamp[0])
-        info.set_attribute("stop_time", self.time_orbit.timestamp[-1])
+        time_range = self.time_orbit.timestamp[[0, -1]].astype(object)
+        start_time, stop_time = time_range
+        info.set_attribute("start_time", start_time)
+        info.set_attribute("stop_time", stop_time)
 
     def update_waveform_statistics(self):
         """ Compute waveform metadata attributes """
@@ -314,7 +313,8 @@ class Level1bData(object):
             preferred location of the maximum of the waveform in the subset
         """
         # Extract original waveform
-        orig_power, orig_range = self.waveform.power, self.waveform.range
+        orig_power = self.waveform.power_view
+        orig_range = self.waveform.range_view
         n_records, n_bins = orig_power.shape
         # Get the bin with the waveform maximum
         max_index = np.argmax(orig_power, axis=1)
@@ -323,10 +323,6 @@ class Level1bData(object):
         trail_bins = target_count-lead_bins
         # Get the start/stop indeces for each waveform
         start, stop = max_index - lead_bins, max_index + trail_bins
-        # Create new arrays
-        rebin_shape = (n_records, target_count)
-        power = np.ndarray(shape=rebin_shape, dtype=orig_power.dtype)
-        range = np.ndarray(shape=rebin_shape, dtype=orig_range.dtype)
         # Validity check
         overflow = np.where(stop > n_bins)[0]
         if len(overflow) > 0:
@@ -340,9 +336,11 @@ class Level1bData(object):
             stop[underflow] -= offset
             start[underflow] -= offset
         # Extract the waveform with reduced bin count
-        for i in np.arange(n_records):
-            power[i, :] = orig_power[i, start[i]:stop[i]]
-            range[i, :] = orig_range[i, start[i]:stop[i]]
+        # (new arrays of shape (n_records, target_count))
+        records = np.arange(n_records)[:, np.newaxis]
+        bins = start[:, np.newaxis] + np.arange(target_count)
+        power = orig_power[records, bins]
+        range = orig_range[records, bins]
         # Push to waveform container
         self.waveform.set_waveform_data(power, range, self.radar_modes)
 
@@ -449,6 +447,9 @@ class L1bConstructor(Level1bData):
 
 
 class L1bdataNCFile(Level1bData):
+    """ Level1bData container for l1bdata netCDF files. Data groups can be
+    parsed selectively, groups that are not parsed are loaded from the file
+    on first access """
 
     def __init__(self, filename):
 
@@ -457,17 +458,72 @@ class L1bdataNCFile(Level1bData):
         self.nc = None
         self.time_def = NCDateNumDef()
         self.ncattrs_ignore_list = ['_NCProperties']
+        # Empty containers of data groups that have not been loaded yet
+        self._lazy_groups = {}
 
-    def parse(self):
-        """ populated the L1b data container from the l1bdata netcdf file """
+    def parse(self, groups=None, variables=None):
+        """
+        populated the L1b data container from the l1bdata netcdf file
+
+        Keywords:
+            groups (str list)
+                data groups that are read from the file (default: all),
+                the metadata is always read. Other data groups are read on
+                first access
+            variables (str list)
+                names of the variables in the parameter groups (correction,
+                classifier) that are read (default: all)
+        """
+        if groups is None:
+            groups = self.data_groups
+        with self._open():
+            self._import_metadata()
+            for data_group in groups:
+                self._import_data_group(data_group, variables=variables)
+        self._lazy_groups = dict(
+            (data_group, self.__dict__.pop(data_group))
+            for data_group in self.data_groups if data_group not in groups)
+
+    def __getattr__(self, name):
+        """ Loads data groups that have not been parsed on first access
+        (only called if the attribute does not exist) """
+        lazy_groups = self.__dict__.get("_lazy_groups", {})
+        if name not in lazy_groups:
+            raise AttributeError("'%s' object has no attribute '%s'" % (
+                self.__class__.__name__, name))
+        setattr(self, name, lazy_groups.pop(name))
+        with self._open():
+            self._import_data_group(name)
+        return getattr(self, name)
+
+    @contextmanager
+    def _open(self):
+        """ Context manager for the netCDF file handle (self.nc) """
         self.nc = Dataset(self.filename, "r")
-        self._import_metadata()
-        self._import_timeorbit()
-        self._import_waveforms()
-        self._import_corrections()
-        self._import_surface_type()
-        self._import_classifier()
-        self.nc.close()
+        try:
+            yield self.nc
+        finally:
+            self.nc.close()
+            self.nc = None
+
+    def _import_data_group(self, data_group, variables=None):
+        if data_group == "time_orbit":
+            self._import_timeorbit()
+        elif data_group == "waveform":
+            self._import_waveforms()
+        elif data_group == "correction":
+            self._import_corrections(variables=variables)
+        elif data_group == "surface_type":
+            self._import_surface_type()
+        elif data_group == "classifier":
+            self._import_classifier(variables=variables)
+        else:
+            raise ValueError("Unknown l1bdata group: %s" % str(data_group))
+
+    @property
+    def lazy_groups(self):
+        """ Names of the data groups that have not been loaded yet """
+        return sorted(self._lazy_groups.keys())
 
     def _import_metadata(self):
         """
@@ -500,11 +556,9 @@ class L1bdataNCFile(Level1bData):
             datagroup.variables["longitude"][:],
             datagroup.variables["latitude"][:],
             datagroup.variables["altitude"][:])
-        # Convert the timestamp to datetimes
-        self.time_orbit.timestamp = num2date(
-             datagroup.variables["timestamp"][:],
-             self.time_def.units,
-             calendar=self.time_def.calendar)
+        # Convert the timestamp to datetime64
+        self.time_orbit.timestamp = self.time_def.num_to_datetime64(
+             datagroup.variables["timestamp"][:])
 
     def _import_waveforms(self):
         """
@@ -522,7 +576,7 @@ class L1bdataNCFile(Level1bData):
         is_valid = datagroup.variables["is_valid"][:].astype(bool)
         self.waveform.set_valid_flag(is_valid)
 
-    def _import_corrections(self):
+    def _import_corrections(self, variables=None):
         """
         transfers l1b corrections group
         (waveform corrections in l1bdata netCDF files)
@@ -531,6 +585,8 @@ class L1bdataNCFile(Level1bData):
         datagroup = self.nc.groups["correction"]
         # Loop over parameters
         for key in datagroup.variables.keys():
+            if variables is not None and key not in variables:
+                continue
             variable = np.array(datagroup.variables[key][:])
             self.correction.set_parameter(key, variable)
 
@@ -543,7 +599,7 @@ class L1bdataNCFile(Level1bData):
         datagroup = self.nc.groups["surface_type"]
         self.surface_type.set_flag(datagroup.variables["flag"][:])
 
-    def _import_classifier(self):
+    def _import_classifier(self, variables=None):
         """
         transfers l1b corrections group
         (waveform corrections in l1bdata netCDF files)
@@ -552,6 +608,8 @@ class L1bdataNCFile(Level1bData):
         datagroup = self.nc.groups["classifier"]
         # Loop over parameters
         for key in datagroup.variables.keys():
+            if variables is not None and key not in variables:
+                continue
             variable = np.array(datagroup.variables[key][:])
             self.classifier.add(variable, key)
 
@@ -658,13 +716,31 @@ class L1bTimeOrbit(object):
 
     @property
     def timestamp(self):
+        """ UTC time of each record (numpy.datetime64[us]) """
         return np.array(self._timestamp)
 
     @timestamp.setter
     def timestamp(self, value):
+        """ Accepts datetime objects or numpy.datetime64 values """
         if self._info is not None:
             self._info.check_n_records(len(value))
-        self._timestamp = value
+        self._timestamp = np.asarray(value, dtype="datetime64[us]")
+
+    @property
+    def timestamp_seconds(self):
+        """ Time of each record in seconds since 1970-01-01 (float) """
+        delta = self._timestamp - np.datetime64("1970-01-01T00:00:00", "us")
+        return delta / np.timedelta64(1, "s")
+
+    @property
+    def datetime(self):
+        """ Time of each record as datetime objects """
+        return self._timestamp.astype(object)
+
+    @property
+    def start_datetime(self):
+        """ Time of the first record as datetime object """
+        return self._timestamp[0].astype(object)
 
     @property
     def parameter_list(self):
@@ -722,10 +798,11 @@ class L1bTimeOrbit(object):
             geoloc_parameters.append(data_corr)
         self.set_position(*geoloc_parameters)
 
-        # Update the timestamp
-        time_old_num = date2num(self.timestamp, DATE2NUM_UNIT)
+        # Update the timestamp (interpolated in microseconds)
+        time_old_num = self._timestamp.astype(np.int64)
         time_num = np.interp(corrected_indices, indices_map, time_old_num)
-        self.timestamp = num2date(time_num, DATE2NUM_UNIT)
+        self.timestamp = np.round(time_num).astype(np.int64).astype(
+            "datetime64[us]")
 
 #        import matplotlib.pyplot as plt
 #        plt.figure("time")
@@ -894,12 +971,24 @@ class L1bWaveforms(object):
 
     @property
     def power(self):
+        """ Copy of the waveform power (use power_view for read access) """
         return np.copy(self._power)
 
     @property
     def range(self):
+        """ Copy of the waveform range (use range_view for read access) """
         return np.copy(self._range)
 
+    @property
+    def power_view(self):
+        """ Read-only view of the waveform power (no copy) """
+        return get_readonly_view(self._power)
+
+    @property
+    def range_view(self):
+        """ Read-only view of the waveform range (no copy) """
+        return get_readonly_view(self._range)
+
     @property
     def radar_mode(self):
         return self._radar_mode
@@ -972,8 +1061,8 @@ class L1bWaveforms(object):
         self._is_valid = valid_flag
 
     def append(self, annex):
-        self._power = np.concatenate((self._power, annex.power), axis=0)
-        self._range = np.concatenate((self._range, annex.range), axis=0)
+        self._power = np.concatenate((self._power, annex.power_view), axis=0)
+        self._range = np.concatenate((self._range, annex.range_view), axis=0)
         self._radar_mode = np.append(self._radar_mode, annex.radar_mode)
         self._is_valid = np.append(self._is_valid, annex.is_valid)
 
@@ -984,11 +1073,13 @@ class L1bWaveforms(object):
         self._is_valid = self._is_valid[subset_list]
 
     def add_range_delta(self, range_delta):
-        # XXX: Should range delta needs to be reshaped?
-        range_delta_reshaped = np.repeat(range_delta, self.n_range_bins)
-        range_delta_reshaped = range_delta_reshaped.reshape(
-            self.n_records, self.n_range_bins)
-        self._range += range_delta_reshaped
+        """ Adds a range correction (one value per record) to the range of
+        all range bins. Copy-on-write: views of the previous range array
+        (range_view) are not modified """
+        range_delta = np.asarray(range_delta).reshape(self.n_records, 1)
+        rng = np.array(self._range)
+        rng += range_delta
+        self._range = rng
 
     def fill_gaps(self, corrected_n_records, gap_indices, indices_map):
         """ API gap filler method. Note: Gaps will be filled with
@@ -1001,9 +1092,9 @@ class L1bWaveforms(object):
 
         # Power/range: set gaps to nan
         power = np.full((corrected_n_records, self.n_range_bins), np.nan)
-        power[indices_map, :] = self.power
+        power[indices_map, :] = self.power_view
         range = np.full((corrected_n_records, self.n_range_bins), np.nan)
-        range[indices_map, :] = self.range
+        range[indices_map, :] = self.range_view
 
         # Radar map: set gaps to lrm
         radar_mode = np.full((corrected_n_records), 1,
@@ -1018,6 +1109,15 @@ class L1bWaveforms(object):
         return shape[index]
 
 
+def get_readonly_view(array):
+    """ Returns a view of an array that cannot be modified (None for None) """
+    if array is None:
+        return None
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
 def get_l1b_adapter(mission):
     """ Select and returns the correct IO Adapter for the specified mission """
 
@@ -15,7 +15,6 @@ from pysiral.output import (PysiralOutputFilenaming, PysiralOutputFolder,
                             L1bDataNC)
 from pysiral.path import filename_from_path
 
-from datetime import timedelta
 import numpy as np
 import os
 import glob
@@ -249,7 +248,6 @@ class L1bPreProc(DefaultLoggingClass):
         # Prepare input (should always be list)
         if not isinstance(l1b_list, list):
             l1b_list = [l1b_list]
-        dt_threshold = timedelta(seconds=seconds_threshold)
 
         # Output (list with l1b segments)
         l1b_segments = []
@@ -261,8 +259,9 @@ class L1bPreProc(DefaultLoggingClass):
 
             # Get start start/stop indices pairs
             segments_start = np.array([0])
+            timedelta_secs = np.diff(time) / np.timedelta64(1, "s")
             segments_start_indices = np.where(
-                    np.ediff1d(time) > dt_threshold)[0]+1
+                    timedelta_secs > seconds_threshold)[0]+1
             segments_start = np.append(segments_start, segments_start_indices)
 
             segments_stop = segments_start[1:]-1
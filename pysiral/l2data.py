@@ -397,8 +397,9 @@ class Level2Data(object):
         return self.period.duration_isoformat
 
     def _get_attr_time_resolution(self, *args):
-        tdelta = self.timestamp[-1]-self.timestamp[0]
-        seconds = tdelta.total_seconds() + 1e-6 * tdelta.microseconds
+        time_range = np.asarray(self.timestamp[[0, -1]],
+                                dtype="datetime64[us]")
+        seconds = np.diff(time_range)[0] / np.timedelta64(1, "s")
         resolution = seconds/self.n_records
         return "%.2f seconds" % resolution
 
@@ -613,21 +614,49 @@ class L2ElevationArray(np.ndarray):
 
 
 class Level2PContainer(DefaultLoggingClass):
+    """ Merges the valid records (finite values of parameter `valid_mask`)
+    of l2i objects. The records are copied to preallocated buffers when the
+    l2i object is added, l2i objects are not kept in the container """
 
-    def __init__(self, period):
+    def __init__(self, period, valid_mask="freeboard"):
         super(Level2PContainer, self).__init__(self.__class__.__name__)
         self.error = ErrorStatus()
         self._period = period
-        self._l2i_stack = []
+        self._valid_mask = valid_mask
+        self._n_l2i_objects = 0
+        # Metadata and parameter list of the first l2i object
+        self._l2i_info = None
+        self._parameter_list = None
+        # Merged records (buffers with capacity >= n_records)
+        self._buffers = {}
+        self._n_records = 0
 
     def append_l2i(self, l2i):
-        self._l2i_stack.append(l2i)
+        """ Copies the valid records of a l2i object to the merged data
+        (all l2i objects are assumed to share the same parameter list) """
+        if self._parameter_list is None:
+            self._l2i_info = l2i.info
+            self._parameter_list = list(l2i.parameter_list)
+        if self._valid_mask is not None:
+            valid_mask_parameter = getattr(l2i, self._valid_mask)
+            is_valid = np.where(np.isfinite(valid_mask_parameter))[0]
+        else:
+            is_valid = np.arange(l2i.n_records)
+        for parameter in self._parameter_list:
+            stack_data = getattr(l2i, parameter)
+            self._add_to_buffer(parameter, stack_data[is_valid])
+        self._n_records += len(is_valid)
+        self._n_l2i_objects += 1
 
     def get_merged_l2(self):
         """ Returns a Level2Data object with data from all l2i objects """
 
+        # No l2i object has been added
+        if self._parameter_list is None:
+            return None
+
         # Merge the parameter
-        data = self._get_merged_data(valid_mask="freeboard")
+        data = self._get_merged_data()
 
         # There are rare occasion, where no valid freeboard data is found for an entire day
         if len(data["longitude"]) == 0:
@@ -637,8 +666,8 @@ class Level2PContainer(DefaultLoggingClass):
         timeorbit = Level2iTimeOrbit()
         timeorbit.from_l2i_stack(data)
 
-        # Use the first l2i object in stack to retrieve metadata
-        l2i = self._l2i_stack[0]
+        # Use the metadata of the first l2i object
+        info = self._l2i_info
 
         # Set up a metadata container
         metadata = Level2iMetadata()
@@ -654,28 +683,26 @@ class Level2PContainer(DefaultLoggingClass):
 
         # Retrieve the following constant attributes from the first
         # l2i object in the stack
-        info = self.l2i_stack[0].info
-
         # Old notation (for backward compability)
         try:
             mission_id = info.mission_id
             # Transfer auxdata information
-            metadata.source_auxdata_sic = l2i.info.source_sic
-            metadata.source_auxdata_snow = l2i.info.source_snow
-            metadata.source_auxdata_sitype = l2i.info.source_sitype
-            metadata.source_auxdata_mss = l2i.info.source_mss
+            metadata.source_auxdata_sic = info.source_sic
+            metadata.source_auxdata_snow = info.source_snow
+            metadata.source_auxdata_sitype = info.source_sitype
+            metadata.source_auxdata_mss = info.source_mss
 
         # New (fall 2017) pysiral product notaion
         except AttributeError:
             mission_id = info.source_mission_id
             # Transfer auxdata information
-            metadata.source_auxdata_sic = l2i.info.source_auxdata_sic
-            metadata.source_auxdata_snow = l2i.info.source_auxdata_snow
-            metadata.source_auxdata_sitype = l2i.info.source_auxdata_sitype
-            metadata.source_auxdata_mss = l2i.info.source_auxdata_mss
+            metadata.source_auxdata_sic = info.source_auxdata_sic
+            metadata.source_auxdata_snow = info.source_auxdata_snow
+            metadata.source_auxdata_sitype = info.source_auxdata_sitype
+            metadata.source_auxdata_mss = info.source_auxdata_mss
 
         try:
-            metadata.timeliness = l2i.info.source_timeliness
+            metadata.timeliness = info.source_timeliness
         except AttributeError:
             pass
 
@@ -690,7 +717,7 @@ class Level2PContainer(DefaultLoggingClass):
 
         # 1. Get the list of parameters
         # (assumuning all l2i files share the same)
-        parameter_list_all = l2i.parameter_list
+        parameter_list_all = self._parameter_list
 
         # 2. Exclude variables that end with `_uncertainty`
         parameter_list = [p for p in parameter_list_all
@@ -725,37 +752,41 @@ class Level2PContainer(DefaultLoggingClass):
 
         return l2
 
-    def _get_merged_data(self, valid_mask=None):
+    def _get_merged_data(self):
         """ Returns a dict with merged data groups for all parameters
         in the l2i file (assumed to be identical for all files in the stack
         """
-        parameter_list = self.l2i_stack[0].parameter_list
-        data = self._get_empty_data_group(parameter_list)
-        for l2i in self.l2i_stack:
-            if valid_mask is not None:
-                valid_mask_parameter = getattr(l2i, valid_mask)
-                is_valid = np.where(np.isfinite(valid_mask_parameter))[0]
-            else:
-                is_valid = np.arange(l2i.n_records)
-            for parameter in parameter_list:
-                stack_data = getattr(l2i, parameter)
-                stack_data = stack_data[is_valid]
-                data[parameter] = np.append(data[parameter], stack_data)
-        return data
-
-    def _get_empty_data_group(self, parameter_list):
-        data = {}
-        for parameter_name in parameter_list:
-            data[parameter_name] = np.array([], dtype=np.float32)
-        return data
+        return dict((parameter, self._buffers[parameter][:self._n_records])
+                    for parameter in self._parameter_list)
+
+    def _add_to_buffer(self, parameter, stack_data):
+        """ Copies data to the end of the merged data buffer of a parameter.
+        The buffer capacity grows in amortised chunks (doubling), the data
+        type is promoted as for np.append (float32 at minimum) """
+        n0, n1 = self._n_records, self._n_records+len(stack_data)
+        buffer = self._buffers.get(parameter, None)
+        if buffer is None:
+            dtype = np.promote_types(np.float32, stack_data.dtype)
+            capacity = 0
+        else:
+            dtype = np.promote_types(buffer.dtype, stack_data.dtype)
+            capacity = len(buffer)
+        if buffer is None or n1 > capacity or dtype != buffer.dtype:
+            capacity = max(n1, 2*capacity) if n1 > capacity else capacity
+            new_buffer = np.empty(capacity, dtype=dtype)
+            if buffer is not None:
+                new_buffer[:n0] = buffer[:n0]
+            buffer = new_buffer
+            self._buffers[parameter] = buffer
+        buffer[n0:n1] = stack_data
 
     @property
-    def l2i_stack(self):
-        return self._l2i_stack
+    def n_l2i_objects(self):
+        return self._n_l2i_objects
 
     @property
-    def n_l2i_objects(self):
-        return len(self.l2i_stack)
+    def n_records(self):
+        return self._n_records
 
     @property
     def period(self):
@@ -774,9 +805,14 @@ class AttributeList(object):
 class L2iNCFileImport(object):
     # TODO: Needs proper implementation
 
-    def __init__(self, filename):
+    # Variables that are always read if only a subset of variables
+    # is requested
+    MANDATORY_VARIABLES = ["time", "timestamp", "longitude", "latitude"]
+
+    def __init__(self, filename, variables=None):
         from pysiral.output import NCDateNumDef
         self.filename = filename
+        self.variables = variables
         self._n_records = 0
         self.time_def = NCDateNumDef()
         self.info = AttributeList()
@@ -788,7 +824,11 @@ class L2iNCFileImport(object):
         from pysiral.path import file_basename
         from netCDF4 import num2date
 
-        content = ReadNC(self.filename)
+        variables = self.variables
+        if variables is not None:
+            variables = list(self.MANDATORY_VARIABLES) + \
+                [v for v in variables if v not in self.MANDATORY_VARIABLES]
+        content = ReadNC(self.filename, variables=variables)
 
         for attribute_name in content.attributes:
             self.attribute_list.append(attribute_name)
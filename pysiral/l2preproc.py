@@ -35,11 +35,12 @@ class Level2PreProcessor(DefaultLoggingClass):
         """ Reads all l2i files and merges the valid data into a l2p
         summary file """
 
-        # l2p: Container for storing l2i objects
+        # l2p: Container for merging the valid records of l2i objects
         l2p = Level2PContainer(period)
 
         # Add all l2i objects to the l2p container.
-        # NOTE: Only memory is the limit
+        # NOTE: Only the valid records are kept, each l2i object is
+        #       released after it has been added
         for l2i_file in l2i_files:
             try:
                 l2i = L2iNCFileImport(l2i_file)
@@ -9,6 +9,7 @@ from pysiral.config import (td_branches, ConfigInfo, TimeRangeRequest,
                             get_yaml_config, PYSIRAL_VERSION, HOSTNAME)
 from pysiral.errorhandler import ErrorStatus, PYSIRAL_ERROR_CODES
 from pysiral.datahandler import DefaultAuxdataHandler
+from pysiral.auxdata import AUXDATA_CACHE
 from pysiral.l1bdata import L1bdataNCFile
 from pysiral.iotools import get_local_l1bdata_files
 from pysiral.l2data import Level2Data
@@ -30,6 +31,7 @@ from isodate.duration import Duration
 
 from collections import deque, OrderedDict
 from datetime import datetime
+import multiprocessing
 import time
 import glob
 import sys
@@ -38,16 +40,23 @@ import os
 
 class Level2Processor(DefaultLoggingClass):
 
-    def __init__(self, product_def, auxdata_handler=None):
+    def __init__(self, product_def, auxdata_handler=None, workers=1):
 
         super(Level2Processor, self).__init__(self.__class__.__name__)
 
         # Error Status Handler
         self.error = ErrorStatus(caller_id=self.__class__.__name__)
 
+        # Product definition (required to set up worker processes)
+        self._product_def = product_def
+
 #        # Level-2 Algorithm Defintion
         self._l2def = product_def.l2def
 
+        # Number of worker processes for the orbit processing
+        # (workers=1: orbits are processed sequentially in this process)
+        self._workers = max(int(workers), 1)
+
         # Auxiliary Data Handler
         if auxdata_handler is None:
             auxdata_handler = DefaultAuxdataHandler()
@@ -57,8 +66,12 @@ class Level2Processor(DefaultLoggingClass):
         self._output_handler = product_def.output_handler
 
         # List of Level-2 (processed) orbit segments
+        # (only available for sequential processing)
         self._orbit = deque()
 
+        # Auxdata cache (hits, misses) of the last orbit processing
+        self._auxdata_cache_counters = (0, 0)
+
         # List of Level-1b input files
         self._l1b_files = []
 
@@ -79,8 +92,22 @@ class Level2Processor(DefaultLoggingClass):
 
     @property
     def orbit(self):
+        """ Collection of Level-2 data objects. The collection is not
+        available for parallel processing, since the Level-2 data objects
+        remain in the worker processes """
+        if self._workers > 1:
+            msg = "orbit collection not available with %g workers" % (
+                self._workers)
+            self.error.add_error("l2proc-no-orbit-collection", msg)
+            self.error.raise_on_error()
         return self._orbit
 
+    @property
+    def auxdata_cache_counters(self):
+        """ Auxdata cache (hits, misses) of the last orbit processing
+        (summed over all worker processes) """
+        return self._auxdata_cache_counters
+
     @property
     def has_empty_file_list(self):
         return len(self._l1b_files) == 0
@@ -202,6 +229,24 @@ class Level2Processor(DefaultLoggingClass):
         # (required for MSS subsetting)
         self._set_roi()
 
+        # Parallel processing: Each worker process creates its own
+        # processor instance with auxiliary data handlers. Loading the
+        # auxiliary data in this process as well is not necessary
+        if self._workers > 1:
+            self.log.info("Auxiliary data is loaded by %g worker processes" % (
+                self._workers))
+        else:
+            self._set_auxdata_handlers()
+
+        # Report on output location
+        self._report_output_location()
+
+        # All done
+        self._initialized = True
+        self.log.info("Initialization complete")
+
+    def _set_auxdata_handlers(self):
+
         # Load static background field
 
         # Read the mean surface height auxiliary file
@@ -219,13 +264,6 @@ class Level2Processor(DefaultLoggingClass):
         # snow data handler (needs to provide snow depth and density)
         self._set_snow_handler()
 
-        # Report on output location
-        self._report_output_location()
-
-        # All done
-        self._initialized = True
-        self.log.info("Initialization complete")
-
     def _set_roi(self):
         self.log.info("Processor Settings - ROI: %s" % self._l2def.roi.pyclass)
         self._roi = get_roi_class(self._l2def.roi.pyclass)
@@ -289,8 +327,12 @@ class Level2Processor(DefaultLoggingClass):
 
     def _l2_processing_of_orbit_files(self):
         """ Orbit-wise level2 processing """
-        # TODO: Evaluate parallelization
         self.log.info("Start Orbit Processing")
+        if self._workers > 1:
+            self._l2_processing_of_orbit_files_parallel()
+            return
+
+        cache_counters = AUXDATA_CACHE.counters
 
         # loop over l1bdata preprocessed orbits
         for i, l1b_file in enumerate(self._l1b_files):
@@ -300,99 +342,157 @@ class Level2Processor(DefaultLoggingClass):
                 i+1, len(self._l1b_files),
                 float(i+1)/float(len(self._l1b_files))*100.))
 
-            # Read the the level 1b file (l1bdata netCDF is required)
-            l1b = self._read_l1b_file(l1b_file)
-            source_primary_filename = os.path.split(l1b_file)[-1]
-
-            # Apply the geophysical range corrections on the waveform range
-            # bins in the l1b data container
-            # TODO: move to level1bData class
-            self._apply_range_corrections(l1b)
-
-            # Apply a pre-filter of the l1b data (can be none)
-            self._apply_l1b_prefilter(l1b)
-
-            # Initialize the orbit level-2 data container
-            try:
-                time_range = TimeRangeRequest(l1b.info.start_time,
-                                              l1b.info.stop_time,
-                                              period="custom")
-                period = time_range.iterations[0]
-            except SystemExit:
-                msg = "Computation of data period caused exception"
-                self.log.warning("[invalid-l1b]", msg)
-                continue
-
-            l2 = Level2Data(l1b.info, l1b.time_orbit, period=period)
-
-            # Add sea ice concentration (can be used as classifier)
-            error_status, error_codes = self._get_sea_ice_concentration(l2)
-            if error_status:
-                self._discard_l1b_procedure(error_codes, l1b_file)
-                continue
-
-            # Get sea ice type (may be required for geometrical corrcetion)
-            error_status, error_codes = self._get_sea_ice_type(l2)
-            if error_status:
-                self._discard_l1b_procedure(error_codes, l1b_file)
-                continue
-
-            # get mss for orbit (this is necessary e.g. for icesat)
-            l2.mss = self._mss.get_track(l2.track.longitude, l2.track.latitude)
-
-            # Surface type classification (ocean, ice, lead, ...)
-            # (ice type classification comes later)
-            # TODO: Add L2 classifiers (ice concentration, ice type)
-            self._classify_surface_types(l1b, l2)
-
-            # Validate surface type classification
-            # yes/no decision on continuing with orbit
-            error_status, error_codes = self._validate_surface_types(l2)
-            if error_status:
-                self._discard_l1b_procedure(error_codes, l1b_file)
+            # Process the orbit segment
+            l2 = self._l2_processing_of_orbit_file(l1b_file)
+            if l2 is None:
                 continue
 
-            # Get elevation by retracking of different surface types
-            # adds parameter elevation to l2
-            error_status, error_codes = self._waveform_retracking(l1b, l2)
-            if error_status:
-                self._discard_l1b_procedure(error_codes, l1b_file)
-                continue
+            # Add data to orbit stack
+            self._add_to_orbit_collection(l2)
 
-            # Compute the sea surface anomaly (from mss and lead tie points)
-            # adds parameter ssh, ssa, afrb to l2
-            self._estimate_sea_surface_height(l2)
+        self._auxdata_cache_counters = tuple(
+            n - n0 for n, n0 in zip(AUXDATA_CACHE.counters, cache_counters))
+        self.log.info("Auxdata cache: %s" % AUXDATA_CACHE.summary)
 
-            # Compute the radar freeboard and its uncertainty
-            self._get_altimeter_freeboard(l1b, l2)
+    def _l2_processing_of_orbit_files_parallel(self):
+        """ Orbit-wise level2 processing distributed to a pool of worker
+        processes. Each worker holds its own Level2Processor instance
+        (and thus its own auxiliary data handlers). The discarded orbit
+        events of all workers are merged into the report of this instance
+        in the order of the l1b file list. Note: The level-2 data objects
+        are not transferred back, the orbit collection is not available """
 
-            # Get snow depth & density
-            error_status, error_codes = self._get_snow_parameters(l2)
-            if error_status:
-                self.report.add_orbit_discarded_event(error_codes, l1b_file)
-                continue
-
-            # get radar(-derived) from altimeter freeboard
-            self._get_freeboard_from_radar_freeboard(l1b, l2)
+        n_files = len(self._l1b_files)
+        if n_files == 0:
+            return
+        n_workers = min(self._workers, n_files)
+        self.log.info("Distribute %g orbits to %g worker processes" % (
+            n_files, n_workers))
+
+        pool = multiprocessing.Pool(
+            processes=n_workers,
+            initializer=_l2proc_worker_initialize,
+            initargs=(self.__class__, self._product_def,
+                      self._auxdata_handler))
+        try:
+            # imap returns results in the order of the input list,
+            # independent of the order the worker finish their orbits
+            results = pool.imap(_l2proc_worker_process_file,
+                                self._l1b_files, chunksize=1)
+            cache_hits, cache_misses = 0, 0
+            for i, (l1b_file, events, cache_counters) in enumerate(results):
+                self.log.info("+ [ %g of %g ] (%.2f%%) %s" % (
+                    i+1, n_files, float(i+1)/float(n_files)*100.,
+                    filename_from_path(l1b_file)))
+                self.report.add_orbit_discarded_events(events)
+                cache_hits += cache_counters[0]
+                cache_misses += cache_counters[1]
+            pool.close()
+            self._auxdata_cache_counters = (cache_hits, cache_misses)
+            self.log.info("Auxdata cache (all workers): %g hits, %g misses" % (
+                cache_hits, cache_misses))
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
 
-            # Apply freeboard filter
-            self._apply_freeboard_filter(l2)
+    def _l2_processing_of_orbit_file(self, l1b_file):
+        """ Level-2 processing of a single l1bdata file. Returns the
+        Level-2 data object or None if the orbit has been discarded """
 
-            # Convert to thickness
-            self._convert_freeboard_to_thickness(l2)
+        # Read the the level 1b file (l1bdata netCDF is required)
+        l1b = self._read_l1b_file(l1b_file)
+        source_primary_filename = os.path.split(l1b_file)[-1]
 
-            # Filter thickness
-            self._apply_thickness_filter(l2)
+        # Apply the geophysical range corrections on the waveform range
+        # bins in the l1b data container
+        # TODO: move to level1bData class
+        self._apply_range_corrections(l1b)
 
-            # Create output files
-            l2.set_metadata(auxdata_source_dict=self.l2_auxdata_source_dict,
-                            source_primary_filename=source_primary_filename,
-                            l2_algorithm_id=self._l2def.id,
-                            l2_version_tag=self._l2def.version_tag)
-            self._create_l2_outputs(l2)
+        # Apply a pre-filter of the l1b data (can be none)
+        self._apply_l1b_prefilter(l1b)
 
-            # Add data to orbit stack
-            self._add_to_orbit_collection(l2)
+        # Initialize the orbit level-2 data container
+        try:
+            time_range = TimeRangeRequest(l1b.info.start_time,
+                                          l1b.info.stop_time,
+                                          period="custom")
+            period = time_range.iterations[0]
+        except SystemExit:
+            msg = "Computation of data period caused exception"
+            self.log.warning("[invalid-l1b]", msg)
+            return None
+
+        l2 = Level2Data(l1b.info, l1b.time_orbit, period=period)
+
+        # Add sea ice concentration (can be used as classifier)
+        error_status, error_codes = self._get_sea_ice_concentration(l2)
+        if error_status:
+            self._discard_l1b_procedure(error_codes, l1b_file)
+            return None
+
+        # Get sea ice type (may be required for geometrical corrcetion)
+        error_status, error_codes = self._get_sea_ice_type(l2)
+        if error_status:
+            self._discard_l1b_procedure(error_codes, l1b_file)
+            return None
+
+        # get mss for orbit (this is necessary e.g. for icesat)
+        l2.mss = self._mss.get_track(l2.track.longitude, l2.track.latitude)
+
+        # Surface type classification (ocean, ice, lead, ...)
+        # (ice type classification comes later)
+        # TODO: Add L2 classifiers (ice concentration, ice type)
+        self._classify_surface_types(l1b, l2)
+
+        # Validate surface type classification
+        # yes/no decision on continuing with orbit
+        error_status, error_codes = self._validate_surface_types(l2)
+        if error_status:
+            self._discard_l1b_procedure(error_codes, l1b_file)
+            return None
+
+        # Get elevation by retracking of different surface types
+        # adds parameter elevation to l2
+        error_status, error_codes = self._waveform_retracking(l1b, l2)
+        if error_status:
+            self._discard_l1b_procedure(error_codes, l1b_file)
+            return None
+
+        # Compute the sea surface anomaly (from mss and lead tie points)
+        # adds parameter ssh, ssa, afrb to l2
+        self._estimate_sea_surface_height(l2)
+
+        # Compute the radar freeboard and its uncertainty
+        self._get_altimeter_freeboard(l1b, l2)
+
+        # Get snow depth & density
+        error_status, error_codes = self._get_snow_parameters(l2)
+        if error_status:
+            self._discard_l1b_procedure(error_codes, l1b_file)
+            return None
+
+        # get radar(-derived) from altimeter freeboard
+        self._get_freeboard_from_radar_freeboard(l1b, l2)
+
+        # Apply freeboard filter
+        self._apply_freeboard_filter(l2)
+
+        # Convert to thickness
+        self._convert_freeboard_to_thickness(l2)
+
+        # Filter thickness
+        self._apply_thickness_filter(l2)
+
+        # Create output files
+        l2.set_metadata(auxdata_source_dict=self.l2_auxdata_source_dict,
+                        source_primary_filename=source_primary_filename,
+                        l2_algorithm_id=self._l2def.id,
+                        l2_version_tag=self._l2def.version_tag)
+        self._create_l2_outputs(l2)
+
+        return l2
 
     def _read_l1b_file(self, l1b_file):
         """ Read a L1b data file (l1bdata netCDF) """
@@ -840,6 +940,12 @@ class L2ProcessorReport(DefaultLoggingClass):
         except:
             self.log.warning("Unknown error code (%s), ignoring" % error_code)
 
+    def add_orbit_discarded_events(self, events):
+        """ Add a list of (error_code, l1b_file) events (e.g. the
+        discarded_events of a report from another process) """
+        for error_code, l1b_file in events:
+            self.add_orbit_discarded_event(error_code, l1b_file)
+
     def write_to_file(self, output_id, directory):
         """ Write a summary file to the defined export directory """
 
@@ -914,6 +1020,42 @@ class L2ProcessorReport(DefaultLoggingClass):
             num_discarded_files += len(self.error_counter[error_code])
         return num_discarded_files
 
+    @property
+    def discarded_events(self):
+        """ List of (error_code, l1b_file) for all discarded orbits """
+        events = []
+        for error_code in self.error_counter.keys():
+            for l1b_file in self.error_counter[error_code]:
+                events.append((error_code, l1b_file))
+        return events
+
     @property
     def n_warnings(self):
         return 0
+
+
+# %% Worker process functions for parallel orbit processing
+
+# Level2Processor instance of the worker process
+# (set by the pool initializer, one instance per process)
+_L2PROC_WORKER = None
+
+
+def _l2proc_worker_initialize(processor_class, product_def,
+                              auxdata_handler):
+    """ Pool initializer: Create a (sequential) Level-2 processor instance
+    with its own auxiliary data handlers for this worker process """
+    global _L2PROC_WORKER
+    _L2PROC_WORKER = processor_class(product_def,
+                                     auxdata_handler=auxdata_handler)
+
+
+def _l2proc_worker_process_file(l1b_file):
+    """ Process a single l1bdata file in the worker process and return
+    the list of discarded orbit events (error_code, l1b_file) and the
+    auxdata cache (hits, misses) of this file """
+    l2proc = _L2PROC_WORKER
+    l2proc.report.clean_up()
+    AUXDATA_CACHE.reset_counters()
+    l2proc._l2_processing_of_orbit_file(l1b_file)
+    return l1b_file, l2proc.report.discarded_events, AUXDATA_CACHE.counters
@@ -13,7 +13,6 @@ from pysiral.logging import DefaultLoggingClass
 from pysiral.l2data import L2iNCFileImport
 from pysiral.mask import L3Mask
 from pysiral.output import OutputHandlerBase, Level3Output
-from pysiral.flag import ORCondition
 from pysiral.surface_type import SurfaceType
 from pysiral.sit import frb2sit_errprop
 
@@ -54,6 +53,9 @@ class Level3Processor(DefaultLoggingClass):
         self.log.info("Parsing products (prefilter active: %s)" % (
                 str(self._job.l3def.l2i_prefilter.active)))
 
+        # Only read the l2i variables that are required for gridding
+        l2i_variables = self._get_l2i_variables()
+
         # Parse all orbit files and add to the stack
         for i, l2i_file in enumerate(l2i_files):
 
@@ -61,7 +63,7 @@ class Level3Processor(DefaultLoggingClass):
 
             # Parse l2i source file
             try: 
-                l2i = L2iNCFileImport(l2i_file)
+                l2i = L2iNCFileImport(l2i_file, variables=l2i_variables)
             except AttributeError:
                 self.log.warning("Attribute Error encountered in %s" % l2i_file)
                 continue
@@ -124,6 +126,17 @@ class Level3Processor(DefaultLoggingClass):
             output = Level3Output(l3, output_handler)
             self.log.info("Write %s product: %s" % (output_handler.id, output.export_filename))
 
+    def _get_l2i_variables(self):
+        """ Returns the list of l2i variables required for the l2i stack:
+        surface type, the l2 parameter and the prefilter variables """
+        variables = ["surface_type"]
+        variables.extend([p.branchName() for p in self._job.l2_parameter])
+        prefilter = self._job.l3def.l2i_prefilter
+        if prefilter.active:
+            variables.append(prefilter.nan_source)
+            variables.extend(prefilter.nan_targets)
+        return variables
+
     def _log_progress(self, i):
         """ Concise logging on the progress of l2i stack creation """
         n = len(self._l2i_files)
@@ -142,11 +155,14 @@ class L2iDataStack(DefaultLoggingClass):
 
     def __init__(self, griddef, l2_parameter):
         """ A container for stacking l2i variables (geophysical paramters
-        at sensor resolution) in L3 grid cells. For each parameters
-        a (numx, numy) array is created, with an list containing all
-        l2i data points that fall into the grid cell area. This list
-        can be averaged or used for histogram computation in later stages
-        of the Level-3 processor.
+        at sensor resolution) in L3 grid cells. The stack is columnar:
+        For each parameter the l2i data points of all orbits are stored
+        in one contiguous array alongside a flat grid cell index
+        (yj * numx + xi). The data points of a grid cell can be
+        retrieved with the cell-sorted order (`cell_sort_indices`) and
+        the per-cell counts and offsets, which allows grouped reductions
+        over all grid cells at once in later stages of the Level-3
+        processor.
 
         Args:
             griddef (obj): pysiral.grid.GridDefinition or inheritated objects
@@ -187,17 +203,26 @@ class L2iDataStack(DefaultLoggingClass):
         """ Create all data stacks, content will be added sequentially
         with `add` method """
 
-        # Stack dictionary that will hold the data
+        # Stack dictionary that will hold the data (list of arrays for
+        # each orbit, merged to a single array on first access)
         self.stack = {}
 
         # init stack arrays
         # surface_type is mandatory for level-3 parameters
         # (e.g. n_total_wave_forms, lead_fraction, ...)
-        self.stack["surface_type"] = self.parameter_stack
+        self.stack["surface_type"] = []
 
         # create a stack for each l2 parameter
         for pardef in self.l2_parameter:
-            self.stack[pardef.branchName()] = self.parameter_stack
+            self.stack[pardef.branchName()] = []
+
+        # Flat grid cell index for all stacked data points
+        self._cell_index = []
+
+        # Cell-sorted order of the stack (computed on demand)
+        self._cell_sort_indices = None
+        self._cell_counts = None
+        self._cell_offsets = None
 
     def add(self, l2i):
         """ Add a l2i data object to the stack
@@ -226,19 +251,93 @@ class L2iDataStack(DefaultLoggingClass):
         # Get projection coordinates for l2i locations
         xi, yj = self.griddef.grid_indices(l2i.longitude, l2i.latitude)
 
-        # Stack the l2 parameter in the corresponding grid cells
-        for i in np.arange(l2i.n_records):
-            # Add the surface type per default
-            # (will not be gridded, therefore not in list of l2 parameter)
-            x, y = int(xi[i]), int(yj[i])
-            self.stack["surface_type"][y][x].append(l2i.surface_type[i])
-            for pardef in self.l2_parameter:
-                parameter_name = pardef.branchName()
-                try:
-                    data = getattr(l2i, parameter_name)
-                    self.stack[parameter_name][y][x].append(data[i])
-                except:
-                    pass
+        # Only data points within the grid extent can be stacked
+        numx, numy = self.griddef.extent.numx, self.griddef.extent.numy
+        with np.errstate(invalid="ignore"):
+            in_grid = np.logical_and.reduce((
+                xi >= 0, xi < numx, yj >= 0, yj < numy))
+        in_grid = np.where(in_grid)[0]
+        n_outside = l2i.n_records - len(in_grid)
+        if n_outside > 0:
+            self.log.warning("%g l2i records outside grid extent" % n_outside)
+
+        # Add the flat grid cell index of each data point
+        cell_index = yj[in_grid].astype(np.int64)*numx
+        cell_index += xi[in_grid].astype(np.int64)
+        self._cell_index.append(cell_index)
+
+        # Stack the l2 parameter
+        # Add the surface type per default
+        # (will not be gridded, therefore not in list of l2 parameter)
+        self.stack["surface_type"].append(
+            np.asarray(l2i.surface_type)[in_grid])
+        for pardef in self.l2_parameter:
+            parameter_name = pardef.branchName()
+            try:
+                data = np.asarray(getattr(l2i, parameter_name))[in_grid]
+            except:
+                # Parameter not in l2i file: keep the stack aligned with
+                # the grid cell index (NaN's are ignored in gridding)
+                data = np.full(len(in_grid), np.nan)
+            self.stack[parameter_name].append(data)
+
+        # Sort order needs to be recomputed
+        self._cell_sort_indices = None
+        self._cell_counts = None
+        self._cell_offsets = None
+
+    def get_parameter(self, parameter_name):
+        """ Returns all stacked data points of a parameter as a single
+        array (in the order of the flat grid cell index) """
+        stack = self.stack[parameter_name]
+        if len(stack) != 1:
+            stack[:] = [self._concatenate(stack)]
+        return stack[0]
+
+    def get_cell_count(self, mask=None):
+        """ Returns the number of data points for each flat grid cell
+        index (optionally only data points where mask is True) """
+        cell_index = self.cell_index
+        if mask is not None:
+            cell_index = cell_index[mask]
+        return np.bincount(cell_index, minlength=self.n_cells)
+
+    def get_cell_sum(self, values, mask=None):
+        """ Returns the sum of values (array aligned with the stack) for
+        each flat grid cell index (optionally only where mask is True) """
+        cell_index = self.cell_index
+        if mask is not None:
+            cell_index, values = cell_index[mask], values[mask]
+        return np.bincount(cell_index, weights=values, minlength=self.n_cells)
+
+    def get_cell_reduce(self, ufunc, values, fill_value=np.nan):
+        """ Returns the reduction of values (array aligned with the stack)
+        with a numpy ufunc (e.g. np.fmin) for each flat grid cell index.
+        Grid cells without data points are set to fill_value """
+        result = np.full(self.n_cells, fill_value, dtype=np.float64)
+        has_data = np.where(self.cell_counts > 0)[0]
+        if len(has_data) == 0:
+            return result
+        sorted_values = values[self.cell_sort_indices]
+        start = self.cell_offsets[has_data]
+        result[has_data] = ufunc.reduceat(sorted_values, start)
+        return result
+
+    def _concatenate(self, stack):
+        if len(stack) == 0:
+            return np.array([], dtype=np.float64)
+        return np.concatenate(stack)
+
+    def _sort_by_cell(self):
+        """ Compute the cell-sorted order and the number of data points
+        per grid cell """
+        cell_index = self.cell_index
+        n_cells = self.n_cells
+        # Stable sort: data points keep the orbit order within a grid cell
+        self._cell_sort_indices = np.argsort(cell_index, kind="mergesort")
+        self._cell_counts = np.bincount(cell_index, minlength=n_cells)
+        self._cell_offsets = np.zeros(n_cells+1, dtype=np.int64)
+        np.cumsum(self._cell_counts, out=self._cell_offsets[1:])
 
     @property
     def n_total_records(self):
@@ -249,9 +348,38 @@ class L2iDataStack(DefaultLoggingClass):
         return self._l2i_count
 
     @property
-    def parameter_stack(self):
-        dimx, dimy = self.griddef.extent.numx, self.griddef.extent.numy
-        return [[[] for _ in range(dimx)] for _ in range(dimy)]
+    def n_cells(self):
+        return self.griddef.extent.numx * self.griddef.extent.numy
+
+    @property
+    def cell_index(self):
+        """ Flat grid cell index (yj * numx + xi) of all data points """
+        if len(self._cell_index) != 1:
+            cell_index = self._concatenate(self._cell_index)
+            self._cell_index[:] = [cell_index.astype(np.int64)]
+        return self._cell_index[0]
+
+    @property
+    def cell_sort_indices(self):
+        """ Indices that sort the stacked data points by grid cell """
+        if self._cell_sort_indices is None:
+            self._sort_by_cell()
+        return self._cell_sort_indices
+
+    @property
+    def cell_counts(self):
+        """ Number of stacked data points for each flat grid cell index """
+        if self._cell_counts is None:
+            self._sort_by_cell()
+        return self._cell_counts
+
+    @property
+    def cell_offsets(self):
+        """ Start (and end) positions of each grid cell in the cell-sorted
+        data points (length: number of grid cells + 1) """
+        if self._cell_offsets is None:
+            self._sort_by_cell()
+        return self._cell_offsets
 
     @property
     def l2i_info(self):
@@ -348,10 +476,6 @@ class L3DataGrid(DefaultLoggingClass):
         self.log.info("Grid l2i parameter")
         self.grid_l2_parameter()
 
-        # Get the level-3 parameter
-        self.log.info("Compute level-3 ouput parameter")
-        self.compute_l3_output_parameter()
-
         # Load external data masks
         # NOTE: This is done for each file, but we assume it does not take
         #       much time compared to the gridding
@@ -463,93 +587,63 @@ class L3DataGrid(DefaultLoggingClass):
         """ Compute averages of all l2i parameter for each grid cell.
         The list of l2i parameter is from the output format definition
         No averages are computed for grid cells that are tagged with
-        a land flag. """
+        a land flag. All grid cells are computed at once with grouped
+        reductions over the flat grid cell index of the l2i stack """
 
         settings = self.l3def.grid_settings
+        shape = self.stack_grid_shape
 
-        # Loop over all grid cells
-        # XXX: Is there a better way?
+        # Exclude land (or near land grid cells)
+        # NOTE: is_land is indexed [xi, yj]
+        if settings.no_land_cells:
+            is_land_cell = self._l3["is_land"].T != 0
+        else:
+            is_land_cell = np.full(shape, False)
 
         for name in self._l2_parameter:
             self.log.info("Gridding parameter: %s" % name)
 
-            for xi in self.grid_xi_range:
-                for yj in self.grid_yj_range:
-
-                    data = np.array(self._l2.stack[name][yj][xi])
-
-                    # Exclude land (or near land grid cells)
-                    if self._l3["is_land"][xi, yj] and settings.no_land_cells:
-                        continue
-
-                    # nanmean needs at least 2 valid items
-                    valid = np.where(np.isfinite(data))[0]
-
-                    if len(valid) < settings.minimum_valid_grid_points:
-                        continue
+            grid_method = self.l3def.l2_parameter[name].grid_method
+            if grid_method not in ["average", "average_uncertainty", "unique"]:
+                msg = "Invalid grid method (%s) for %s"
+                msg = msg % (str(grid_method), name)
+                self.error.add_error("invalid-l3def", msg)
+                self.error.raise_on_error()
 
-                    grid_method = self.l3def.l2_parameter[name].grid_method
-                    if grid_method == "average":
-                        self._l3[name][yj, xi] = np.nanmean(data)
-                    elif grid_method == "average_uncertainty":
-                        value = np.abs(np.sqrt(1./np.sum(data[valid])))
-                        self._l3[name][yj, xi] = value
-                    elif grid_method == "unique":
-                        self._l3[name][yj, xi] = np.unique(data)
-                    else:
-                        msg = "Invalid grid method (%s) for %s"
-                        msg = msg % (str(grid_method), name)
+            data = self._l2.get_parameter(name)
+            valid = np.isfinite(data)
+
+            # nanmean needs at least 2 valid items
+            n_valid = self._l2.get_cell_count(mask=valid).reshape(shape)
+            is_gridded = n_valid >= settings.minimum_valid_grid_points
+            is_gridded = np.logical_and(is_gridded, ~is_land_cell)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                if grid_method == "average":
+                    value = self._l2.get_cell_sum(data, mask=valid)
+                    value = value.reshape(shape) / n_valid
+                elif grid_method == "average_uncertainty":
+                    value = self._l2.get_cell_sum(data, mask=valid)
+                    value = np.abs(np.sqrt(1./value.reshape(shape)))
+                else:
+                    value = self._l2.get_cell_reduce(np.fmin, data)
+                    value_max = self._l2.get_cell_reduce(np.fmax, data)
+                    value, value_max = value.reshape(shape), value_max.reshape(shape)
+                    if np.any(value[is_gridded] != value_max[is_gridded]):
+                        msg = "Non-unique values in grid cells for %s" % name
                         self.error.add_error("invalid-l3def", msg)
                         self.error.raise_on_error()
 
+            self._l3[name][is_gridded] = value[is_gridded]
+
     def compute_l3_mandatory_parameter(self):
         """
         Wrapper method for computing the surface type statistics for
-        each grid cell
+        all grid cells. These are the only level-3 parameter computed
+        by the gridding, other level-3 parameter are computed by the
+        level-3 post-processing
         """
-        for xi in self.grid_xi_range:
-            for yj in self.grid_yj_range:
-                for l3_parameter_name in self._l3_parameter:
-                    self._compute_surface_type_grid_statistics(xi, yj)
-
-    def compute_l3_output_parameter(self):
-        """
-        Compute level-3 parameter for each grid cell. A parameter is
-        classified as level-3 if it only exists on the grid cell level
-        (e.g. total number of waveforms). Parameters that are averaged
-        from  the l2i orbits, are called level-2 in the terminology
-        of pysiral.Level2Processor
-        """
-        # Loop over grid items
-        for xi in self.grid_xi_range:
-            for yj in self.grid_yj_range:
-                for l3_parameter_name in self._l3_parameter:
-                    # level-3 parameter can to be computed
-                    result = self.get_l3_parameter(l3_parameter_name, xi, yj)
-                    if result is not None:
-                        self._l3[l3_parameter_name][yj, xi] = result
-
-    def get_l3_parameter(self, l3_parameter_name, xi, yj):
-        """
-        Compution of all level-3 parameter for a given grid cell
-        Since level-3 parameter may be computed in very different ways,
-        this method is supplied with the grid index and the name of the
-        parameter and then redirects to the corresponding computation
-        method.
-
-        It returns the parameter value, which will be ignored if None. This
-        is the case for the mandatory level-3 parameter (surface type
-        statistics), which are computed in a seperate method and can safely
-        be ignored here.
-        """
-        # Surface type based parameter are computed anyway, skip
-        if l3_parameter_name in self._surface_type_l3par:
-            # XXX: Add radar mode flag here
-            return None
-        # No other l3 parameter computations at the moment
-        else:
-            return None
-            # raise ValueError("Unknown l3 parameter name: %s" % l3_parameter_name)
+        self._compute_surface_type_grid_statistics()
 
     def load_external_mask(self, external_mask_name):
         """ Get mask netCDF filename and load into instance for later use """
@@ -762,55 +856,54 @@ class L3DataGrid(DefaultLoggingClass):
         rho_w = options.water_density
         sd_corr_fact = options.snow_depth_correction_factor
 
-         # Loop over grid items
-        for xi, yj in self.grid_indices:
-
-            # Check of data exists
-            if np.isnan(self._l3["sea_ice_thickness"][yj, xi]):
-                continue
-
-            # Get parameters
-            frb = self._l3["freeboard"][yj, xi]
-            sd = self._l3["snow_depth"][yj, xi]
-            rho_i = self._l3["ice_density"][yj, xi]
-            rho_s = self._l3["snow_density"][yj, xi]
-
-            # Get systematic error components
-            sd_unc = self._l3["snow_depth_uncertainty"][yj, xi]
-            rho_i_unc = self._l3["ice_density_uncertainty"][yj, xi]
-            rho_s_unc = self._l3["snow_density_uncertainty"][yj, xi]
-
-            # Get random uncertainty 
-            # Note: this applies only to the radar freeboard uncertainty. 
-            #       Thus we need to recalculate the sea ice freeboard uncertainty
-
-            # Get the stack of radar freeboard uncertainty values and remove NaN's
-            rfrb_unc = self._l3["radar_freeboard_uncertainty"][yj, xi]
-            rfrb_uncs = np.array(self._l2.stack["radar_freeboard_uncertainty"][yj][xi])
-            rfrb_uncs = rfrb_uncs[~np.isnan(rfrb_uncs)]
-
-            # Compute radar freeboard uncertainty as error or the mean from values with individual 
-            # error components (error of a weighted mean)
-            weight = np.nansum(1./rfrb_uncs**2)
+        # Only grid cells with data
+        has_data = np.where(~np.isnan(self._l3["sea_ice_thickness"]))
+
+        # Get parameters
+        frb = self._l3["freeboard"][has_data]
+        sd = self._l3["snow_depth"][has_data]
+        rho_i = self._l3["ice_density"][has_data]
+        rho_s = self._l3["snow_density"][has_data]
+
+        # Get systematic error components
+        sd_unc = self._l3["snow_depth_uncertainty"][has_data]
+        rho_i_unc = self._l3["ice_density_uncertainty"][has_data]
+        rho_s_unc = self._l3["snow_density_uncertainty"][has_data]
+
+        # Get random uncertainty 
+        # Note: this applies only to the radar freeboard uncertainty. 
+        #       Thus we need to recalculate the sea ice freeboard uncertainty
+
+        # Compute radar freeboard uncertainty as error or the mean from values with individual 
+        # error components (error of a weighted mean)
+        # The sum of weights is computed for all grid cells in one grouped
+        # reduction over the l2i stack (NaN's removed)
+        rfrb_uncs = self._l2.get_parameter("radar_freeboard_uncertainty")
+        is_valid = ~np.isnan(rfrb_uncs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = self._l2.get_cell_sum(1./rfrb_uncs**2, mask=is_valid)
+            weight = weight.reshape(self.stack_grid_shape)[has_data]
             rfrb_unc = 1./np.sqrt(weight)
-            self._l3["radar_freeboard_l3_uncertainty"][yj, xi] = rfrb_unc
+        self._l3["radar_freeboard_l3_uncertainty"][has_data] = rfrb_unc
 
-            # Calculate the level-3 freeboard uncertainty with upated radar freeboard uncertainty
-            deriv_snow = sd_corr_fact
-            frb_unc = np.sqrt((deriv_snow*sd_unc)**2. + rfrb_unc**2.)
-            self._l3["freeboard_l3_uncertainty"][yj, xi] = frb_unc
+        # Calculate the level-3 freeboard uncertainty with upated radar freeboard uncertainty
+        deriv_snow = sd_corr_fact
+        frb_unc = np.sqrt((deriv_snow*sd_unc)**2. + rfrb_unc**2.)
+        self._l3["freeboard_l3_uncertainty"][has_data] = frb_unc
 
-            # Calculate the level-3 thickness uncertainty 
-            errprop_args = [frb, sd, rho_w, rho_i, rho_s, frb_unc, sd_unc, rho_i_unc, rho_s_unc]
+        # Calculate the level-3 thickness uncertainty 
+        errprop_args = [frb, sd, rho_w, rho_i, rho_s, frb_unc, sd_unc, rho_i_unc, rho_s_unc]
+        with np.errstate(divide="ignore", invalid="ignore"):
             sit_l3_unc = frb2sit_errprop(*errprop_args)
-            
-            # Cap the uncertainty 
-            # (very large values may appear in extreme cases)
-            if sit_l3_unc > options.max_l3_uncertainty:
-                sit_l3_unc = options.max_l3_uncertainty
-            
-            # Assign Level-3 uncertainty
-            self._l3["sea_ice_thickness_l3_uncertainty"][yj, xi] = sit_l3_unc
+
+        # Cap the uncertainty 
+        # (very large values may appear in extreme cases)
+        with np.errstate(invalid="ignore"):
+            exceeds_max = sit_l3_unc > options.max_l3_uncertainty
+        sit_l3_unc[exceeds_max] = options.max_l3_uncertainty
+
+        # Assign Level-3 uncertainty
+        self._l3["sea_ice_thickness_l3_uncertainty"][has_data] = sit_l3_unc
 
     def _get_l3_mask(self, source_param, condition, options):
         """ Return bool array based on a parameter and a predefined
@@ -826,10 +919,11 @@ class L3DataGrid(DefaultLoggingClass):
             self.error.add_error("invalid-l3mask-condition", msg)
             self.error.raise_on_error()
 
-    def _compute_surface_type_grid_statistics(self, xi, yj):
+    def _compute_surface_type_grid_statistics(self):
         """
-        Computes the mandatory surface type statistics for a given
-        grid index based on the surface type stack flag
+        Computes the mandatory surface type statistics for all grid cells
+        based on the surface type stack flag (only grid cells with data
+        are set)
 
         The current list
           - is_land (land flag exists in l2i stack)
@@ -842,63 +936,59 @@ class L3DataGrid(DefaultLoggingClass):
         Optional (parameter name needs to in l3 settings file)
           - negative_thickness_fraction  (fraction of negatice sea ice thicknesses in grid cell)
         """
-        surface_type = np.array(self._l2.stack["surface_type"][yj][xi])
+        surface_type = self._l2.get_parameter("surface_type")
+        shape = self.stack_grid_shape
+        stflags = self._surface_type_dict
 
         # Stack can be empty
-        if len(surface_type) == 0:
-            return
+        n_total_waveforms = self._l2.cell_counts.reshape(shape)
+        has_data = n_total_waveforms > 0
 
-        stflags = self._surface_type_dict
+        def get_count(mask):
+            return self._l2.get_cell_count(mask=mask).reshape(shape)
 
-        # Create a land flag
-        is_land = len(np.where(surface_type == stflags["land"])[0] > 0)
-        self._l3["is_land"][xi, yj] = is_land
+        # Create a land flag (number of land records)
+        # NOTE: is_land is indexed [xi, yj]
+        n_land = get_count(surface_type == stflags["land"])
+        self._l3["is_land"].T[has_data] = n_land[has_data]
 
         # Compute total waveforms in grid cells
-        n_total_waveforms = len(surface_type)
-        self._l3["n_total_waveforms"][yj, xi] = n_total_waveforms
+        self._l3["n_total_waveforms"][has_data] = n_total_waveforms[has_data]
 
         # Compute valid waveforms
         # Only positively identified waveforms (either lead or ice)
         # XXX: what about polynya and ocean?
-        valid_waveform = ORCondition()
-        valid_waveform.add(surface_type == stflags["lead"])
-        valid_waveform.add(surface_type == stflags["sea_ice"])
-        n_valid_waveforms = valid_waveform.num
-        self._l3["n_valid_waveforms"][yj, xi] = n_valid_waveforms
+        n_leads = get_count(surface_type == stflags["lead"])
+        n_ice = get_count(surface_type == stflags["sea_ice"])
+        n_valid_waveforms = n_leads + n_ice
+        self._l3["n_valid_waveforms"][has_data] = n_valid_waveforms[has_data]
+
+        # Fractions (NaN for division by zero)
+        def get_fraction(numerator, denominator):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fraction = numerator.astype(float)/denominator.astype(float)
+            fraction[denominator == 0] = np.nan
+            return fraction[has_data]
+
+        # Fractions of valid waveforms on all waveforms
+        self._l3["valid_fraction"][has_data] = get_fraction(
+            n_valid_waveforms, n_total_waveforms)
 
         # Fractions of leads on valid_waveforms
-        try:
-            valid_fraction = float(n_valid_waveforms)/float(n_total_waveforms)
-        except ZeroDivisionError:
-            valid_fraction = np.nan
-        self._l3["valid_fraction"][yj, xi] = valid_fraction
+        self._l3["lead_fraction"][has_data] = get_fraction(
+            n_leads, n_valid_waveforms)
 
-        # Fractions of leads on valid_waveforms
-        n_leads = len(np.where(surface_type == stflags["lead"])[0])
-        try:
-            lead_fraction = float(n_leads)/float(n_valid_waveforms)
-        except ZeroDivisionError:
-            lead_fraction = np.nan
-        self._l3["lead_fraction"][yj, xi] = lead_fraction
-
-        # Fractions of leads on valid_waveforms
-        n_ice = len(np.where(surface_type == stflags["sea_ice"])[0])
-        try:
-            ice_fraction = float(n_ice)/float(n_valid_waveforms)
-        except ZeroDivisionError:
-            ice_fraction = np.nan
-        self._l3["ice_fraction"][yj, xi] = ice_fraction
+        # Fractions of sea ice on valid_waveforms
+        self._l3["ice_fraction"][has_data] = get_fraction(
+            n_ice, n_valid_waveforms)
 
         # Fractions of negative thickness values
         if "negative_thickness_fraction" in self._l3.keys():
-            sit = np.array(self._l2.stack["sea_ice_thickness"][yj][xi])
-            n_negative_thicknesses = len(np.where(sit < 0.0)[0])
-            try:
-                negative_thickness_fraction = float(n_negative_thicknesses)/float(n_ice)
-            except ZeroDivisionError:
-                negative_thickness_fraction = np.nan
-            self._l3["negative_thickness_fraction"][yj, xi] = negative_thickness_fraction
+            sit = self._l2.get_parameter("sea_ice_thickness")
+            with np.errstate(invalid="ignore"):
+                n_negative_thicknesses = get_count(sit < 0.0)
+            self._l3["negative_thickness_fraction"][has_data] = get_fraction(
+                n_negative_thicknesses, n_ice)
 
     def get_parameter_by_name(self, name):
         try:
@@ -1082,6 +1172,12 @@ class L3DataGrid(DefaultLoggingClass):
     def grid_shape(self):
         return (self.griddef.extent.numx, self.griddef.extent.numy)
 
+    @property
+    def stack_grid_shape(self):
+        """ Shape of the flat grid cell index of the l2i stack as
+        (yj, xi) array """
+        return (self.griddef.extent.numy, self.griddef.extent.numx)
+
     @property
     def griddef(self):
         return self._griddef
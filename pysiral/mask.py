@@ -283,7 +283,7 @@ class MaskW99Valid(MaskSourceBase):
         super(MaskW99Valid, self).__init__(mask_dir, mask_name, cfg)
 
         # Read the data and transfer the ice_mask (1: valid, 0: invalid)
-        content = ReadNC(self.mask_filepath)
+        content = ReadNC(self.mask_filepath, variables=["ice_mask"])
         mask = content.ice_mask
         mask = np.flipud(mask)
 
@@ -339,7 +339,7 @@ class L3Mask(DefaultLoggingClass):
     def _read_mask_netcdf(self):
         """ Read the mask """
         if self.mask_filepath is not None:
-            self._nc = ReadNC(self.mask_filepath)
+            self._nc = ReadNC(self.mask_filepath, lazy=True)
 
     @property
     def mask(self):
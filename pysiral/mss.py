@@ -13,6 +13,7 @@ from pysiral.filter import (fill_nan, idl_smooth)
 from treedict import TreeDict
 import scipy.ndimage as ndimage
 import numpy as np
+import os
 
 
 class BaseMSS(AuxdataBaseClass):
@@ -34,27 +35,104 @@ class BaseMSS(AuxdataBaseClass):
 class DTU1MinGrid(BaseMSS):
     """
     Parsing Routine for DTU 1 minute global mean sea surface height files
+
+    Only the latitude rows of the region of interest are read from the
+    netCDF file. If the option `subset_cache_dir` is set, the prepared
+    subset is stored in this directory (numpy files) and read as
+    read-only memory map by all following processor runs and workers.
     """
     def __init__(self):
         super(DTU1MinGrid, self).__init__()
 
     def _initialize(self):
 
-        dtu_grid = ReadNC(self._filename)
         # Cut to ROI regions (latitude only)
         # -> no need for world mss
         latitude_range = self.roi_latitude_range()
+
+        # Use the cached subset (if available)
+        cache_filenames = self._get_subset_cache_filenames(latitude_range)
+        if cache_filenames is not None and self._read_subset_cache(
+                *cache_filenames):
+            return
+
+        # Read the latitude rows of the ROI (latitudes are monotonic)
+        dtu_lat = ReadNC(self._filename, variables=["lat"]).lat
         latitude_indices = np.where(
-            np.logical_and(dtu_grid.lat >= latitude_range[0],
-                           dtu_grid.lat <= latitude_range[1]))[0]
-        self.elevation = dtu_grid.mss[latitude_indices, :]
+            np.logical_and(dtu_lat >= latitude_range[0],
+                           dtu_lat <= latitude_range[1]))[0]
+        rows = slice(latitude_indices[0], latitude_indices[-1]+1)
+        dtu_grid = ReadNC(self._filename, variables=["lon", "mss"],
+                          selection={"lat": rows})
+        self.elevation = dtu_grid.mss
         self.longitude = dtu_grid.lon
-        self.latitude = dtu_grid.lat[latitude_indices]
+        self.latitude = dtu_lat[rows]
         # Convert elevations to WGS84
         delta_h1 = egm2top_delta_h(self.latitude)
         delta_h = egm2wgs_delta_h(self.latitude)
-        for i in np.arange(len(self.latitude)):
-            self.elevation[i, :] += (delta_h[i]-delta_h1[i])
+        delta_h = (delta_h-delta_h1).astype(self.elevation.dtype)
+        self.elevation += delta_h[:, np.newaxis]
+
+        # Save the subset for the next initialization
+        if cache_filenames is not None:
+            self._write_subset_cache(*cache_filenames)
+
+    def _get_subset_cache_filenames(self, latitude_range):
+        """ Returns the filenames of the cached subset (elevation and
+        coordinates) or None if the subset cache is not configured. The
+        filenames depend on source file (name, size, mtime) and
+        latitude range """
+        cache_dir = None
+        if self._options is not None:
+            cache_dir = self._options.get("subset_cache_dir", None)
+        if cache_dir is None:
+            return None
+        source_stat = os.stat(self._filename)
+        cache_id = "%s_%d_%d_lat%.4f_%.4f" % (
+            os.path.splitext(os.path.basename(self._filename))[0],
+            source_stat.st_size, int(source_stat.st_mtime),
+            latitude_range[0], latitude_range[1])
+        cache_dir = os.path.expanduser(cache_dir)
+        return (os.path.join(cache_dir, cache_id+"_elevation.npy"),
+                os.path.join(cache_dir, cache_id+"_coordinates.npz"))
+
+    def _read_subset_cache(self, elevation_file, coordinates_file):
+        """ Read the subset from the cache (elevation as memory map,
+        masked array if the subset has masked values) """
+        if not os.path.isfile(elevation_file) or \
+                not os.path.isfile(coordinates_file):
+            return False
+        self.elevation = np.load(elevation_file, mmap_mode="r")
+        with np.load(coordinates_file) as coordinates:
+            self.longitude = coordinates["longitude"]
+            self.latitude = coordinates["latitude"]
+            if "elevation_mask" in coordinates.files:
+                self.elevation = np.ma.array(
+                    self.elevation, mask=coordinates["elevation_mask"],
+                    copy=False)
+        return True
+
+    def _write_subset_cache(self, elevation_file, coordinates_file):
+        """ Write the subset to the cache. Files are written to a
+        temporary file first, as other processes might read the cache """
+        cache_dir = os.path.dirname(elevation_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # The mask of the elevation is stored with the coordinates
+        # (only if the subset has masked values)
+        coordinates = dict(longitude=np.ma.getdata(self.longitude),
+                           latitude=np.ma.getdata(self.latitude))
+        elevation_mask = np.ma.getmaskarray(self.elevation)
+        if elevation_mask.any():
+            coordinates["elevation_mask"] = elevation_mask
+        for filename, write in [
+                (coordinates_file, lambda f: np.savez(f, **coordinates)),
+                (elevation_file, lambda f: np.save(
+                    f, np.ma.getdata(self.elevation)))]:
+            tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+            with open(tmp_filename, "wb") as f:
+                write(f)
+            os.rename(tmp_filename, filename)
 
     def get_track(self, longitude, latitude):
         # Use fast image interpolation (since DTU is on regular grid)
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
 
+from pysiral import USER_CONFIG_PATH, PACKAGE_CONFIG_PATH
 from pysiral.config import (PYSIRAL_VERSION, PYSIRAL_VERSION_FILENAME,
-                            ConfigInfo, get_yaml_config)
+                            ConfigInfo, get_yaml_config,
+                            get_cached_yaml_config)
 from pysiral.path import filename_from_path, file_basename
 from pysiral.errorhandler import ErrorStatus
 from pysiral.logging import DefaultLoggingClass
@@ -170,6 +172,13 @@ class OutputHandlerBase(DefaultLoggingClass):
         """ Returns a directory suitable string with the current time """
         return datetime.now().strftime("%Y%m%dT%H%M%S")
 
+    @property
+    def storage_def(self):
+        """ netCDF storage profiles (None if not in output definition) """
+        if "storage" not in self.output_def:
+            return None
+        return self.output_def.storage
+
     @property
     def variable_def(self):
         t = self.output_def.variables
@@ -296,6 +305,150 @@ class NCDateNumDef(object):
         self.units = "seconds since 1970-01-01"
         self.calendar = "standard"
 
+    @property
+    def epoch(self):
+        """ Reference time of units (numpy.datetime64) """
+        match = re.match("^seconds since (.+)$", self.units)
+        if match is None or self.calendar not in ["standard", "gregorian"]:
+            msg = "datetime64 conversion not supported for %s (%s)"
+            raise ValueError(msg % (self.units, self.calendar))
+        epoch = dtparser.parse(match.group(1))
+        return np.datetime64(epoch, "us")
+
+    def datetime64_to_num(self, datetime64):
+        """ Converts numpy.datetime64 values into numbers (as date2num) """
+        delta = np.asarray(datetime64, dtype="datetime64[us]") - self.epoch
+        return delta / np.timedelta64(1, "s")
+
+    def num_to_datetime64(self, number):
+        """ Converts numbers into numpy.datetime64[us] values (as num2date,
+        rounded to microseconds) """
+        microseconds = np.round(np.asarray(number, dtype=np.float64)*1e6)
+        return self.epoch + microseconds.astype(np.int64).astype("m8[us]")
+
+
+class NCStorageProfiles(object):
+    """
+    netCDF storage settings of output variables (compression, chunking,
+    lossy quantisation and integer packing) from the `storage` branch of an
+    output definition. Example:
+
+        storage:
+            default:
+                zlib: True
+                complevel: 4
+                shuffle: True
+                chunksizes: full
+            elevation:
+                least_significant_digit: 3
+            packed_mm:
+                packing:
+                    dtype: i4
+                    scale_factor: 0.001
+                    add_offset: 0.0
+
+    `chunksizes` is either `full` (one chunk for each variable, e.g. full
+    orbit or full grid) or a list of chunk sizes for the trailing dimensions
+    (null: full dimension size). The settings of the default profile apply
+    to all profiles. Without storage definition all variables are written
+    with the netCDF4 defaults (zlib compression only).
+    """
+
+    _create_variable_keywords = ["zlib", "complevel", "shuffle",
+                                 "least_significant_digit"]
+    _packing_attributes = ["scale_factor", "add_offset"]
+
+    def __init__(self, storage_def=None, zlib=True):
+        self._profiles = {"default": {"zlib": zlib}}
+        if storage_def is None:
+            return
+        for name in storage_def.keys(recursive=False, branch_mode="only"):
+            self._profiles[name] = self._get_profile_dict(storage_def[name])
+        default = self._profiles["default"]
+        for name in self._profiles.keys():
+            profile = dict(default)
+            profile.update(self._profiles[name])
+            self._profiles[name] = profile
+
+    def get_profile(self, name=None):
+        """ Returns the storage profile (dict, default: default profile) """
+        if name is None:
+            name = "default"
+        try:
+            return self._profiles[name]
+        except KeyError:
+            raise ValueError("Unknown netCDF storage profile: %s" % name)
+
+    def write_variable(self, group, name, data, dimensions, attributes,
+                       profile=None):
+        """ Creates a variable in a netCDF group with the settings of a
+        storage profile, writes the data and sets the variable attributes.
+        Returns the netCDF variable """
+        profile = self.get_profile(profile)
+        packing = profile.get("packing", None)
+        kwargs = self.get_create_variable_kwargs(profile, data)
+        if packing is None:
+            var = group.createVariable(name, data.dtype.str, dimensions,
+                                       **kwargs)
+        else:
+            # The packed values are computed by netCDF4 from the scale
+            # factor & offset, invalid values are set to the fill value
+            dtype = np.dtype(packing["dtype"])
+            var = group.createVariable(name, dtype.str, dimensions,
+                                       fill_value=np.iinfo(dtype).min,
+                                       **kwargs)
+            var.scale_factor = packing["scale_factor"]
+            var.add_offset = packing.get("add_offset", 0.0)
+            data = np.ma.masked_invalid(data)
+            attributes = dict((key, value) for key, value in
+                              attributes.items()
+                              if key not in self._packing_attributes)
+        var[:] = data
+        for key in sorted(attributes.keys()):
+            setattr(var, key, attributes[key])
+        return var
+
+    def get_create_variable_kwargs(self, profile, data):
+        """ Keywords for netCDF4.Dataset.createVariable """
+        kwargs = {}
+        for key in self._create_variable_keywords:
+            if profile.get(key, None) is not None:
+                kwargs[key] = profile[key]
+        # Quantisation only for floating point numbers
+        is_float = np.issubdtype(data.dtype, np.floating)
+        if not is_float or profile.get("packing", None) is not None:
+            kwargs.pop("least_significant_digit", None)
+        chunksizes = self.get_chunksizes(profile.get("chunksizes", None),
+                                         np.shape(data))
+        if chunksizes is not None:
+            kwargs["chunksizes"] = chunksizes
+        return kwargs
+
+    @staticmethod
+    def get_chunksizes(chunksizes, shape):
+        """ Returns the chunk shape for a variable (None: netCDF4 default)"""
+        if chunksizes is None or len(shape) == 0 or min(shape) == 0:
+            return None
+        if chunksizes == "full":
+            return list(shape)
+        # Chunk sizes are given for the trailing dimensions
+        chunksizes = list(chunksizes)[-len(shape):]
+        chunksizes = [1]*(len(shape)-len(chunksizes)) + chunksizes
+        return [size if chunk is None else max(min(chunk, size), 1)
+                for chunk, size in zip(chunksizes, shape)]
+
+    @staticmethod
+    def _get_profile_dict(profile_def):
+        profile = {}
+        for key in profile_def.keys(recursive=False, branch_mode="all"):
+            value = profile_def[key]
+            if key == "packing":
+                value = dict((name, value[name]) for name in value.keys())
+            elif key == "chunksizes" and value != "full":
+                value = list(value)
+            profile[key] = value
+        return profile
+
 
 class NCDataFile(DefaultLoggingClass):
 
@@ -343,6 +496,9 @@ class NCDataFile(DefaultLoggingClass):
         dimdict = self.data.dimdict
         dims = dimdict.keys()
 
+        storage = NCStorageProfiles(self.output_handler.storage_def,
+                                    zlib=self.zlib)
+
         for key in dims:
             self._rootgrp.createDimension(key, dimdict[key])
 
@@ -351,11 +507,12 @@ class NCDataFile(DefaultLoggingClass):
             # Check if parameter name is also the the name or the source
             # parameter
 
-            if "var_source_name" in attribute_dict.keys():
-                attribute_dict = dict(attribute_dict)
-                var_source_name = attribute_dict.pop("var_source_name")
-            else:
-                var_source_name = parameter_name
+            attribute_dict = dict(attribute_dict)
+            var_source_name = attribute_dict.pop(
+                "var_source_name", parameter_name)
+
+            # Storage profile (compression, chunking, packing)
+            storage_profile = attribute_dict.pop("storage", None)
 
             data = self.data.get_parameter_by_name(var_source_name)
 
@@ -367,7 +524,9 @@ class NCDataFile(DefaultLoggingClass):
                 self.error.raise_on_error()
 
             # Convert datetime objects to number
-            if type(data[0]) is datetime:
+            if np.issubdtype(data.dtype, np.datetime64):
+                data = self.time_def.datetime64_to_num(data)
+            elif type(data[0]) is datetime:
                 data = date2num(data, self.time_def.units,
                                 self.time_def.calendar)
 
@@ -385,15 +544,10 @@ class NCDataFile(DefaultLoggingClass):
             else:
                 dimensions = tuple(dims[0:len(data.shape)])
 
-            # Create and set the variable
-            var = self._rootgrp.createVariable(
-                    parameter_name, data.dtype.str,
-                    dimensions, zlib=self.zlib)
-            var[:] = data
-
-            # Add Parameter Attributes
-            for key in sorted(attribute_dict.keys()):
-                setattr(var, key, attribute_dict[key])
+            # Create and set the variable and its attributes
+            storage.write_variable(
+                self._rootgrp, parameter_name, data, dimensions,
+                attribute_dict, profile=storage_profile)
 
     def _create_root_group(self, attdict, **global_attr_keyw):
         """
@@ -510,6 +664,8 @@ class L1bDataNC(DefaultLoggingClass):
 
         self.output_folder = None
         self.l1b = None
+        # netCDF storage definition (default: output/l1/l1bdata_default.yaml)
+        self.storage_def = None
         # TODO: Remove parameter attributes alltogether with l1 setting files
         self.parameter_attributes = []
 
@@ -548,6 +704,11 @@ class L1bDataNC(DefaultLoggingClass):
 
         self._missing_parameters = []
 
+        if self.storage_def is None:
+            self.storage_def = get_l1bdata_storage_def()
+        storage = NCStorageProfiles(self.storage_def.storage, zlib=self.zlib)
+        variable_profiles = self.storage_def.get("variables", None)
+
         for datagroup in self.datagroups:
 
             if self.verbose:
@@ -569,7 +730,9 @@ class L1bDataNC(DefaultLoggingClass):
                 data = getattr(content, parameter)
 
                 # Convert datetime objects to number
-                if type(data[0]) is datetime:
+                if np.issubdtype(data.dtype, np.datetime64):
+                    data = self.time_def.datetime64_to_num(data)
+                elif type(data[0]) is datetime:
                     data = date2num(data, self.time_def.units,
                                     self.time_def.calendar)
 
@@ -580,13 +743,16 @@ class L1bDataNC(DefaultLoggingClass):
                 if self.verbose:
                     print " "+parameter, dimensions, data.dtype.str, data.shape
 
-                var = dgroup.createVariable(parameter, data.dtype.str, dimensions, zlib=self.zlib)
-                var[:] = data
+                # Storage profile (compression, chunking, packing)
+                profile = None
+                if variable_profiles is not None:
+                    profile = variable_profiles.get(
+                        datagroup+"."+parameter, None)
 
-                # Add Parameter Attributes
+                # Create and set the variable and its attributes
                 attribute_dict = self._get_variable_attr_dict(parameter)
-                for key in attribute_dict.keys():
-                    setattr(var, key, attribute_dict[key])
+                storage.write_variable(dgroup, parameter, data, dimensions,
+                                       attribute_dict, profile=profile)
 
     def _convert_datetime_attributes(self, attdict):
         """
@@ -750,12 +916,24 @@ class Level3Output(NCDataFile):
             setattr(var, key, attrs[key])
 
 
+def get_l1bdata_storage_def(storage_id="l1bdata_default"):
+    """ Returns the netCDF storage definition for l1bdata files (from
+    the pysiral config folder or the package resources) """
+    filename = os.path.join("output", "l1", storage_id+".yaml")
+    for config_path in [USER_CONFIG_PATH, PACKAGE_CONFIG_PATH]:
+        if os.path.isfile(os.path.join(config_path, filename)):
+            return get_cached_yaml_config(os.path.join(config_path, filename))
+    raise IOError("l1bdata storage definition not found: %s" % filename)
+
+
 class PysiralOutputFilenaming(object):
     """
     Class for generating and parsing of pysiral output
     filenames for all data levels
     """
 
+    _compiled_parsers = {}
+
     def __init__(self):
         self.error = ErrorStatus()
         self.data_level = None
@@ -812,7 +990,7 @@ class PysiralOutputFilenaming(object):
         filename = filename_from_path(fn)
         match_found = False
         for data_level in self._registered_parsers.keys():
-            parser = parse.compile(self._registered_parsers[data_level])
+            parser = self._get_compiled_parser(data_level)
             match = parser.parse(filename)
             if match:
                 match_found = True
@@ -821,7 +999,7 @@ class PysiralOutputFilenaming(object):
                     value = match[parameter]
                     if parameter in ["start", "stop"]:
                         try:
-                            value = dtparser.parse(value)
+                            value = self._datetime_parse(value)
                         except:
                             match_found = False
                             break
@@ -831,9 +1009,27 @@ class PysiralOutputFilenaming(object):
         if not match_found:
             print "Unrecognized filename: %s" % filename
 
+    def _get_compiled_parser(self, data_level):
+        """ Compiled filename parsers are shared by all instances """
+        pattern = self._registered_parsers[data_level]
+        if pattern not in self._compiled_parsers:
+            self._compiled_parsers[pattern] = parse.compile(pattern)
+        return self._compiled_parsers[pattern]
+
     def _datetime_format(self, datetime):
         return "{dt:%Y%m%dT%H%M%S}".format(dt=datetime)
 
+    def _datetime_parse(self, value):
+        """ Inverse of _datetime_format (with fallback to dateutil) """
+        try:
+            if len(value) != 15 or value[8] != "T":
+                raise ValueError()
+            return datetime(int(value[0:4]), int(value[4:6]),
+                            int(value[6:8]), int(value[9:11]),
+                            int(value[11:13]), int(value[13:15]))
+        except ValueError:
+            return dtparser.parse(value)
+
 
 class PysiralOutputFolder(object):
     """
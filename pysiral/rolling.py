@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Moving (rolling) window statistics for along-track data with NaN gaps.
+
+The window for element i covers the index range [i-pad, i+pad] with
+pad = int((window_size-1)/2). Windows are truncated at the edges of the
+array (the window is not shifted and not shrunk symmetrically, see
+pysiral.filter.idl_smooth for the IDL SMOOTH edge behaviour). NaN values
+are ignored, the result for windows without valid values is NaN. Infinite
+values are treated as by np.nanmean and np.nanstd.
+
+The window mean is computed with cumulative sums (window_nanmean, also
+used by pysiral.filter.idl_smooth), statistics that depend on the window
+content (standard deviation, mean of values above a threshold) are
+computed from windows that are gathered in chunks.
+"""
+
+import numpy as np
+
+
+def rolling_nanmean(x, window_size, indices=None):
+    """ Mean of all non-NaN values in the edge-truncated window (for all
+    elements or the window centre `indices`) """
+    n = len(x)
+    index = np.arange(n) if indices is None else np.asarray(indices)
+    pad = get_window_pad(window_size)
+    i0 = np.maximum(index-pad, 0)
+    i1 = np.minimum(index+pad+1, n)
+    return window_nanmean(x, i0, i1)
+
+
+def rolling_nanstd(x, window_size, indices=None, ddof=0,
+                   chunk_size=2**22):
+    """ Standard deviation of all non-NaN values in the edge-truncated
+    window (same definition as np.nanstd, for all elements or the window
+    centre `indices`). The deviations are computed from the window mean
+    (two-pass) to avoid the round-off errors of cumulative sums of
+    squares for small variances """
+    mean = rolling_nanmean(x, window_size, indices=indices)
+    std = np.full(mean.shape, np.nan)
+    for chunk, windows in _get_window_chunks(x, window_size, indices,
+                                             chunk_size):
+        is_valid = np.logical_not(np.isnan(windows))
+        count = is_valid.sum(axis=1)
+        deviation = np.where(is_valid, windows - mean[chunk, np.newaxis],
+                             0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std[chunk] = np.where(
+                count > ddof,
+                np.sqrt((deviation*deviation).sum(axis=1)/(count-ddof)),
+                np.nan)
+    return std
+
+
+def rolling_nanmean_above(x, window_size, threshold, indices=None,
+                          chunk_size=2**22):
+    """
+    Mean of all values in the edge-truncated window that exceed a per
+    window threshold
+
+    Arguments
+    ---------
+        x (float array)
+            input data, order = (n)
+        window_size (int)
+            window size in number of elements
+        threshold (float array)
+            threshold value for each window, order = (n) or the same
+            length as `indices`
+
+    Keywords
+    --------
+        indices (int array)
+            compute the mean only for these window centre indices
+            (default: all elements)
+        chunk_size (int)
+            maximum number of window elements that are gathered at once
+
+    Returns
+    -------
+        mean (float array)
+            order = (n) or the same length as `indices`
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.full(threshold.shape, np.nan)
+    for chunk, windows in _get_window_chunks(x, window_size, indices,
+                                             chunk_size):
+        with np.errstate(invalid="ignore"):
+            is_above = windows > threshold[chunk, np.newaxis]
+        count = is_above.sum(axis=1)
+        total = np.where(is_above, windows, 0.0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean[chunk] = np.where(count > 0, total/count, np.nan)
+    return mean
+
+
+def window_nanmean(x, i0, i1):
+    """
+    Mean of the non-NaN values of x in the index windows [i0, i1) (same
+    result as np.nanmean for each window, including infinite values).
+    NaN for windows without valid values.
+
+    The window sums are computed from cumulative sums of the values minus
+    the mean of all finite values (limits round-off errors)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    i0, i1 = np.asarray(i0), np.asarray(i1)
+    is_finite = np.isfinite(x)
+    offset = np.mean(x[is_finite]) if is_finite.any() else 0.0
+    x_sum = _get_window_sums(np.where(is_finite, x-offset, 0.0), i0, i1)
+    count = _get_window_sums(is_finite, i0, i1)
+    mean = np.full(i0.shape, np.nan)
+    has_values = count > 0
+    mean[has_values] = x_sum[has_values]/count[has_values] + offset
+
+    # Windows with infinite values (inf + -inf = NaN)
+    if np.isinf(x).any():
+        has_posinf = _get_window_sums(x == np.inf, i0, i1) > 0
+        has_neginf = _get_window_sums(x == -np.inf, i0, i1) > 0
+        mean[has_posinf] = np.inf
+        mean[has_neginf] = -np.inf
+        mean[np.logical_and(has_posinf, has_neginf)] = np.nan
+    return mean
+
+
+def get_window_pad(window_size):
+    """ Number of elements on each side of the window centre """
+    return max(int((window_size-1)/2), 0)
+
+
+def _get_window_chunks(x, window_size, indices, chunk_size):
+    """ Generator of (chunk slice, windows) with the windows of the
+    window centre indices in the chunk gathered in a 2-D array
+    (order = (n_chunk, window_size), NaN outside the array) """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if indices is None:
+        indices = np.arange(n)
+    indices = np.asarray(indices, dtype=int)
+
+    # Pad the data with NaN's (= edge truncation)
+    pad = get_window_pad(window_size)
+    padded = np.full(n+2*pad, np.nan)
+    padded[pad:pad+n] = x
+    window_offset = np.arange(2*pad+1)
+
+    n_chunk = max(chunk_size // (2*pad+1), 1)
+    for i0 in np.arange(0, len(indices), n_chunk):
+        chunk = slice(i0, i0+n_chunk)
+        yield chunk, padded[indices[chunk, np.newaxis] + window_offset]
+
+
+def _get_window_sums(x, i0, i1):
+    """ Sums of x in the index windows [i0, i1) from the cumulative sum
+    (integer sums for boolean x) """
+    dtype = np.int64 if x.dtype == np.bool_ else np.float64
+    cumsum = np.zeros(len(x)+1, dtype=dtype)
+    np.cumsum(x, out=cumsum[1:])
+    return cumsum[i1] - cumsum[i0]
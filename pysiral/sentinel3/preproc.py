@@ -135,8 +135,8 @@ class Sentinel3PreProc(L1bPreProc):
         for l1b in l1b_list:
 
             # Get waveform data
-            wfm = l1b.waveform.power
-            rng = l1b.waveform.range
+            wfm = l1b.waveform.power_view
+            rng = l1b.waveform.range_view
             radar_mode = l1b.waveform.radar_mode
             is_ocean = l1b.surface_type.get_by_name("ocean").flag
 
@@ -74,8 +74,8 @@ class Sentinel3SRALL1b(object):
         from pysiral.iotools import ReadNC
         self._validate()
 
-        # Read the L2 netCDF file
-        self.nc = ReadNC(self.filename, nan_fill_value=True)
+        # Read the L2 netCDF file (variables are read on first access)
+        self.nc = ReadNC(self.filename, nan_fill_value=True, lazy=True)
 
     def get_status(self):
         # XXX: Not much functionality here
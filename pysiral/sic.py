@@ -5,11 +5,10 @@ Created on Sun Apr 24 13:57:56 2016
 @author: Stefan
 """
 
-from pysiral.auxdata import AuxdataBaseClass, GridTrackInterpol
+from pysiral.auxdata import (AuxdataBaseClass, GridTrackInterpol,
+                             get_grid_geometry)
 from pysiral.iotools import ReadNC
 
-import scipy.ndimage as ndimage
-from pyproj import Proj
 import numpy as np
 import os
 
@@ -79,7 +78,7 @@ class OsiSafSIC(SICBaseClass):
             return
 
         # --- Read the data ---
-        self._data = ReadNC(path)
+        self._data = ReadNC(path, variables=["lon", "lat", "ice_conc"])
 
         # --- Pre-process the data ---
         # Remove time dimension
@@ -158,7 +157,8 @@ class IfremerSIC(SICBaseClass):
         for hemisphere in ["north", "south"]:
             grid_file = os.path.join(
                 self._local_repository, "grid_%s_12km.nc" % hemisphere)
-            self._grid[hemisphere] = ReadNC(grid_file)
+            self._grid[hemisphere] = ReadNC(
+                grid_file, variables=["longitude", "latitude"])
 
     def _get_along_track_sic(self, l2):
         self._msg = ""
@@ -169,17 +169,18 @@ class IfremerSIC(SICBaseClass):
 
     def _get_requested_date(self, l2):
         """ Use first timestamp as reference, date changes are ignored """
-        year = l2.track.timestamp[0].year
-        month = l2.track.timestamp[0].month
-        day = l2.track.timestamp[0].day
+        year = l2.track.start_datetime.year
+        month = l2.track.start_datetime.month
+        day = l2.track.start_datetime.day
         self._requested_date = [year, month, day]
 
     def _get_data(self, l2):
         """ Loads file from local repository only if needed """
-        if self._requested_date == self._current_date:
-            # Data already loaded, nothing to do
-            return
         path = self._get_local_repository_filename(l2)
+        self.hemisphere_code = l2.hemisphere_code
+        cache_key = self.get_cache_key(path)
+        if self.set_data_from_cache(cache_key):
+            return
 
         # Validation
         if not os.path.isfile(path):
@@ -187,7 +188,7 @@ class IfremerSIC(SICBaseClass):
             self.error.add_error("auxdata_missing_sic", self._msg)
             return
 
-        self._data = ReadNC(path)
+        self._data = ReadNC(path, variables=["concentration"])
         self._data.ice_conc = self._data.concentration[0, :, :]
         flagged = np.where(
             np.logical_or(self._data.ice_conc < 0, self._data.ice_conc > 100))
@@ -196,7 +197,7 @@ class IfremerSIC(SICBaseClass):
         # This step is important for calculation of image coordinates
         self._data.ice_conc = np.flipud(self._data.ice_conc)
         self._msg = "IfremerSIC: Loaded SIC file: %s" % path
-        self._current_date = self._requested_date
+        self.add_data_to_cache(cache_key)
 
     def _get_local_repository_filename(self, l2):
         path = self._local_repository
@@ -210,20 +211,16 @@ class IfremerSIC(SICBaseClass):
         return path
 
     def _get_sic_track(self, l2):
-        # Convert grid/track coordinates to grid projection coordinates
-        kwargs = self._options[l2.hemisphere].projection
-        p = Proj(**kwargs)
+        # Grid origin: first grid cell of the last line
+        # (only the track coordinates are projected for each orbit)
+        griddef = self._options[l2.hemisphere]
         grid = self._grid[l2.hemisphere]
-        x, y = p(grid.longitude, grid.latitude)
-        l2x, l2y = p(l2.track.longitude, l2.track.latitude)
-        # Convert track projection coordinates to image coordinates
-        # x: 0 < n_lines; y: 0 < n_cols
-        dim = self._options[l2.hemisphere].dimension
-        x_min = x[dim.n_lines-1, 0]
-        y_min = y[dim.n_lines-1, 0]
-        ix, iy = (l2x-x_min)/dim.dx, (l2y-y_min)/dim.dy
+        geometry = get_grid_geometry(
+            grid.longitude, grid.latitude, griddef,
+            origin_cell=(griddef.dimension.n_lines-1, 0))
         # Extract along track data from grid
-        sic = ndimage.map_coordinates(self._data.ice_conc, [iy, ix], order=0)
+        sic = geometry.get_track_values(
+            self._data.ice_conc, l2.track.longitude, l2.track.latitude)
         return sic
 
 #        # XXX: Debug stuff below
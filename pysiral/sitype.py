@@ -5,11 +5,10 @@ Created on Sun Apr 24 13:57:56 2016
 @author: Stefan
 """
 
-from pysiral.auxdata import AuxdataBaseClass, GridTrackInterpol
+from pysiral.auxdata import (AuxdataBaseClass, GridTrackInterpol,
+                             get_grid_geometry)
 from pysiral.iotools import ReadNC
 
-import scipy.ndimage as ndimage
-from pyproj import Proj
 import numpy as np
 import os
 
@@ -77,7 +76,8 @@ class OsiSafSIType(SITypeBaseClass):
             return
 
         # --- Read the data ---
-        self._data = ReadNC(path)
+        self._data = ReadNC(path, variables=["lon", "lat", "ice_type",
+                                             "confidence_level"])
 
         self._msg = "OsiSafSIType: Loaded SIType file: %s" % path
 
@@ -154,20 +154,23 @@ class OsiSafSITypeCDR(SITypeBaseClass):
 
     def _get_requested_date(self, l2):
         """ Use first timestamp as reference, date changes are ignored """
-        year = l2.track.timestamp[0].year
-        month = l2.track.timestamp[0].month
-        day = l2.track.timestamp[0].day
+        year = l2.track.start_datetime.year
+        month = l2.track.start_datetime.month
+        day = l2.track.start_datetime.day
         self._requested_date = [year, month, day]
 
     def _get_data(self, l2):
         """ Loads file from local repository only if needed """
-        if self._requested_date == self._current_date:
-            # Data already loaded, nothing to do
-            return
 
         # construct filename
         path = self._get_local_repository_filename(l2)
 
+        # Check if file is already loaded or in the auxdata cache
+        self.hemisphere_code = l2.hemisphere_code
+        cache_key = self.get_cache_key(path)
+        if self.set_data_from_cache(cache_key):
+            return
+
         # Validation
         if not os.path.isfile(path):
             msg = "OsiSafSIType: File not found: %s " % path
@@ -175,13 +178,14 @@ class OsiSafSITypeCDR(SITypeBaseClass):
             return
 
         # Read and prepare input data
-        self._data = ReadNC(path)
+        self._data = ReadNC(path, variables=["lon", "lat", "ice_type",
+                                             "uncertainty"])
         self._data.ice_type = np.flipud(self._data.ice_type[0, :, :])
         self._data.uncertainty = np.flipud(self._data.uncertainty[0, :, :])
 
         # Logging
         self._msg = "OsiSafSIType: Loaded SIType file: %s" % path
-        self._current_date = self._requested_date
+        self.add_data_to_cache(cache_key)
 
     def _get_local_repository_filename(self, l2):
         path = self._local_repository
@@ -206,24 +210,18 @@ class OsiSafSITypeCDR(SITypeBaseClass):
     def _get_sitype_track(self, l2):
         """ Extract ice type and ice type uncertainty along the track """
 
-        # Convert grid/track coordinates to grid projection coordinates
-        kwargs = self._options[l2.hemisphere].projection
-        p = Proj(**kwargs)
-        x, y = p(self._data.lon, self._data.lat)
-        l2x, l2y = p(l2.track.longitude, l2.track.latitude)
-
-        # Convert track projection coordinates to image coordinates
-        # x: 0 < n_lines; y: 0 < n_cols
-        dim = self._options[l2.hemisphere].dimension
-        x_min = x[dim.n_lines-1, 0]-(0.5*dim.dx)
-        y_min = y[dim.n_lines-1, 0]-(0.5*dim.dy)
-        ix, iy = (l2x-x_min)/dim.dx, (l2y-y_min)/dim.dy
+        # Grid origin: corner of the first grid cell of the last line
+        # (only the track coordinates are projected for each orbit)
+        griddef = self._options[l2.hemisphere]
+        geometry = get_grid_geometry(
+            self._data.lon, self._data.lat, griddef,
+            origin_cell=(griddef.dimension.n_lines-1, 0), origin_offset=0.5)
 
         # Extract along track data from grid
-        sitype = ndimage.map_coordinates(
-            self._data.ice_type, [iy, ix], order=0)
-        uncertainty = ndimage.map_coordinates(
-            self._data.uncertainty, [iy, ix], order=0)
+        lons, lats = l2.track.longitude, l2.track.latitude
+        sitype = geometry.get_track_values(self._data.ice_type, lons, lats)
+        uncertainty = geometry.get_track_values(
+            self._data.uncertainty, lons, lats)
 
         # Convert flags to myi fraction
         translator = np.array([np.nan, np.nan, 0.0, 1.0, 0.5, np.nan])
@@ -286,9 +284,9 @@ class ICDCNasaTeam(SITypeBaseClass):
 
     def _get_requested_date(self, l2):
         """ Use first timestamp as reference, date changes are ignored """
-        year = l2.track.timestamp[0].year
-        month = l2.track.timestamp[0].month
-        day = l2.track.timestamp[0].day
+        year = l2.track.start_datetime.year
+        month = l2.track.start_datetime.month
+        day = l2.track.start_datetime.day
         self._requested_date = [year, month, day]
 
     def _get_data(self, l2):
@@ -296,15 +294,15 @@ class ICDCNasaTeam(SITypeBaseClass):
 
         opt = self._options
 
-        # Check if file is already loaded
-        if self._requested_date == self._current_date:
-            # Data already loaded, nothing to do
-            self._msg = "ICDCNasaTeam: Daily grid already present"
-            return
-
         # construct filename
         path = self._get_local_repository_filename(l2)
 
+        # Check if file is already loaded or in the auxdata cache
+        self.hemisphere_code = l2.hemisphere_code
+        cache_key = self.get_cache_key(path)
+        if self.set_data_from_cache(cache_key):
+            return
+
         # Check if the file exists, add an error if not
         # (error is not raised at this point)
         if not os.path.isfile(path):
@@ -312,8 +310,10 @@ class ICDCNasaTeam(SITypeBaseClass):
             self.error.add_error("auxdata_missing_sitype", self._msg)
             return
 
-        # Bulk read the netcdf file
-        self._data = ReadNC(path)
+        # Read the required variables of the netcdf file
+        self._data = ReadNC(path, variables=[
+            "longitude", "latitude", opt.variable_name,
+            opt.uncertainty_variable_name])
 
         # There are multiple myi concentrations fields in the product
         # The one used here is defined in the auxdata definition file
@@ -330,7 +330,7 @@ class ICDCNasaTeam(SITypeBaseClass):
 
         # Report and save current data period
         self._msg = "ICDCNasaTeam: Loaded SIType file: %s" % path
-        self._current_date = self._requested_date
+        self.add_data_to_cache(cache_key)
 
     def _get_local_repository_filename(self, l2):
         path = self._local_repository
@@ -345,26 +345,20 @@ class ICDCNasaTeam(SITypeBaseClass):
 
     def _get_sitype_track(self, l2):
 
-        # Convert grid/track coordinates to grid projection coordinates
-        kwargs = self._options[l2.hemisphere].projection
-        p = Proj(**kwargs)
-        x, y = p(self._data.longitude, self._data.latitude)
-        l2x, l2y = p(l2.track.longitude, l2.track.latitude)
-
-        # Convert track projection coordinates to image coordinates
-        # x: 0 < n_lines; y: 0 < n_cols
-        dim = self._options[l2.hemisphere].dimension
-
-        x_min = x[0, 0]-(0.5*dim.dx)
-        y_min = y[0, 0]-(0.5*dim.dy)
-        ix, iy = (l2x-x_min)/dim.dx, (l2y-y_min)/dim.dy
+        # Grid origin: corner of the first grid cell
+        # (only the track coordinates are projected for each orbit)
+        griddef = self._options[l2.hemisphere]
+        geometry = get_grid_geometry(
+            self._data.longitude, self._data.latitude, griddef,
+            origin_cell=(0, 0), origin_offset=0.5)
 
         # Extract along track data from grid
-        myi_concentration_percent = ndimage.map_coordinates(
-            self._data.ice_type, [iy, ix], order=0)
+        lons, lats = l2.track.longitude, l2.track.latitude
+        myi_concentration_percent = geometry.get_track_values(
+            self._data.ice_type, lons, lats)
 
-        myi_concentration_uncertainty = ndimage.map_coordinates(
-            self._data.ice_type_uncertainty, [iy, ix], order=0)
+        myi_concentration_uncertainty = geometry.get_track_values(
+            self._data.ice_type_uncertainty, lons, lats)
 
         # Convert percent [0-100] into fraction [0-1]
         sitype = myi_concentration_percent/100.
@@ -5,12 +5,11 @@ Created on Sun Apr 24 13:57:56 2016
 @author: Stefan
 """
 
-from pysiral.auxdata import AuxdataBaseClass, GridTrackInterpol
+from pysiral.auxdata import (AuxdataBaseClass, GridTrackInterpol,
+                             get_grid_geometry)
 from pysiral.filter import idl_smooth
 from pysiral.iotools import ReadNC
 
-import scipy.ndimage as ndimage
-
 from pyproj import Proj
 import numpy as np
 import os
@@ -163,7 +162,7 @@ class Warren99(SnowBaseClass):
         """ This convinience function translates the information from the l2 object
         for the evaluate method """
         # get projection coordinates
-        month = l2.track.timestamp[0].month
+        month = l2.track.start_datetime.month
         snow = self.evaluate(l2.track.longitude, l2.track.latitude, month)
         return snow
 
@@ -263,7 +262,9 @@ class Warren99AMSR2Clim(SnowBaseClass):
             return
 
         # Read the data
-        self._data = ReadNC(path)
+        variables = ["longitude", "latitude", "w99_weight"]
+        variables.extend(self.options.variable_map.values())
+        self._data = ReadNC(path, variables=variables)
 
         # This step is important for calculation of image coordinates
         self._msg = self.__class__.__name__+": Loaded snow file: %s" % path
@@ -386,15 +387,17 @@ class ICDCSouthernClimatology(SnowBaseClass):
             self._msg = "ICDCSouthernClimatology: File not found: %s " % path
             self.error.add_error("auxdata_missing_snow", self._msg)
             return
-        self._data = ReadNC(path)
+        self._data = ReadNC(path, variables=[
+            "lon", "lat", self._options.snow_depth_nc_variable,
+            self._options.snow_depth_uncertainty_nc_variable])
         # This step is important for calculation of image coordinates
         # self._data.ice_conc = np.flipud(self._data.ice_conc)
         self._msg = "ICDCSouthernClimatology: Loaded SIC file: %s" % path
 
     def _get_requested_date(self, l2):
         """ Use first timestamp as reference, date changes are ignored """
-        month = l2.track.timestamp[0].month
-        day = l2.track.timestamp[0].day
+        month = l2.track.start_datetime.month
+        day = l2.track.start_datetime.day
         self._requested_date = [month, day]
 
     def _get_local_repository_filename(self, l2):
@@ -406,34 +409,24 @@ class ICDCSouthernClimatology(SnowBaseClass):
 
     def _get_snow_track(self, l2):
 
-        # TODO: Move functionality to image coordinate class
-
-        # Convert grid/track coordinates to grid projection coordinates
-        kwargs = self._options[l2.hemisphere].projection
-        p = Proj(**kwargs)
-        x, y = p(self._data.lon, self._data.lat)
-        l2x, l2y = p(l2.track.longitude, l2.track.latitude)
-
-        # Convert track projection coordinates to image coordinates
-        # x: 0 < n_lines; y: 0 < n_cols
-        dim = self._options[l2.hemisphere].dimension
-        x_min, y_min = np.nanmin(x), np.nanmin(y)
-        ix, iy = (l2x-x_min)/dim.dx, (l2y-y_min)/dim.dy
+        # Grid origin: minimum of the grid projection coordinates
+        # (the grid is only projected once, see get_grid_geometry)
+        griddef = self._options[l2.hemisphere]
+        geometry = get_grid_geometry(self._data.lon, self._data.lat, griddef)
+        lons, lats = l2.track.longitude, l2.track.latitude
 
         # Extract snow depth along track data from grid
         sd_parameter_name = self._options.snow_depth_nc_variable
         sdgrid = getattr(self._data, sd_parameter_name)[0, :, :]
-        sdgrid = np.flipud(sdgrid)
         # sdgrid = np.roll(sdgrid, 16, axis=0)
-        sd = ndimage.map_coordinates(sdgrid, [iy, ix], order=0)
+        sd = geometry.get_track_values(sdgrid, lons, lats, flipud=True)
         sd[sd < 0.0] = np.nan
 
         # Extract snow depth uncertainty
         unc_parameter_name = self._options.snow_depth_uncertainty_nc_variable
         uncgrid = getattr(self._data, unc_parameter_name)[0, :, :]
-        uncgrid = np.flipud(uncgrid)
         # uncgrid = np.roll(uncgrid, 16, axis=0)
-        unc = ndimage.map_coordinates(uncgrid, [iy, ix], order=0)
+        unc = geometry.get_track_values(uncgrid, lons, lats, flipud=True)
         unc[unc < 0.0] = np.nan
 
 #        import matplotlib.pyplot as plt
@@ -7,6 +7,8 @@ Created on Mon Jul 27 11:25:04 2015
 
 from pysiral.config import RadarModes
 from pysiral.flag import FlagContainer, ANDCondition
+from pysiral.rolling import (rolling_nanmean, rolling_nanstd,
+                             rolling_nanmean_above)
 
 import numpy as np
 from treedict import TreeDict
@@ -739,33 +741,18 @@ class ICESatKhvorostovskyTPEnhanced(SurfaceTypeClassifier):
         invalid = np.where(reflectivity > 1)[0]
         reflectivity[invalid] = np.nan
 
-        # Support Varaibles (Debug purposes only)
-        filter_mean = np.full(reflectivity.shape, np.nan)
-        filter_sdev = np.full(reflectivity.shape, np.nan)
-        filter_threshold = np.full(reflectivity.shape, np.nan)
-
-        # First try: simple loop (is there a better way?)
-        n = len(reflectivity)
-        filter_pad = int((window_size-1)/2)
-        for i in index_list:
-
-            # Get indices
-            i0, i1 = i-filter_pad, i+filter_pad+1
-            i0 = i0 if i0 >= 0 else 0
-            i1 = i1 if i1 <= n-1 else n
-
-            # Get statistics of filter subset
-            reflectivity_subset = reflectivity[i0:i1]
-            filter_mean[i] = np.nanmean(reflectivity_subset)
-            filter_sdev[i] = np.nanstd(reflectivity_subset)
-
-            # Background reflectivity is mean of filter values above
-            # certain threshold to exclude other leads
-            threshold = filter_mean[i] - sdev_factor * filter_sdev[i]
-            filter_threshold[i] = threshold
-            background_values = np.where(reflectivity_subset > threshold)[0]
-            background_reflectivity[i] = np.nanmean(
-                    reflectivity_subset[background_values])
+        # Get statistics of filter window
+        filter_mean = rolling_nanmean(
+                reflectivity, window_size, indices=index_list)
+        filter_sdev = rolling_nanstd(
+                reflectivity, window_size, indices=index_list)
+
+        # Background reflectivity is mean of filter values above
+        # certain threshold to exclude other leads
+        filter_threshold = filter_mean - sdev_factor * filter_sdev
+        background_reflectivity[index_list] = rolling_nanmean_above(
+                reflectivity, window_size, filter_threshold,
+                indices=index_list)
 
         # Compute local reflectivity offset from background reflectivity
         delta_r = background_reflectivity - reflectivity
@@ -800,29 +787,15 @@ class ICESatKhvorostovskyTPEnhanced(SurfaceTypeClassifier):
         # Only compute for valid elevations
         index_list = np.where(np.isfinite(elevation))[0]
 
-        n = len(elevation)
-        filter_pad = int((window_size-1)/2)
-
         # First pass: compute hr
-        for i in index_list:
-            # Get indices
-            i0, i1 = i-filter_pad, i+filter_pad+1
-            i0 = i0 if i0 >= 0 else 0
-            i1 = i1 if i1 <= n-1 else n
-            # Get statistics of filter subset
-            elevation_subset = elevation[i0:i1]
-            hr[i] = elevation[i] - np.nanmean(elevation_subset)
+        hr[index_list] = elevation[index_list] - rolling_nanmean(
+                elevation, window_size, indices=index_list)
 
         # second pass: compute hr statistics
-        for i in index_list:
-            # Get indices
-            i0, i1 = i-filter_pad, i+filter_pad+1
-            i0 = i0 if i0 >= 0 else 0
-            i1 = i1 if i1 <= n-1 else n
-            # Get statistics of filter subset
-            hr_subset = hr[i0:i1]
-            hr_mean[i] = np.nanmean(hr_subset)
-            hr_sigma[i] = np.nanstd(hr_subset)
+        hr_mean[index_list] = rolling_nanmean(
+                hr, window_size, indices=index_list)
+        hr_sigma[index_list] = rolling_nanstd(
+                hr, window_size, indices=index_list)
 
         return hr, hr_mean, hr_sigma, index_list
 
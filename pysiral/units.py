@@ -5,96 +5,131 @@ from construct import Adapter
 import numpy as np
 
 
-class OneHundredth(Adapter):
+class UnitAdapter(Adapter):
+    """ Base class for adapters that convert the integer values of binary
+    data files into physical units. The conversion is implemented in
+    `decode` which accepts scalars as well as numpy arrays (used for
+    vectorized parsing with numpy structured dtypes, see pysiral.esa.mds) """
+
     def _decode(self, obj, context):
-        return np.float32(float(obj)/100)
+        return self.decode(obj)
 
+    @staticmethod
+    def decode(obj):
+        raise NotImplementedError(
+            "UnitAdapter.decode: unit conversion needs to be implemented "
+            "by the subclass")
 
-class TenThousands(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*10000)
 
+class OneHundredth(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)/100)
 
-class OneHundredthDecibel(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)/100)
 
+class TenThousands(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*10000)
 
-class OneTenthMicroDeg(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-7)
 
+class OneHundredthDecibel(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)/100)
 
-class MicroDeg(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-6)
 
+class OneTenthMicroDeg(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-7)
 
-class TenMicroDeg(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-5)
 
+class MicroDeg(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-6)
 
-class Centimeter(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-2)
 
+class TenMicroDeg(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-5)
 
-class MilliMeter(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-3)
 
+class Centimeter(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-2)
 
-class Micrometer(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-6)
 
+class MilliMeter(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-3)
 
-class PicoSecond(Adapter):
-    def _decode(self, obj, context):
-        return float(obj)*1e-12
 
+class Micrometer(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-6)
 
-class MicroWatts(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-6)
 
+class PicoSecond(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.asarray(obj, dtype=np.float64)*1e-12
 
-class MicroRadians(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-6)
 
+class MicroWatts(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-6)
 
-class OneTenthMicroRadians(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-6)
 
+class MicroRadians(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-6)
 
-class OneTenths(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-1)
 
+class OneTenthMicroRadians(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-6)
 
-class OneThousands(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-3)
 
+class OneTenths(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-1)
 
-class TenPascal(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)*1e-1)
 
+class OneThousands(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-3)
 
-class Per256(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)/256.)
 
+class TenPascal(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)*1e-1)
 
-class Per2048(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)/2048.)
 
+class Per256(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)/256.)
 
-class Per8096(Adapter):
-    def _decode(self, obj, context):
-        return np.float32(float(obj)/8096.)
+
+class Per2048(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)/2048.)
+
+
+class Per8096(UnitAdapter):
+    @staticmethod
+    def decode(obj):
+        return np.float32(np.asarray(obj, dtype=np.float64)/8096.)
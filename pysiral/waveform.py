@@ -7,6 +7,7 @@ Created on Fri Jul 01 13:07:10 2016
 
 from retracker import SICCI2TfmraEnvisat
 import numpy as np
+import inspect
 
 
 def get_waveforms_peak_power(wfm, dB=False):
@@ -28,14 +29,67 @@ def get_waveforms_peak_power(wfm, dB=False):
     return peak_power
 
 
-def get_sar_sigma0(wf_peak_power_watt, tx_pwr, r, v_s, **sigma0_par_dict):
+def get_sar_sigma0(wf_peak_power_watt, tx_pwr, r, v_s, dtype=np.float64,
+                   **sigma0_par_dict):
     """ Wrapper function to compute sigma nought for all waveforms """
-    n_records = wf_peak_power_watt.shape[0]
-    sigma0 = np.ndarray(shape=(n_records))
-    for i in np.arange(n_records):
-        sigma0[i] = sar_sigma0(wf_peak_power_watt[i], tx_pwr[i], r[i], v_s[i],
-                               **sigma0_par_dict)
-    return sigma0
+    sigma0 = SARSigma0(**sigma0_par_dict)
+    return sigma0.get(wf_peak_power_watt, tx_pwr, r, v_s, dtype=dtype)
+
+
+class SARSigma0(object):
+    """
+    Array version of sar_sigma0. The terms that only depend on the
+    (mission) parameters are computed once, sigma nought is computed for
+    arrays of waveform peak power, transmitted power, range and satellite
+    velocity (numpy broadcasting rules apply).
+
+    Usage:
+
+        sigma0 = SARSigma0(wf=1.486)  # keywords of sar_sigma0
+        sigma0.get(wf_peak_power_watt, tx_pwr, r, v_s)
+    """
+
+    def __init__(self, **sigma0_par_dict):
+        parameter = dict(self.default_parameter)
+        for name in sigma0_par_dict.keys():
+            if name not in parameter:
+                raise TypeError("invalid sigma0 parameter: %s" % name)
+        parameter.update(sigma0_par_dict)
+        self.parameter = parameter
+        self._init_constants()
+
+    def _init_constants(self):
+        """ Range & velocity independent terms of sar_sigma0 """
+        par = self.parameter
+        # lx = lambda_0 * r / (2. * v_s * tau_b)
+        self._lx_factor = par["lambda_0"] / (2. * par["tau_b"])
+        # ly = sqrt(c_0 * ptr_width * r / alpha_earth)
+        self._ly_factor = par["c_0"] * par["ptr_width"]
+        # k = k_factor * r^4 / a_sar, with a_sar = 2 * ly * wf * lx
+        self._k_factor = ((4.*np.pi)**3. * par["l_atm"] * par["l_rx"]) / \
+            (par["lambda_0"]**2. * par["g_0"]**2. * 2. * par["wf"])
+
+    @property
+    def default_parameter(self):
+        """ Default parameter (CryoSat-2 SAR): keyword defaults of
+        sar_sigma0 """
+        argspec = inspect.getargspec(sar_sigma0)
+        n_keywords = len(argspec.defaults)
+        return dict(zip(argspec.args[-n_keywords:], argspec.defaults))
+
+    def get(self, wf_peak_power_watt, tx_pwr, r, v_s, dtype=np.float64):
+        """ Returns sigma nought (see sar_sigma0 for the arguments) """
+        par = self.parameter
+        r = np.asarray(r, dtype=np.float64)
+        pu = np.asarray(wf_peak_power_watt, dtype=np.float64) + \
+            par["wf_thermal_noise_watt"]
+        alpha_earth = 1. + (r/par["r_mean"])
+        lx = self._lx_factor * r / v_s
+        ly = np.sqrt(self._ly_factor * r / alpha_earth)
+        r2 = r*r
+        k = self._k_factor * (r2*r2) / (ly * lx)
+        sigma0 = 10. * np.log10(pu * k / tx_pwr) + par["bias_sigma0"]
+        return sigma0.astype(dtype, copy=False)
 
 
 def sar_sigma0(wf_peak_power_watt, tx_pwr, r, v_s,
@@ -22,9 +22,20 @@ mypackage_root_dir = os.path.dirname(os.path.abspath(__file__))
 with open(os.path.join(mypackage_root_dir, "pysiral", 'VERSION')) as version_file:
     version = version_file.read().strip()
 
+# OpenMP support for the cythonized TFMRA kernel is optional
+# (build with e.g.: PYSIRAL_OPENMP=1 python setup.py build_ext --inplace)
+openmp_compile_args, openmp_link_args = [], []
+if os.environ.get("PYSIRAL_OPENMP", "0") == "1":
+    if os.name == "nt":
+        openmp_compile_args = ["/openmp"]
+    else:
+        openmp_compile_args = openmp_link_args = ["-fopenmp"]
+
 # cythonized extensions go here
 extensions = [
-    Extension("pysiral.bnfunc.cytfmra", [os.path.join("pysiral", "bnfunc", "cytfmra.pyx")])]
+    Extension("pysiral.bnfunc.cytfmra", [os.path.join("pysiral", "bnfunc", "cytfmra.pyx")],
+              extra_compile_args=openmp_compile_args,
+              extra_link_args=openmp_link_args)]
 
 # Package requirements
 with open("requirements.txt") as f:
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+import scipy.ndimage as ndimage
+from pyproj import Proj
+from treedict import TreeDict
+
+from pysiral.auxdata import (AuxdataBaseClass, AuxdataCache, AUXDATA_CACHE,
+                             GRID_GEOMETRY_CACHE, GridTrackInterpol,
+                             get_grid_geometry, get_object_nbytes)
+from pysiral.sic import IfremerSIC
+from pysiral.sitype import ICDCNasaTeam, OsiSafSITypeCDR
+from pysiral.snow import ICDCSouthernClimatology
+
+
+def get_grid(dx=25000., n_cols=100, n_lines=120):
+    """ Polar stereographic grid definition and grid coordinates """
+    griddef = TreeDict.fromdict({
+        "projection": {"proj": "stere", "ellps": "WGS84", "lon_0": -45,
+                       "lat_0": 90, "lat_ts": 70},
+        "dimension": {"n_cols": n_cols, "n_lines": n_lines, "dx": dx,
+                      "dy": dx}}, expand_nested=True)
+    p = Proj(**griddef.projection)
+    x = (np.arange(n_cols) - n_cols/2.) * dx
+    y = (np.arange(n_lines) - n_lines/2.) * dx
+    grid_lons, grid_lats = p(*np.meshgrid(x, y), inverse=True)
+    return grid_lons, grid_lats, griddef
+
+
+class TestGridTrackInterpol(unittest.TestCase):
+
+    def setUp(self):
+        self.lons = np.linspace(-180., 180., 500)
+        self.lats = np.linspace(70., 85., 500)
+
+    def testCachedGeometry(self):
+        grid_lons, grid_lats, griddef = get_grid()
+        geometry = get_grid_geometry(grid_lons, grid_lats, griddef)
+        self.assertIs(geometry, get_grid_geometry(
+            grid_lons.copy(), grid_lats.copy(), griddef))
+        # Other grid spacing or grid coordinates: new geometry
+        self.assertIsNot(geometry, get_grid_geometry(*get_grid(dx=12500.)))
+        self.assertIsNot(geometry, get_grid_geometry(
+            grid_lons+1., grid_lats, griddef))
+
+    def testInvalidCornerCoordinates(self):
+        grid_lons, grid_lats, griddef = get_grid()
+        grid_lons[0, 0], grid_lats[-1, -1] = np.nan, np.nan
+        geometry = get_grid_geometry(grid_lons, grid_lats, griddef)
+        self.assertIs(geometry, get_grid_geometry(
+            grid_lons.copy(), grid_lats.copy(), griddef))
+        masked_lats = np.ma.masked_invalid(grid_lats)
+        self.assertIs(get_grid_geometry(grid_lons, masked_lats, griddef),
+                      get_grid_geometry(grid_lons, masked_lats.copy(), griddef))
+
+    def testGeometryCacheSize(self):
+        grid_lons, grid_lats, griddef = get_grid()
+        for i in range(GRID_GEOMETRY_CACHE.max_items + 5):
+            get_grid_geometry(grid_lons + i*0.1, grid_lats, griddef)
+        self.assertEqual(GRID_GEOMETRY_CACHE.n_items,
+                         GRID_GEOMETRY_CACHE.max_items)
+
+    def testImageCoordinates(self):
+        grid_lons, grid_lats, griddef = get_grid()
+        grid2track = GridTrackInterpol(
+            self.lons, self.lats, grid_lons, grid_lats, griddef)
+        # Reference: projection of full grid
+        p = Proj(**griddef.projection)
+        x, y = p(grid_lons, grid_lats)
+        tr_x, tr_y = p(self.lons, self.lats)
+        np.testing.assert_allclose(grid2track.ix, (tr_x-np.nanmin(x))/25000.)
+        np.testing.assert_allclose(grid2track.iy, (tr_y-np.nanmin(y))/25000.)
+        gridvar = np.random.RandomState(0).rand(*grid_lons.shape)
+        np.testing.assert_array_equal(
+            grid2track.get_from_grid_variable(gridvar, flipud=True),
+            grid2track.geometry.get_track_values(
+                gridvar, self.lons, self.lats, flipud=True))
+
+
+class StubL2(object):
+    """ Ground track of a Level-2 data object """
+
+    def __init__(self, lons, lats):
+        self.hemisphere = "north"
+        self.track = TreeDict.fromdict(
+            {"longitude": lons, "latitude": lats})
+        self.footprint_spacing = 300.
+
+
+def get_full_grid_track_values(gridvar, l2, grid_lons, grid_lats, griddef,
+                               origin=None, offset=0.0):
+    """ Reference: image coordinates from the projection of the full grid
+    (origin: grid cell index or minimum of the projection coordinates) """
+    p = Proj(**griddef.projection)
+    x, y = p(grid_lons, grid_lats)
+    l2x, l2y = p(l2.track.longitude, l2.track.latitude)
+    dim = griddef.dimension
+    if origin is None:
+        x_min, y_min = np.nanmin(x), np.nanmin(y)
+    else:
+        x_min = x[origin]-(offset*dim.dx)
+        y_min = y[origin]-(offset*dim.dy)
+    ix, iy = (l2x-x_min)/dim.dx, (l2y-y_min)/dim.dy
+    return ndimage.map_coordinates(gridvar, [iy, ix], order=0)
+
+
+class TestAuxdataGridHandlers(unittest.TestCase):
+    """ Along-track data of the auxdata handlers with grid specific image
+    coordinate origins (same result as the full grid projection) """
+
+    def setUp(self):
+        GRID_GEOMETRY_CACHE.clear()
+        self.grid_lons, self.grid_lats, self.griddef = get_grid()
+        self.l2 = StubL2(np.linspace(-180., 180., 500),
+                         np.linspace(75., 88., 500))
+        random = np.random.RandomState(0)
+        self.values = random.rand(*self.grid_lons.shape) * 120. - 10.
+        self.flags = random.randint(-1, 5, size=self.grid_lons.shape)
+        self.n_lines = self.grid_lons.shape[0]
+        # Grids with the first line at the top (origin in the last line)
+        self.topdown_lons = np.flipud(self.grid_lons)
+        self.topdown_lats = np.flipud(self.grid_lats)
+
+    def assertTrackValues(self, result, reference):
+        # The track needs to be in the grid
+        self.assertTrue(np.mean(reference != 0) > 0.5)
+        np.testing.assert_array_equal(result, reference)
+
+    def get_data(self, **variables):
+        return TreeDict.fromdict(variables)
+
+    def testIfremerSIC(self):
+        handler = IfremerSIC()
+        handler.set_options(north=self.griddef)
+        handler._grid = {"north": self.get_data(
+            longitude=self.topdown_lons, latitude=self.topdown_lats)}
+        handler._data = self.get_data(ice_conc=self.values)
+        reference = get_full_grid_track_values(
+            self.values, self.l2, self.topdown_lons, self.topdown_lats,
+            self.griddef, origin=(self.n_lines-1, 0))
+        self.assertTrackValues(handler._get_sic_track(self.l2), reference)
+
+    def testOsiSafSITypeCDR(self):
+        handler = OsiSafSITypeCDR()
+        handler.set_options(north=self.griddef)
+        handler._data = self.get_data(
+            lon=self.topdown_lons, lat=self.topdown_lats,
+            ice_type=self.flags, uncertainty=self.values)
+        sitype, uncertainty = handler._get_sitype_track(self.l2)
+        args = (self.l2, self.topdown_lons, self.topdown_lats, self.griddef,
+                (self.n_lines-1, 0), 0.5)
+        flags = get_full_grid_track_values(self.flags, *args)
+        flags[flags == -1] = 5
+        translator = np.array([np.nan, np.nan, 0.0, 1.0, 0.5, np.nan])
+        np.testing.assert_array_equal(sitype, translator[flags])
+        self.assertTrackValues(
+            uncertainty, get_full_grid_track_values(self.values, *args)/100.)
+
+    def testICDCNasaTeam(self):
+        handler = ICDCNasaTeam()
+        handler.set_options(north=self.griddef)
+        handler._data = self.get_data(
+            longitude=self.grid_lons, latitude=self.grid_lats,
+            ice_type=self.values, ice_type_uncertainty=self.values[::-1])
+        sitype, uncertainty = handler._get_sitype_track(self.l2)
+        args = (self.l2, self.grid_lons, self.grid_lats, self.griddef,
+                (0, 0), 0.5)
+        reference = get_full_grid_track_values(self.values, *args)/100.
+        reference[reference < 0] = 0.0
+        self.assertTrackValues(sitype, reference)
+        reference = get_full_grid_track_values(self.values[::-1], *args)/100.
+        reference[reference < 0] = 0.0
+        self.assertTrackValues(uncertainty, reference)
+
+    def testICDCSouthernClimatology(self):
+        handler = ICDCSouthernClimatology()
+        handler.set_options(north=self.griddef, snow_depth_nc_variable="sd",
+                            snow_depth_uncertainty_nc_variable="sd_unc")
+        handler._data = self.get_data(
+            lon=self.grid_lons, lat=self.grid_lats,
+            sd=self.values[np.newaxis, :, :],
+            sd_unc=self.values[np.newaxis, ::-1, :])
+        sd, unc = handler._get_snow_track(self.l2)
+        for values, result in [(self.values, sd), (self.values[::-1], unc)]:
+            reference = get_full_grid_track_values(
+                np.flipud(values), self.l2, self.grid_lons, self.grid_lats,
+                self.griddef)
+            reference[reference < 0.0] = np.nan
+            self.assertTrackValues(result, reference)
+        # The grid is only projected once for all orbits
+        geometry = get_grid_geometry(
+            self.grid_lons, self.grid_lats, self.griddef)
+        self.assertEqual(GRID_GEOMETRY_CACHE.n_items, 1)
+        handler._get_snow_track(self.l2)
+        self.assertIs(geometry, get_grid_geometry(
+            self.grid_lons, self.grid_lats, self.griddef))
+
+
+class DailyGridAuxdata(AuxdataBaseClass):
+    """ Daily auxiliary data product that counts the loaded files """
+
+    def __init__(self):
+        super(DailyGridAuxdata, self).__init__()
+        self.set_local_repository("daily")
+        self.set_filenaming("grid_{hemisphere_code}_{year}{month}{day}.nc")
+        self.loaded_files = []
+
+    def load_requested_auxdata(self):
+        self.loaded_files.append(self.requested_filepath)
+        self._data = np.zeros((100, 100))
+
+
+class MonthlyGridAuxdata(DailyGridAuxdata):
+    """ Monthly auxiliary data product (e.g. snow climatology) """
+
+    def __init__(self):
+        super(MonthlyGridAuxdata, self).__init__()
+        self.set_filenaming("grid_{hemisphere_code}_{year}{month}.nc")
+
+
+class TestAuxdataCache(unittest.TestCase):
+
+    def setUp(self):
+        AUXDATA_CACHE.clear()
+        AUXDATA_CACHE.reset_counters()
+
+    def tearDown(self):
+        AUXDATA_CACHE.clear()
+
+    def testLeastRecentlyUsed(self):
+        cache = AuxdataCache(max_size_mb=3.)
+        for key in ["a", "b", "c"]:
+            cache.add(key, np.zeros(1024*1024/8))
+        self.assertIsNotNone(cache.get("a"))
+        cache.add("d", np.zeros(1024*1024/8))
+        # "b" is the least recently used item
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.n_items, 3)
+        self.assertEqual(cache.counters, (1, 1))
+        # Objects larger than the cache are not cached
+        cache.add("e", np.zeros(4*1024*1024/8))
+        self.assertIsNone(cache.get("e"))
+        cache.configure(enabled=False)
+        self.assertEqual(cache.n_items, 0)
+
+    def testObjectSize(self):
+        data = DailyGridAuxdata()
+        array = np.zeros(1000)
+        data.ice_conc = array
+        data._grid = {"north": {"lon": np.zeros(100)}, "south": [array]}
+        data.griddef = TreeDict.fromdict(
+            {"projection": {"lat": np.zeros(10)}}, expand_nested=True)
+        # Arrays are counted once
+        self.assertEqual(get_object_nbytes(data), 8*(1000+100+10))
+
+    def testDailyFilesLoadedOnce(self):
+        handler = DailyGridAuxdata()
+        # Orbits of one month, out of order and alternating hemispheres
+        random = np.random.RandomState(0)
+        days = np.repeat(np.arange(1, 31), 14)
+        random.shuffle(days)
+        for i, day in enumerate(days):
+            handler.hemisphere_code = ["nh", "sh"][i % 2]
+            handler.set_requested_date(2015, 3, day)
+            handler.update_external_data()
+            self.assertEqual(handler._data.shape, (100, 100))
+        self.assertEqual(len(handler.loaded_files), 60)
+        self.assertEqual(len(set(handler.loaded_files)), 60)
+        hits, misses = AUXDATA_CACHE.counters
+        self.assertEqual(misses, 60)
+
+    def testMonthlyFileLoadedOnce(self):
+        handler = MonthlyGridAuxdata()
+        handler.hemisphere_code = "nh"
+        for day in [1, 2]:
+            handler.set_requested_date(2015, 3, day)
+            handler.update_external_data()
+        # Other handler instances use the cached product
+        other_handler = MonthlyGridAuxdata()
+        other_handler.hemisphere_code = "nh"
+        other_handler.set_requested_date(2015, 3, 3)
+        other_handler.update_external_data()
+        self.assertIs(other_handler._data, handler._data)
+        self.assertEqual(handler.loaded_files, ["daily/grid_nh_201503.nc"])
+        self.assertEqual(other_handler.loaded_files, [])
+        self.assertEqual(AUXDATA_CACHE.n_items, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from pysiral.catalog import ProductCatalog
+from pysiral.config import TimeRangeIteration
+from pysiral.datahandler import L2iDataHandler
+
+
+L2I_FILES = [
+    "2015/02/l2i_v1p0_cryosat2_north_20150228T233000_20150301T001000.nc",
+    "2015/03/l2i_v1p0_cryosat2_north_20150301T120000_20150301T123000.nc",
+    "2015/03/l2i_v1p0_cryosat2_north_20150302T000000_20150302T003000.nc",
+    "2015/03/l2p-awi-seaice-cryosat2-nh-20150301-v1.0.nc",
+    "2015/03/unrecognized.nc"]
+
+
+class TestProductCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp_dir, "l2i")
+        for filename in L2I_FILES:
+            self.touch(filename)
+        self.catalog = ProductCatalog(
+            os.path.join(self.tmp_dir, "catalog", "products.sqlite"),
+            mission_ids=["cryosat2", "envisat"])
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def touch(self, filename):
+        path = os.path.join(self.root, filename)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, "w").close()
+        return path
+
+    def set_directory_mtimes(self, mtime):
+        for directory, subdirectories, filenames in os.walk(self.root):
+            os.utime(directory, (mtime, mtime))
+
+    def testQuery(self):
+        files = self.catalog.get_files(
+            "l2i", root=self.root, mission_id="cryosat2",
+            start=datetime(2015, 3, 1), stop=datetime(2015, 3, 1, 23, 59))
+        self.assertEqual([os.path.basename(f) for f in files],
+                         [os.path.basename(f) for f in L2I_FILES[:2]])
+        l2p = self.catalog.get_products("l2p", root=self.root)
+        self.assertEqual(len(l2p), 1)
+        self.assertEqual(l2p[0].hemisphere, "north")
+        self.assertEqual(l2p[0].stop, datetime(2015, 3, 1, 23, 59, 59,
+                                               999999))
+
+    def testIncrementalUpdate(self):
+        self.set_directory_mtimes(1.0e9)
+        self.assertEqual(self.catalog.update(self.root), 4)
+        self.assertEqual(self.catalog.update(self.root), 0)
+        # Only modified directories are listed
+        os.remove(os.path.join(self.root, L2I_FILES[2]))
+        self.touch("2015/04/l2i_v1p0_cryosat2_north_20150401T000000_"
+                   "20150401T003000.nc")
+        self.set_directory_mtimes(1.0e9)
+        for directory in ["2015", "2015/03", "2015/04"]:
+            os.utime(os.path.join(self.root, directory), (1.1e9, 1.1e9))
+        self.assertEqual(self.catalog.update(self.root), 3)
+        files = self.catalog.get_files("l2i", root=self.root)
+        self.assertEqual(len(files), 3)
+        shutil.rmtree(os.path.join(self.root, "2015", "04"))
+        self.catalog.update(self.root)
+        self.assertEqual(self.catalog.get_directories(self.root), [
+            os.path.join(self.root, "2015"),
+            os.path.join(self.root, "2015", "02"),
+            os.path.join(self.root, "2015", "03")])
+
+    def testL2iDataHandler(self):
+        handler = L2iDataHandler(self.root)
+        catalog_handler = L2iDataHandler(self.root, catalog=self.catalog)
+        self.assertEqual(handler.subdirectory_list,
+                         catalog_handler.subdirectory_list)
+        for day in [datetime(2015, 3, 1), datetime(2015, 3, 2)]:
+            self.assertEqual(
+                [os.path.abspath(f) for f in handler.get_files_for_day(day)],
+                catalog_handler.get_files_for_day(day))
+        time_range = TimeRangeIteration()
+        time_range.set_range(datetime(2015, 3, 1),
+                             datetime(2015, 3, 31, 23, 59, 59))
+        self.assertEqual(
+            [os.path.abspath(f) for f in
+             handler.get_files_from_time_range(time_range)],
+            catalog_handler.get_files_from_time_range(time_range))
+
+
+if __name__ == '__main__':
+    unittest.main()
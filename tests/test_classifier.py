@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+
+from pysiral.classifier import (CS2OCOGParameter, CS2PulsePeakiness,
+                                EnvisatWaveformParameter)
+
+
+def get_waveform_counts(n_records, n_range_bins, seed=2):
+    random = np.random.RandomState(seed)
+    counts = random.gamma(0.5, 1, (n_records, n_range_bins)) * \
+        random.uniform(10, 1e5, (n_records, 1))
+    counts = counts.astype(np.float32)
+    counts[3, :] = 0.0
+    counts[4, :] = np.nan
+    counts[5, :11] = np.nan
+    counts[6, 40:] = np.nan
+    counts[7, :] = 0.0
+    counts[7, 2] = 1.0e5
+    return counts
+
+
+def legacy_ocog(y):
+    y = y.astype(np.float32)
+    y -= np.nanmean(y[0:11])
+    y[np.where(y < 0.0)[0]] = 0.0
+    y2 = y**2.0
+    return np.sqrt((y2**2.0).sum() / y2.sum()), \
+        ((y2.sum())**2.0) / (y2**2.0).sum()
+
+
+def legacy_peakiness(y, pad=2):
+    n_range_bins = len(y)
+    y = y.astype(np.float32)
+    y -= np.nanmean(y[0:11])
+    y[np.where(y < 0.0)[0]] = 0.0
+    try:
+        yp, ypi = np.nanmax(y), np.nanargmax(y)
+    except ValueError:
+        return np.nan, np.nan, np.nan
+    if ypi > 3*pad and ypi < n_range_bins-4*pad:
+        return yp/y.sum()*n_range_bins, \
+            yp/np.nanmean(y[ypi-3*pad:ypi-1*pad+1])*3.0, \
+            yp/np.nanmean(y[ypi+1*pad:ypi+3*pad+1])*3.0
+    return np.nan, np.nan, np.nan
+
+
+class TestWaveformClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.counts = get_waveform_counts(200, 256)
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def assertBitIdentical(self, value, reference):
+        reference = np.float32(reference)
+        if np.isnan(reference):
+            self.assertTrue(np.isnan(value))
+        else:
+            self.assertEqual(value.view(np.uint32),
+                             reference.view(np.uint32))
+
+    def testOCOGParameter(self):
+        ocog = CS2OCOGParameter(self.counts)
+        for i, y in enumerate(self.counts):
+            amplitude, width = legacy_ocog(y)
+            self.assertBitIdentical(ocog.amplitude[i], amplitude)
+            self.assertBitIdentical(ocog.width[i], width)
+
+    def testPulsePeakiness(self):
+        pulse = CS2PulsePeakiness(self.counts)
+        for i, y in enumerate(self.counts):
+            pp, pp_l, pp_r = legacy_peakiness(y)
+            self.assertBitIdentical(pulse.peakiness[i], pp)
+            self.assertBitIdentical(pulse.peakiness_l[i], pp_l)
+            self.assertBitIdentical(pulse.peakiness_r[i], pp_r)
+
+    def testEnvisatWaveformParameter(self):
+        parameter = EnvisatWaveformParameter(self.counts)
+        for i, y in enumerate(self.counts):
+            wave = y[5:]
+            if sum(wave) == 0:
+                self.assertTrue(np.isnan(parameter.peakiness[i]))
+                continue
+            self.assertBitIdentical(
+                parameter.peakiness[i],
+                float(max(wave))/float(sum(wave))*256)
+            self.assertBitIdentical(
+                parameter.peakiness_old[i],
+                0.0 + 83 * float(max(wave))/float(sum(wave)))
+
+
+if __name__ == '__main__':
+    unittest.main()
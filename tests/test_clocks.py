@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pysiral import clocks
+
+
+class PackageLeapSecondsConverter(clocks.UTCTAIConverter):
+    """ Uses the leap seconds definition file of the package resources """
+
+    @property
+    def local_ls_ietf_definition(self):
+        return os.path.join(os.path.dirname(clocks.__file__), "resources",
+                            "pysiral-cfg", "leap-seconds.list")
+
+
+class TestUTCTAIConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.converter = PackageLeapSecondsConverter()
+
+    def testLeapSecondsPerRecord(self):
+        # Leap second 36 -> 37 s at 2017-01-01 (applied after one day)
+        tai = np.array([datetime(2016, 12, 31, 12), datetime(2017, 1, 1, 12),
+                        datetime(2017, 1, 2, 12)], dtype=object)
+        utc = self.converter.tai2utc(tai)
+        self.assertEqual([(t - u).total_seconds() for t, u in zip(tai, utc)],
+                         [36., 36., 37.])
+        self.assertTrue(isinstance(utc[0], datetime))
+        # Leap seconds from the first record only
+        utc = self.converter.tai2utc(tai, check_all=False)
+        self.assertEqual(utc[-1], tai[-1] - timedelta(seconds=36))
+
+    def testNumericConversion(self):
+        tai = np.datetime64("2015-03-01T00:00:00", "us") + \
+            np.arange(1000).astype("m8[s]")*3600
+        utc = self.converter.tai2utc_datetime64(tai)
+        self.assertEqual(utc.dtype, np.dtype("datetime64[us]"))
+        epoch = np.datetime64("1970-01-01T00:00:00", "us")
+        tai_seconds = (tai - epoch) / np.timedelta64(1, "s")
+        utc_seconds = self.converter.tai2utc_seconds(tai_seconds)
+        np.testing.assert_array_equal(
+            utc_seconds, (utc - epoch) / np.timedelta64(1, "s"))
+        np.testing.assert_array_equal(
+            self.converter.tai2utc(tai.astype(object)), utc.astype(object))
+
+    def testBeforeFirstLeapSecond(self):
+        utc = self.converter.tai2utc([datetime(1960, 1, 1)])
+        self.assertEqual(utc[0], datetime(1960, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,9 +9,11 @@ import unittest
 
 from treedict import TreeDict
 import os
+import shutil
+import tempfile
 
 from pysiral import USER_CONFIG_PATH
-from pysiral.config import get_yaml_config
+from pysiral.config import get_yaml_config, get_cached_yaml_config
 
 
 class TestDefinitionfiles(unittest.TestCase):
@@ -25,6 +27,24 @@ class TestDefinitionfiles(unittest.TestCase):
             filename = os.path.join(USER_CONFIG_PATH, def_file)
             self.assertIsInstance(get_yaml_config(filename), TreeDict, msg=def_file)
 
+    def testCachedYamlConfig(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "test_def.yaml")
+            with open(filename, "w") as f:
+                f.write("a:\n    b: 1\n")
+            content = get_cached_yaml_config(filename)
+            self.assertIs(content, get_cached_yaml_config(filename))
+            self.assertTrue(content.isFrozen())
+            self.assertEqual(content.copy().a.b, 1)
+            # Modified file is parsed again
+            with open(filename, "w") as f:
+                f.write("a:\n    b: 2\n")
+            os.utime(filename, (0, 0))
+            self.assertEqual(get_cached_yaml_config(filename).a.b, 2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestDefinitionfiles)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+
+from pysiral.envisat.functions import mdsr_timestamp_to_datetime
+from pysiral.envisat.sgdr_mds_def import envisat_get_mds_def
+from pysiral.envisat.sgdrfile import Envisat18HzArrays
+from pysiral.esa.mds import MDSNumpyDefinition
+
+
+def get_sgdr_records(n_records, mds_target, seed=0):
+    """ Returns the construct and the numpy parsed records of random
+    SGDR data """
+    mds_def = envisat_get_mds_def(n_records, mds_target)
+    parser = mds_def.get_mds_parser()
+    random = np.random.RandomState(seed)
+    data = random.randint(0, 256, parser.sizeof()).astype(np.uint8)
+    # Valid time stamps (day, sec, microsec)
+    if mds_target == "wfm18hz":
+        records = data.view(MDSNumpyDefinition(
+            mds_def.mds_record).raw_dtype)
+        records["utc_timestamp"]["day"] = random.randint(0, 5000, n_records)
+        records["utc_timestamp"]["sec"] = random.randint(0, 86400, n_records)
+        records["utc_timestamp"]["msec"] = random.randint(
+            0, 1000000, n_records)
+    data = data.tostring()
+    numpy_records = MDSNumpyDefinition(mds_def.mds_record).frombuffer(data)
+    return parser.parse(data), numpy_records
+
+
+class TestEnvisat18HzArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.n_records = 5
+        self.ra2, self.ra2_numpy = get_sgdr_records(self.n_records, "ra2")
+        self.wfm, self.wfm_numpy = get_sgdr_records(
+            self.n_records, "wfm18hz")
+        self.mds_18hz = Envisat18HzArrays()
+        self.mds_18hz.n_records = self.n_records
+        self.n_blocks = self.mds_18hz.n_blocks
+
+    def testTimestamp(self):
+        self.mds_18hz.reform_timestamp(self.wfm_numpy)
+        for i, record in enumerate(self.wfm):
+            reference = mdsr_timestamp_to_datetime(record.utc_timestamp)
+            for block in range(self.n_blocks):
+                self.assertEqual(
+                    self.mds_18hz.timestamp[i*self.n_blocks+block], reference)
+
+    def testPositionAndFlags(self):
+        self.mds_18hz.reform_position(self.ra2_numpy)
+        self.mds_18hz.reform_flags(self.ra2_numpy)
+        for i, record in enumerate(self.ra2):
+            time_orbit = record.time_orbit
+            mcd = time_orbit.measurement_confidence_data.flag
+            for block in range(self.n_blocks):
+                j = i*self.n_blocks + block
+                self.assertEqual(
+                    self.mds_18hz.latitude[j], time_orbit.latitude +
+                    record.range_information["18hz_latitude_differences"][
+                        block])
+                self.assertEqual(
+                    self.mds_18hz.altitude[j], time_orbit.altitude +
+                    time_orbit["18hz_altitude_differences"][block])
+                self.assertEqual(self.mds_18hz.flag_agc_fault[j], mcd[4])
+                self.assertEqual(self.mds_18hz.flag_waveform_fault[j], mcd[6])
+
+    def testWaveform(self):
+        self.mds_18hz.reform_waveform(self.ra2_numpy, self.wfm_numpy)
+        self.assertEqual(self.mds_18hz.power.shape,
+                         (self.n_records*self.n_blocks, 128))
+        self.assertEqual(self.mds_18hz.range.dtype, np.float32)
+        for i, record in enumerate(self.wfm):
+            for block in range(self.n_blocks):
+                np.testing.assert_array_equal(
+                    self.mds_18hz.power[i*self.n_blocks+block],
+                    record.wfm[block]["average_wfm_if_corr_ku"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+
+from pysiral.cryosat2 import l1b_mds_def
+from pysiral.envisat import sgdr_mds_def
+from pysiral.esa.mds import MDSNumpyDefinition
+
+
+CRYOSAT2_MDS_DEFINITIONS = [
+    "Cryosat2SARBaselineB", "Cryosat2SARBaselineC",
+    "Cryosat2SARBaselineCFull", "Cryosat2SINBaselineB",
+    "Cryosat2SINBaselineC"]
+
+ENVISAT_MDS_DEFINITIONS = [
+    "EnvisatSGDRMDSRA2", "EnvisatSGDRMDSRA2Full", "EnvisatSGDRMDSWFM18HZ",
+    "EnvisatSGDRMDSWFM18HZFull"]
+
+
+def get_random_bytes(n_bytes, seed=0):
+    random = np.random.RandomState(seed)
+    return random.randint(0, 256, n_bytes).astype(np.uint8).tostring()
+
+
+class TestMDSNumpyDefinition(unittest.TestCase):
+
+    def assertContainerEqual(self, container, records, path):
+        """ Compare the construct parser output with the numpy records """
+        if hasattr(container, "keys"):
+            for key in container.keys():
+                self.assertContainerEqual(
+                    container[key], records[key], path+"."+key)
+        elif isinstance(container, list):
+            self.assertEqual(len(container), len(records), path)
+            for i, item in enumerate(container):
+                self.assertContainerEqual(
+                    item, records[i], path+"[%g]" % i)
+        else:
+            self.assertEqual(container, records, path)
+            # unit conversions must result in the same precision
+            if isinstance(container, np.floating):
+                self.assertEqual(np.asarray(container).dtype,
+                                 np.asarray(records).dtype, path)
+
+    def assertRecordsEqual(self, module, mds_classes):
+        n_records = 2
+        for mds_class in mds_classes:
+            mds_def = getattr(module, mds_class)()
+            mds_def.n_records = n_records
+            parser = mds_def.get_mds_parser()
+            numpy_def = MDSNumpyDefinition(mds_def.mds_record)
+            self.assertEqual(numpy_def.itemsize*n_records, parser.sizeof())
+            data = get_random_bytes(parser.sizeof())
+            reference = parser.parse(data)
+            records = numpy_def.frombuffer(data)
+            for i in range(n_records):
+                self.assertContainerEqual(reference[i], records[i], mds_class)
+
+    def testCryoSat2L1bRecords(self):
+        self.assertRecordsEqual(l1b_mds_def, CRYOSAT2_MDS_DEFINITIONS)
+
+    def testEnvisatSGDRRecords(self):
+        self.assertRecordsEqual(sgdr_mds_def, ENVISAT_MDS_DEFINITIONS)
+
+    def testReadWithOffset(self):
+        mds_def = l1b_mds_def.Cryosat2SARBaselineC()
+        numpy_def = MDSNumpyDefinition(mds_def.get_mds_record())
+        data = get_random_bytes(numpy_def.itemsize*3)
+        records = numpy_def.frombuffer("header"+data, offset=6)
+        self.assertEqual(records.shape, (3, ))
+        np.testing.assert_array_equal(
+            records["waveform"]["wfm"], numpy_def.frombuffer(data)[
+                "waveform"]["wfm"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+
+from pysiral.filter import idl_smooth
+
+
+def idl_smooth_loop(x, window):
+    """ Element-wise reference of idl_smooth """
+    smoothed = np.copy(x)*np.nan
+    n = len(x)
+    for i in np.arange(n):
+        kernel_halfsize = np.floor((window-1)/2).astype(int)
+        if (i < kernel_halfsize):
+            kernel_halfsize = i
+        if (n-1-i < kernel_halfsize):
+            kernel_halfsize = n-1-i
+        smoothed[i] = np.nanmean(x[i-kernel_halfsize:i+kernel_halfsize+1])
+    return smoothed
+
+
+class TestIDLSmooth(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(6)
+        self.x = np.cumsum(random.randn(3000)) + 1.0e4
+        self.x[random.uniform(size=3000) < 0.7] = np.nan
+        self.x[1000:1400] = np.nan
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def assertSmoothEqual(self, x, window):
+        reference = idl_smooth_loop(x, window)
+        smoothed = idl_smooth(x, window)
+        self.assertEqual(smoothed.dtype, reference.dtype)
+        np.testing.assert_array_equal(np.isnan(smoothed),
+                                      np.isnan(reference))
+        np.testing.assert_allclose(smoothed, reference, rtol=1e-12)
+
+    def testEqualsLoop(self):
+        for window in [1, 2, 5, 25, 24., 301, 5001]:
+            self.assertSmoothEqual(self.x, window)
+
+    def testSpecialCases(self):
+        self.assertSmoothEqual(np.array([]), 5)
+        self.assertSmoothEqual(np.full(10, np.nan), 5)
+        self.assertSmoothEqual(np.arange(10), 3)
+        self.assertSmoothEqual(np.arange(10, dtype=np.float32), 4)
+        x = np.arange(20.)
+        x[[3, 15]] = np.inf, -np.inf
+        self.assertSmoothEqual(x, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
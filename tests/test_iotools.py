@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from netCDF4 import Dataset
+
+from pysiral.iotools import ReadNC
+
+
+class TestReadNC(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "grid.nc")
+        self.mss = np.arange(20*30, dtype=np.float32).reshape(20, 30)
+        self.mss[0, 0] = -999.
+        f = Dataset(self.filename, "w")
+        f.title = "test grid"
+        f.createDimension("lat", 20)
+        f.createDimension("lon", 30)
+        f.createVariable("lat", "f4", ("lat",))[:] = np.arange(20)
+        f.createVariable("lon", "f4", ("lon",))[:] = np.arange(30)
+        mss = f.createVariable("mss", "f4", ("lat", "lon"),
+                               fill_value=-999.)
+        mss[:] = self.mss
+        f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def testVariablesAndSelection(self):
+        nc = ReadNC(self.filename, variables=["lat", "mss", "missing"],
+                    selection={"lat": slice(5, 10)}, nan_fill_value=True)
+        self.assertEqual(nc.title, "test grid")
+        self.assertEqual(nc.parameters, ["lat", "mss"])
+        self.assertFalse(hasattr(nc, "lon"))
+        np.testing.assert_array_equal(nc.lat, np.arange(5, 10))
+        np.testing.assert_array_equal(nc.mss, self.mss[5:10, :])
+        nc = ReadNC(self.filename, variables=["mss"], nan_fill_value=True,
+                    selection={"lat": [0, 2], "lon": 0})
+        self.assertTrue(np.isnan(nc.mss[0]))
+        self.assertEqual(nc.mss[1], self.mss[2, 0])
+
+    def testLazyAccess(self):
+        nc = ReadNC(self.filename, lazy=True)
+        self.assertEqual(sorted(nc.parameters), ["lat", "lon", "mss"])
+        self.assertFalse("mss" in nc.__dict__)
+        np.testing.assert_array_equal(nc.mss[1:], self.mss[1:])
+        self.assertTrue("mss" in nc.__dict__)
+        with self.assertRaises(AttributeError):
+            nc.sea_surface_height
+
+
+if __name__ == '__main__':
+    unittest.main()
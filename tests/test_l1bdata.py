@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pysiral.l1bdata import Level1bData, L1bdataNCFile
+from pysiral.output import NCDateNumDef, L1bDataNC
+
+
+def get_l1b(seconds):
+    """ Minimal l1b object with given time stamps (seconds since
+    2015-03-01 12:00) """
+    n_records = len(seconds)
+    random = np.random.RandomState(0)
+    start = datetime(2015, 3, 1, 12)
+    l1b = Level1bData()
+    l1b.time_orbit.timestamp = [start + timedelta(seconds=s)
+                                for s in seconds]
+    l1b.time_orbit.set_position(
+        np.linspace(0., 10., n_records), np.linspace(70., 80., n_records),
+        np.full(n_records, 7.0e5))
+    l1b.waveform.set_waveform_data(
+        random.rand(n_records, 4), random.rand(n_records, 4), "sar")
+    l1b.surface_type.add_flag(random.rand(n_records) > 0.5, "ocean")
+    l1b.classifier.add(random.rand(n_records), "peakiness")
+    return l1b
+
+
+class TestL1bTimeOrbit(unittest.TestCase):
+
+    def testTimestampIsDatetime64(self):
+        l1b = get_l1b([0.0, 0.05, 0.1000015])
+        timestamp = l1b.time_orbit.timestamp
+        self.assertEqual(timestamp.dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(l1b.time_orbit.start_datetime,
+                         datetime(2015, 3, 1, 12))
+        self.assertEqual(l1b.time_orbit.datetime[2],
+                         datetime(2015, 3, 1, 12, 0, 0, 100002))
+        np.testing.assert_array_almost_equal(
+            l1b.time_orbit.timestamp_seconds - 1425211200.,
+            [0.0, 0.05, 0.100002])
+
+    def testDetectAndFillGaps(self):
+        seconds = np.arange(20)*0.05
+        seconds[10:] += 0.2
+        l1b = get_l1b(seconds)
+        l1b.detect_and_fill_gaps()
+        # gap width: round(gap seconds / median time increment)
+        self.assertEqual(l1b.n_records, 25)
+        self.assertEqual(np.sum(~l1b.waveform.is_valid), 5)
+        timedelta_secs = np.diff(l1b.time_orbit.timestamp_seconds)
+        self.assertTrue(np.all(timedelta_secs > 0))
+        self.assertEqual(l1b.time_orbit.timestamp[-1],
+                         np.datetime64("2015-03-01T12:00:01.150", "us"))
+
+    def testNCDateNumConversion(self):
+        time_def = NCDateNumDef()
+        timestamp = np.datetime64("2015-03-01T12:00:00.000123", "us") + \
+            np.arange(10).astype("m8[ms]")*47
+        number = time_def.datetime64_to_num(timestamp)
+        self.assertAlmostEqual(number[0], 1425211200.000123, places=6)
+        np.testing.assert_array_equal(
+            time_def.num_to_datetime64(number), timestamp)
+
+
+class TestL1bWaveforms(unittest.TestCase):
+
+    def setUp(self):
+        self.l1b = get_l1b(np.arange(10)*0.05)
+        self.waveform = self.l1b.waveform
+
+    def testReadOnlyViews(self):
+        power = self.waveform.power_view
+        self.assertTrue(np.shares_memory(power, self.waveform.power_view))
+        self.assertFalse(np.shares_memory(power, self.waveform.power))
+        with self.assertRaises(ValueError):
+            power[0, 0] = 1.0
+        with self.assertRaises(ValueError):
+            self.waveform.range_view[:] += 1.0
+
+    def testCopyOnWriteRangeDelta(self):
+        rng = self.waveform.range_view
+        reference = rng.copy()
+        range_delta = np.arange(10.)
+        self.waveform.add_range_delta(range_delta)
+        np.testing.assert_array_equal(rng, reference)
+        np.testing.assert_array_equal(
+            self.waveform.range_view, reference + range_delta[:, np.newaxis])
+
+    def testReduceWaveformBinCount(self):
+        power, rng = self.waveform.power, self.waveform.range
+        self.l1b.reduce_waveform_bin_count(2, maxloc=0.5)
+        max_index = np.clip(np.argmax(power, axis=1), 1, 3)
+        for i in range(10):
+            np.testing.assert_array_equal(
+                self.waveform.power_view[i],
+                power[i, max_index[i]-1:max_index[i]+1])
+            np.testing.assert_array_equal(
+                self.waveform.range_view[i],
+                rng[i, max_index[i]-1:max_index[i]+1])
+
+
+class TestL1bdataNCFile(unittest.TestCase):
+
+    def setUp(self):
+        self.l1b = get_l1b(np.arange(10)*0.05)
+        for name in ["ionospheric", "dry_troposphere"]:
+            self.l1b.correction.set_parameter(name, np.arange(10.))
+        self.l1b.update_l1b_metadata()
+        self.tmp_dir = tempfile.mkdtemp()
+        ncfile = L1bDataNC()
+        ncfile.l1b = self.l1b
+        ncfile.filename = "l1bdata.nc"
+        ncfile.output_folder = self.tmp_dir
+        ncfile.export()
+        self.filename = os.path.join(self.tmp_dir, "l1bdata.nc")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def testSelectiveAndLazyParsing(self):
+        l1b = L1bdataNCFile(self.filename)
+        l1b.parse(groups=["time_orbit", "correction"],
+                  variables=["ionospheric"])
+        self.assertIsNone(l1b.nc)
+        self.assertEqual(l1b.info.n_records, 10)
+        self.assertEqual(l1b.lazy_groups,
+                         ["classifier", "surface_type", "waveform"])
+        self.assertEqual(l1b.correction.parameter_list, ["ionospheric"])
+        np.testing.assert_array_equal(l1b.time_orbit.latitude,
+                                      self.l1b.time_orbit.latitude)
+        # Waveforms are read on first access
+        np.testing.assert_array_equal(l1b.waveform.power,
+                                      self.l1b.waveform.power)
+        self.assertEqual(l1b.lazy_groups, ["classifier", "surface_type"])
+        # Full parse
+        l1b = L1bdataNCFile(self.filename)
+        l1b.parse()
+        self.assertEqual(l1b.lazy_groups, [])
+        self.assertEqual(sorted(l1b.correction.parameter_list),
+                         ["dry_troposphere", "ionospheric"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pysiral.l2data import Level2PContainer
+
+
+class L2iStub(object):
+    """ Minimal l2i import object with random data """
+
+    def __init__(self, n_records, seed):
+        random = np.random.RandomState(seed)
+        start = datetime(2015, 3, 1) + timedelta(hours=seed)
+        self.n_records = n_records
+        self.info = None
+        self.parameter_list = ["time", "longitude", "latitude", "freeboard",
+                               "sea_ice_type"]
+        self.time = np.array([start + timedelta(seconds=s)
+                              for s in range(n_records)])
+        self.longitude = random.uniform(-180., 180., n_records)
+        self.latitude = random.uniform(60., 90., n_records)
+        self.freeboard = random.uniform(0., 0.5, n_records).astype(np.float32)
+        self.freeboard[random.rand(n_records) > 0.7] = np.nan
+        self.sea_ice_type = random.randint(0, 3, n_records).astype(np.int8)
+
+
+def legacy_merge(l2i_stack, valid_mask="freeboard"):
+    data = dict((name, np.array([], dtype=np.float32))
+                for name in l2i_stack[0].parameter_list)
+    for l2i in l2i_stack:
+        is_valid = np.where(np.isfinite(getattr(l2i, valid_mask)))[0]
+        for name in l2i.parameter_list:
+            data[name] = np.append(data[name], getattr(l2i, name)[is_valid])
+    return data
+
+
+class TestLevel2PContainer(unittest.TestCase):
+
+    def testMergedData(self):
+        l2i_stack = [L2iStub(n, i) for i, n in enumerate([500, 0, 3000, 7])]
+        l2p = Level2PContainer(None)
+        for l2i in l2i_stack:
+            l2p.append_l2i(l2i)
+        data = l2p._get_merged_data()
+        reference = legacy_merge(l2i_stack)
+        self.assertEqual(l2p.n_l2i_objects, 4)
+        self.assertEqual(l2p.n_records, len(reference["longitude"]))
+        for name in l2i_stack[0].parameter_list:
+            self.assertEqual(data[name].dtype, reference[name].dtype)
+            np.testing.assert_array_equal(data[name], reference[name])
+
+    def testEmptyContainer(self):
+        self.assertIsNone(Level2PContainer(None).get_merged_l2())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import yaml
+from netCDF4 import Dataset
+from pyproj import Proj
+
+from pysiral import USER_CONFIG_PATH
+from pysiral.auxdata import AUXDATA_CACHE
+from pysiral.datahandler import DefaultAuxdataHandler
+from pysiral.l1bdata import Level1bData
+from pysiral.l2proc import Level2Processor, Level2ProductDefinition
+
+
+# Level-2 settings of the test (auxiliary data from synthetic files in a
+# temporary repository: dtu15 mss, osisaf sic & sitype)
+L2_SETTINGS = os.path.join(USER_CONFIG_PATH, "proc", "l2", "awi",
+                           "awi_cryosat2_nh_v2p1.yaml")
+
+# Input orbits: (day, number of records, lead spacing in records)
+# Day 4 has no auxiliary data files (auxdata_missing_sic) and orbits
+# without leads are discarded by the surface type validator
+ORBITS = [(1, 900, 15), (1, 700, 0), (2, 800, 12), (4, 500, 10),
+          (2, 400, 20), (3, 300, 10), (4, 200, 10), (1, 300, 10)]
+
+# Range bin size of the synthetic waveforms
+BIN_SIZE = 0.2342
+
+
+class LocalAuxdataHandler(DefaultAuxdataHandler):
+    """ Default auxiliary data handler with a local repository for the
+    synthetic auxiliary data files """
+
+    def __init__(self, repository):
+        super(LocalAuxdataHandler, self).__init__()
+        self.repository = repository
+
+    def get_local_repository(self, auxdata_class, auxdata_id):
+        if auxdata_id is None:
+            return None
+        return os.path.join(self.repository, auxdata_class, auxdata_id)
+
+
+class StubOutputHandler(object):
+
+    def __init__(self, basedir):
+        self.id = "l2i"
+        self.basedir = basedir
+
+
+class StubProductDefinition(Level2ProductDefinition):
+    """ Level-2 product definition with the stub output handler """
+
+    def __init__(self, l2_settings_file, output_dir):
+        super(StubProductDefinition, self).__init__(
+            "test", l2_settings_file)
+        self._output_handler = [StubOutputHandler(output_dir)]
+
+
+class StubLevel2Processor(Level2Processor):
+    """ Level-2 processor with stub l1b input and l2 output. The orbit
+    files are text files with the orbit definition (see ORBITS) """
+
+    def _read_l1b_file(self, l1b_file):
+        with open(l1b_file, "r") as fhandle:
+            index, day, n_records, lead_spacing = [
+                int(value) for value in fhandle.read().split()]
+        l1b = get_l1b(index, day, n_records, lead_spacing)
+        l1b.info.subset_region_name = self._l2def.roi.hemisphere
+        return l1b
+
+    def _create_l2_outputs(self, l2):
+        for output_handler in self._output_handler:
+            filename = os.path.join(
+                output_handler.basedir,
+                l2._source_primary_filename.replace(".txt", ".npz"))
+            parameters = dict(
+                (name, np.asarray(getattr(l2, name))) for name in [
+                    "sic", "sitype", "mss", "elev", "ssa", "afrb", "frb",
+                    "sit", "snow_depth", "snow_dens"])
+            parameters["surface_type"] = l2.surface_type.flag
+            np.savez(filename, **parameters)
+
+
+def get_l1b(index, day, n_records, lead_spacing):
+    """ Synthetic CryoSat-2 SAR orbit with leads and sea ice waveforms """
+    random = np.random.RandomState(index)
+    start = datetime(2015, 3, day, index)
+    l1b = Level1bData()
+    l1b.info.mission = "cryosat2"
+    l1b.info.start_time = start
+    l1b.info.stop_time = start + timedelta(seconds=0.05*(n_records-1))
+    l1b.time_orbit.timestamp = [start + timedelta(seconds=0.05*i)
+                                for i in range(n_records)]
+    latitude = np.linspace(80., 86., n_records)
+    longitude = np.linspace(-20., 20., n_records) + 5.*index
+    altitude = np.full(n_records, 7.2e5)
+    l1b.time_orbit.set_position(longitude, latitude, altitude)
+
+    # Leads: specular waveforms at the sea surface (20 m above the
+    # ellipsoid), sea ice: diffuse waveforms 0.3 m above the sea surface
+    is_lead = np.zeros(n_records, dtype=bool)
+    if lead_spacing > 0:
+        is_lead[::lead_spacing] = True
+    bins = np.arange(128, dtype=np.float64)
+    surface_bin = np.where(is_lead, 60.0, 60.0 - 0.3/BIN_SIZE)
+    surface_bin += random.normal(0.0, 0.3, n_records)
+    width = np.where(is_lead, 1.0, 3.0)
+    power = np.exp(-((bins - surface_bin[:, np.newaxis]) /
+                     width[:, np.newaxis])**2)
+    power += random.uniform(0.0, 0.02, power.shape)
+    window_range = (altitude - 20.0)[:, np.newaxis] + (bins - 60.)*BIN_SIZE
+    l1b.waveform.set_waveform_data(power, window_range, "sar")
+    l1b.surface_type.add_flag(np.zeros(n_records, dtype=bool), "land")
+
+    # Classifier: leads and sea ice within the RickerTC2014 thresholds
+    for name, lead, sea_ice in [
+            ("peakiness", 50., 10.), ("peakiness_l", 50., 5.),
+            ("peakiness_r", 50., 5.), ("stack_kurtosis", 50., 3.),
+            ("stack_standard_deviation", 2., 10.), ("ocog_width", 10., 30.)]:
+        l1b.classifier.add(np.where(is_lead, lead, sea_ice), name)
+    return l1b
+
+
+def write_auxdata_files(repository):
+    """ Synthetic DTU15 mean sea surface and daily OSI-SAF sea ice
+    concentration & type files (days 1-3 of March 2015) """
+
+    mss_dir = os.path.join(repository, "mss", "dtu15")
+    os.makedirs(mss_dir)
+    f = Dataset(os.path.join(mss_dir, "DTU15MSS_1min.nc"), "w")
+    f.createDimension("lat", 181)
+    f.createDimension("lon", 360)
+    f.createVariable("lat", "f8", ("lat",))[:] = np.arange(-90., 91.)
+    f.createVariable("lon", "f8", ("lon",))[:] = np.arange(360.)
+    f.createVariable("mss", "f4", ("lat", "lon"))[:] = 20.0
+    f.close()
+
+    # Polar stereographic grid of the osisaf auxdata definition
+    p = Proj(proj="stere", lon_0=-45, lat_0=90, lat_ts=70, a=6378273,
+             b=6356889.44891)
+    xc = (np.arange(300) - 150.) * 10000.
+    lons, lats = p(*np.meshgrid(xc, xc), inverse=True)
+    random = np.random.RandomState(0)
+    for day in [1, 2, 3]:
+        for auxdata_class, filenaming, variables in [
+                ("sic", "ice_conc_nh_polstere-100_multi_%s1200.nc",
+                 [("ice_conc", "f4", 90. + day)]),
+                ("sitype", "ice_type_nh_polstere-100_multi_%s1200.nc",
+                 [("ice_type", "i4", random.randint(2, 4, lons.shape)),
+                  ("confidence_level", "i4", 4)])]:
+            directory = os.path.join(
+                repository, auxdata_class, "osisaf", "2015", "03")
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            filename = filenaming % ("201503%02g" % day)
+            f = Dataset(os.path.join(directory, filename), "w")
+            f.createDimension("time", 1)
+            f.createDimension("yc", lons.shape[0])
+            f.createDimension("xc", lons.shape[1])
+            f.createVariable("lon", "f8", ("yc", "xc"))[:] = lons
+            f.createVariable("lat", "f8", ("yc", "xc"))[:] = lats
+            for name, dtype, value in variables:
+                variable = f.createVariable(name, dtype, ("time", "yc", "xc"))
+                variable[:] = value
+            f.close()
+
+
+def write_l2_settings(filename):
+    """ Level-2 settings with auxiliary data that does not require a
+    snow climatology file """
+    with open(L2_SETTINGS, "r") as fhandle:
+        l2_settings = yaml.safe_load(fhandle)
+    l2_settings["auxdata"]["snow"] = {"name": "warren99", "options": None}
+    with open(filename, "w") as fhandle:
+        yaml.safe_dump(l2_settings, fhandle)
+
+
+class TestLevel2ProcessorWorkers(unittest.TestCase):
+
+    def setUp(self):
+        AUXDATA_CACHE.clear()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.repository = os.path.join(self.tmp_dir, "auxdata")
+        write_auxdata_files(self.repository)
+        self.l2_settings_file = os.path.join(self.tmp_dir, "l2.yaml")
+        write_l2_settings(self.l2_settings_file)
+        self.l1b_files = []
+        for i, (day, n_records, lead_spacing) in enumerate(ORBITS):
+            filename = os.path.join(self.tmp_dir, "orbit_%02g.txt" % i)
+            with open(filename, "w") as fhandle:
+                fhandle.write("%g %g %g %g\n" % (
+                    i, day, n_records, lead_spacing))
+            self.l1b_files.append(filename)
+
+    def tearDown(self):
+        AUXDATA_CACHE.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def process(self, workers):
+        output_dir = os.path.join(self.tmp_dir, "output_%g" % workers)
+        os.makedirs(output_dir)
+        AUXDATA_CACHE.clear()
+        AUXDATA_CACHE.reset_counters()
+        product_def = StubProductDefinition(self.l2_settings_file, output_dir)
+        l2proc = StubLevel2Processor(
+            product_def, auxdata_handler=LocalAuxdataHandler(self.repository),
+            workers=workers)
+        l2proc.set_l1b_files(self.l1b_files)
+        l2proc._l2_processing_of_orbit_files()
+        outputs = {}
+        for filename in sorted(os.listdir(output_dir)):
+            with np.load(os.path.join(output_dir, filename)) as l2_data:
+                outputs[filename] = dict(
+                    (name, l2_data[name]) for name in l2_data.files)
+        return l2proc, outputs
+
+    def testParallelProcessing(self):
+        serial, serial_outputs = self.process(1)
+        parallel, parallel_outputs = self.process(2)
+
+        # Same Level-2 output
+        self.assertEqual(sorted(serial_outputs.keys()), [
+            "orbit_00.npz", "orbit_02.npz", "orbit_04.npz", "orbit_05.npz",
+            "orbit_07.npz"])
+        self.assertEqual(sorted(parallel_outputs.keys()),
+                         sorted(serial_outputs.keys()))
+        for filename in serial_outputs.keys():
+            serial_l2, parallel_l2 = (serial_outputs[filename],
+                                      parallel_outputs[filename])
+            self.assertEqual(sorted(parallel_l2.keys()),
+                             sorted(serial_l2.keys()))
+            for name in serial_l2.keys():
+                np.testing.assert_array_equal(
+                    parallel_l2[name], serial_l2[name], err_msg=name)
+            self.assertTrue(np.any(np.isfinite(serial_l2["sit"])))
+
+        # Same discarded events (merged in the order of the l1b files)
+        self.assertEqual(parallel.report.discarded_events,
+                         serial.report.discarded_events)
+        self.assertEqual(serial.report.discarded_events, [
+            ("auxdata_missing_sic", self.l1b_files[3]),
+            ("auxdata_missing_sic", self.l1b_files[6]),
+            ("l2proc_surface_type_discarded", self.l1b_files[1])])
+
+        # Auxdata cache counters are summed over all workers (each day
+        # is a cache miss in at least one worker). Sequential: sic &
+        # sitype of 3 days and the sic of the 2 orbits without files
+        serial_misses = serial.auxdata_cache_counters[1]
+        self.assertEqual(serial_misses, 8)
+        hits, misses = parallel.auxdata_cache_counters
+        self.assertTrue(misses >= serial_misses)
+        self.assertTrue(hits + misses <= 2*len(ORBITS))
+
+        # Auxiliary data is loaded only by the workers and the orbit
+        # collection is only available for sequential processing
+        self.assertTrue(hasattr(serial, "_mss"))
+        self.assertFalse(hasattr(parallel, "_mss"))
+        self.assertEqual(len(serial.orbit), 5)
+        with self.assertRaises(SystemExit):
+            parallel.orbit
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+from treedict import TreeDict
+
+from pysiral.errorhandler import ErrorStatus
+from pysiral.l3proc import L2iDataStack, L3DataGrid
+from pysiral.sit import frb2sit_errprop
+from pysiral.surface_type import SurfaceType
+
+
+class SyntheticGridExtent(object):
+    numx = 24
+    numy = 16
+
+
+class SyntheticGridDefinition(object):
+    """ Grid definition with longitude/latitude as projection coordinates """
+
+    extent = SyntheticGridExtent()
+
+    def grid_indices(self, longitude, latitude):
+        return np.floor(longitude), np.floor(latitude)
+
+
+class SyntheticParameterDefinition(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def branchName(self):
+        return self.name
+
+
+class SyntheticL2i(object):
+    """ Minimal l2i object with random track locations and parameters """
+
+    def __init__(self, n_records, seed):
+        random = np.random.RandomState(seed)
+        extent = SyntheticGridExtent()
+        # Some locations are placed outside the grid on purpose
+        self.longitude = random.uniform(-1, extent.numx+1, n_records)
+        self.latitude = random.uniform(-1, extent.numy+1, n_records)
+        self.surface_type = random.randint(0, 9, n_records).astype(np.int8)
+        self.sea_ice_thickness = random.normal(1.5, 1.0, n_records)
+        self.sea_ice_thickness[random.uniform(size=n_records) < 0.2] = np.nan
+        self.radar_freeboard_uncertainty = random.uniform(
+            0.01, 0.2, n_records).astype(np.float32)
+        # Unique value for each grid cell
+        self.region_code = np.floor(self.longitude) + \
+            100.*np.floor(self.latitude)
+        self.timestamp = np.arange(n_records, dtype=float)
+        self.mission = "cryosat2"
+        self.timeliness = "ntc"
+        self.info = None
+        self.n_records = n_records
+
+
+def get_stack_and_orbits(n_orbits=5, parameter=None):
+    if parameter is None:
+        parameter = ["sea_ice_thickness", "radar_freeboard_uncertainty"]
+    pardefs = [SyntheticParameterDefinition(name) for name in parameter]
+    stack = L2iDataStack(SyntheticGridDefinition(), pardefs)
+    orbits = [SyntheticL2i(500+i*37, i) for i in range(n_orbits)]
+    for l2i in orbits:
+        stack.add(l2i)
+    return stack, orbits
+
+
+def get_reference_cell_lists(orbits, parameter_name):
+    """ The per grid cell lists of data points (as in the former list of
+    lists implementation of L2iDataStack) """
+    extent = SyntheticGridExtent()
+    cells = [[[] for _ in range(extent.numx)] for _ in range(extent.numy)]
+    for l2i in orbits:
+        xi, yj = np.floor(l2i.longitude), np.floor(l2i.latitude)
+        data = getattr(l2i, parameter_name)
+        for i in np.arange(l2i.n_records):
+            x, y = int(xi[i]), int(yj[i])
+            if x < 0 or y < 0 or x >= extent.numx or y >= extent.numy:
+                continue
+            cells[y][x].append(data[i])
+    return cells
+
+
+class TestL2iDataStack(unittest.TestCase):
+
+    def testCellReductionsEqualCellLists(self):
+        stack, orbits = get_stack_and_orbits()
+        extent = SyntheticGridExtent()
+        for name in ["surface_type", "sea_ice_thickness",
+                     "radar_freeboard_uncertainty"]:
+            reference = get_reference_cell_lists(orbits, name)
+            data = stack.get_parameter(name).astype(np.float64)
+            valid = np.isfinite(data)
+            shape = (extent.numy, extent.numx)
+            cell_sum = stack.get_cell_sum(data, mask=valid).reshape(shape)
+            cell_min = stack.get_cell_reduce(np.fmin, data).reshape(shape)
+            cell_max = stack.get_cell_reduce(np.fmax, data).reshape(shape)
+            for yj in range(extent.numy):
+                for xi in range(extent.numx):
+                    cell = np.array(reference[yj][xi], dtype=np.float64)
+                    self.assertAlmostEqual(cell_sum[yj, xi], np.nansum(cell))
+                    if np.all(np.isnan(cell)):
+                        self.assertTrue(np.isnan(cell_min[yj, xi]))
+                        self.assertTrue(np.isnan(cell_max[yj, xi]))
+                        continue
+                    self.assertEqual(cell_min[yj, xi], np.nanmin(cell))
+                    self.assertEqual(cell_max[yj, xi], np.nanmax(cell))
+
+    def testCellCounts(self):
+        stack, orbits = get_stack_and_orbits()
+        extent = SyntheticGridExtent()
+        counts = stack.cell_counts.reshape(extent.numy, extent.numx)
+        reference = get_reference_cell_lists(orbits, "surface_type")
+        for yj in range(extent.numy):
+            for xi in range(extent.numx):
+                self.assertEqual(counts[yj, xi], len(reference[yj][xi]))
+        self.assertEqual(stack.n_total_records,
+                         sum([l2i.n_records for l2i in orbits]))
+
+    def testMissingParameterIsNaN(self):
+        stack, orbits = get_stack_and_orbits(parameter=["snow_depth"])
+        snow_depth = stack.get_parameter("snow_depth")
+        self.assertEqual(len(snow_depth), len(stack.cell_index))
+        self.assertTrue(np.all(np.isnan(snow_depth)))
+
+    def testStackIsContiguous(self):
+        stack, orbits = get_stack_and_orbits()
+        sit = stack.get_parameter("sea_ice_thickness")
+        self.assertTrue(sit.flags["C_CONTIGUOUS"])
+        self.assertEqual(sit.dtype, np.float64)
+        self.assertEqual(stack.get_parameter("surface_type").dtype, np.int8)
+
+
+def get_l3grid(stack, no_land_cells=False, grid_methods=None):
+    """ A L3DataGrid instance with only the gridding related attributes """
+    if grid_methods is None:
+        grid_methods = {"sea_ice_thickness": "average",
+                        "radar_freeboard_uncertainty": "average"}
+    extent = SyntheticGridExtent()
+    l3def = TreeDict.fromdict({
+        "grid_settings": {"no_land_cells": no_land_cells,
+                          "minimum_valid_grid_points": 2},
+        "l2_parameter": dict(
+            (name, {"grid_method": grid_method})
+            for name, grid_method in grid_methods.items())},
+        expand_nested=True)
+    l3grid = L3DataGrid.__new__(L3DataGrid)
+    l3grid.log = stack.log
+    l3grid.error = ErrorStatus()
+    l3grid._griddef = SyntheticGridDefinition()
+    l3grid._l3def = l3def
+    l3grid._l2 = stack
+    l3grid._surface_type_dict = SurfaceType.SURFACE_TYPE_DICT
+    l3grid._l2_parameter = sorted(grid_methods.keys())
+    l3grid._l3 = {}
+    shape = (extent.numy, extent.numx)
+    for name in l3grid._l2_parameter + ["valid_fraction", "lead_fraction",
+                                        "ice_fraction",
+                                        "negative_thickness_fraction"]:
+        l3grid._l3[name] = np.full(shape, np.nan, dtype="f4")
+    for name in ["n_total_waveforms", "n_valid_waveforms"]:
+        l3grid._l3[name] = np.full(shape, -1, dtype="i4")
+    l3grid._l3["is_land"] = np.full((extent.numx, extent.numy), -1, "i2")
+    return l3grid
+
+
+class TestL3DataGrid(unittest.TestCase):
+
+    def testSurfaceTypeStatistics(self):
+        stack, orbits = get_stack_and_orbits()
+        l3grid = get_l3grid(stack)
+        l3grid.compute_l3_mandatory_parameter()
+
+        flags = SurfaceType.SURFACE_TYPE_DICT
+        surface_types = get_reference_cell_lists(orbits, "surface_type")
+        sits = get_reference_cell_lists(orbits, "sea_ice_thickness")
+        extent = SyntheticGridExtent()
+        l3 = l3grid._l3
+        for yj in range(extent.numy):
+            for xi in range(extent.numx):
+                surface_type = np.array(surface_types[yj][xi])
+                sit = np.array(sits[yj][xi])
+                if len(surface_type) == 0:
+                    self.assertEqual(l3["n_total_waveforms"][yj, xi], -1)
+                    continue
+                n_land = np.sum(surface_type == flags["land"])
+                n_lead = np.sum(surface_type == flags["lead"])
+                n_ice = np.sum(surface_type == flags["sea_ice"])
+                n_valid = n_lead + n_ice
+                self.assertEqual(l3["is_land"][xi, yj], n_land)
+                self.assertEqual(l3["n_total_waveforms"][yj, xi],
+                                 len(surface_type))
+                self.assertEqual(l3["n_valid_waveforms"][yj, xi], n_valid)
+                fractions = [
+                    ("valid_fraction", n_valid, len(surface_type)),
+                    ("lead_fraction", n_lead, n_valid),
+                    ("ice_fraction", n_ice, n_valid),
+                    ("negative_thickness_fraction",
+                     len(np.where(sit < 0.0)[0]), n_ice)]
+                for name, numerator, denominator in fractions:
+                    try:
+                        fraction = float(numerator)/float(denominator)
+                    except ZeroDivisionError:
+                        fraction = np.nan
+                    np.testing.assert_equal(l3[name][yj, xi],
+                                            np.float32(fraction))
+
+    def testGridAverage(self):
+        stack, orbits = get_stack_and_orbits()
+        for no_land_cells in [False, True]:
+            l3grid = get_l3grid(stack, no_land_cells=no_land_cells)
+            l3grid.compute_l3_mandatory_parameter()
+            l3grid.grid_l2_parameter()
+            extent = SyntheticGridExtent()
+            for name in l3grid._l2_parameter:
+                cells = get_reference_cell_lists(orbits, name)
+                for yj in range(extent.numy):
+                    for xi in range(extent.numx):
+                        data = np.array(cells[yj][xi])
+                        n_valid = np.sum(np.isfinite(data))
+                        is_land = l3grid._l3["is_land"][xi, yj] > 0
+                        value = l3grid._l3[name][yj, xi]
+                        if n_valid < 2 or (is_land and no_land_cells):
+                            self.assertTrue(np.isnan(value))
+                        else:
+                            self.assertAlmostEqual(
+                                value, np.nanmean(data), places=5)
+
+    def testGridUniqueAndAverageUncertainty(self):
+        stack, orbits = get_stack_and_orbits(parameter=[
+            "region_code", "radar_freeboard_uncertainty",
+            "sea_ice_thickness"])
+        l3grid = get_l3grid(stack, grid_methods={
+            "region_code": "unique",
+            "radar_freeboard_uncertainty": "average_uncertainty"})
+        l3grid.compute_l3_mandatory_parameter()
+        l3grid.grid_l2_parameter()
+        extent = SyntheticGridExtent()
+        region_codes = get_reference_cell_lists(orbits, "region_code")
+        uncertainties = get_reference_cell_lists(
+            orbits, "radar_freeboard_uncertainty")
+        l3 = l3grid._l3
+        for yj in range(extent.numy):
+            for xi in range(extent.numx):
+                if len(region_codes[yj][xi]) < 2:
+                    self.assertTrue(np.isnan(l3["region_code"][yj, xi]))
+                    continue
+                self.assertEqual(l3["region_code"][yj, xi],
+                                 region_codes[yj][xi][0])
+                uncertainty = np.array(uncertainties[yj][xi], dtype=np.float64)
+                self.assertAlmostEqual(
+                    l3["radar_freeboard_uncertainty"][yj, xi],
+                    np.sqrt(1./np.sum(uncertainty)), places=5)
+
+        # Grid cells with more than one value cannot be gridded as unique
+        stack, orbits = get_stack_and_orbits()
+        l3grid = get_l3grid(stack, grid_methods={
+            "sea_ice_thickness": "unique"})
+        l3grid.compute_l3_mandatory_parameter()
+        with self.assertRaises(SystemExit):
+            l3grid.grid_l2_parameter()
+
+    def testSitL3Uncertainty(self):
+        stack, orbits = get_stack_and_orbits()
+        l3grid = get_l3grid(stack)
+        l3grid.compute_l3_mandatory_parameter()
+        l3grid.grid_l2_parameter()
+
+        # Synthetic gridded parameters
+        extent = SyntheticGridExtent()
+        shape = (extent.numy, extent.numx)
+        random = np.random.RandomState(42)
+        l3 = l3grid._l3
+        for name, low, high in [("freeboard", 0.0, 0.5),
+                                ("snow_depth", 0.0, 0.4),
+                                ("ice_density", 880., 920.),
+                                ("snow_density", 250., 350.),
+                                ("snow_depth_uncertainty", 0.01, 0.1),
+                                ("ice_density_uncertainty", 5., 20.),
+                                ("snow_density_uncertainty", 10., 50.)]:
+            l3[name] = random.uniform(low, high, shape)
+        for name in ["radar_freeboard_l3_uncertainty",
+                     "freeboard_l3_uncertainty",
+                     "sea_ice_thickness_l3_uncertainty"]:
+            l3[name] = np.full(shape, np.nan)
+        options = TreeDict.fromdict({
+            "water_density": 1024.0, "snow_depth_correction_factor": 0.22,
+            "max_l3_uncertainty": 0.25}, expand_nested=True)
+        l3grid.apply_post_processor("sit_l3_uncertainty", options)
+
+        # Reference: grid cell by grid cell
+        cells = get_reference_cell_lists(orbits, "radar_freeboard_uncertainty")
+        n_capped = 0
+        for yj in range(extent.numy):
+            for xi in range(extent.numx):
+                if np.isnan(l3["sea_ice_thickness"][yj, xi]):
+                    self.assertTrue(np.isnan(
+                        l3["sea_ice_thickness_l3_uncertainty"][yj, xi]))
+                    continue
+                rfrb_uncs = np.array(cells[yj][xi], dtype=np.float64)
+                rfrb_unc = 1./np.sqrt(np.nansum(1./rfrb_uncs**2))
+                frb_unc = np.sqrt((0.22*l3["snow_depth_uncertainty"][yj, xi])**2 +
+                                  rfrb_unc**2)
+                sit_unc = frb2sit_errprop(
+                    l3["freeboard"][yj, xi], l3["snow_depth"][yj, xi], 1024.0,
+                    l3["ice_density"][yj, xi], l3["snow_density"][yj, xi],
+                    frb_unc, l3["snow_depth_uncertainty"][yj, xi],
+                    l3["ice_density_uncertainty"][yj, xi],
+                    l3["snow_density_uncertainty"][yj, xi])
+                if sit_unc > 0.25:
+                    sit_unc = 0.25
+                    n_capped += 1
+                self.assertAlmostEqual(
+                    l3["radar_freeboard_l3_uncertainty"][yj, xi], rfrb_unc)
+                self.assertAlmostEqual(
+                    l3["freeboard_l3_uncertainty"][yj, xi], frb_unc)
+                self.assertAlmostEqual(
+                    l3["sea_ice_thickness_l3_uncertainty"][yj, xi], sit_unc)
+        self.assertGreater(n_capped, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from netCDF4 import Dataset
+
+from pysiral.iotools import ReadNC
+from pysiral.mss import DTU1MinGrid, egm2top_delta_h, egm2wgs_delta_h
+
+
+class LatitudeROI(object):
+
+    def get_latitude_range(self):
+        return [60.0, 90.0]
+
+
+def legacy_dtu_subset(filename, latitude_range):
+    dtu_grid = ReadNC(filename)
+    latitude_indices = np.where(
+        np.logical_and(dtu_grid.lat >= latitude_range[0],
+                       dtu_grid.lat <= latitude_range[1]))[0]
+    elevation = dtu_grid.mss[latitude_indices, :]
+    latitude = dtu_grid.lat[latitude_indices]
+    delta_h1 = egm2top_delta_h(latitude)
+    delta_h = egm2wgs_delta_h(latitude)
+    for i in np.arange(len(latitude)):
+        elevation[i, :] += (delta_h[i]-delta_h1[i])
+    return elevation, dtu_grid.lon, latitude
+
+
+class TestDTU1MinGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "DTU15MSS_1min.nc")
+        random = np.random.RandomState(0)
+        f = Dataset(self.filename, "w")
+        f.createDimension("lat", 181)
+        f.createDimension("lon", 360)
+        f.createVariable("lat", "f8", ("lat",))[:] = np.arange(-90., 91.)
+        f.createVariable("lon", "f8", ("lon",))[:] = np.arange(360.)
+        mss = f.createVariable("mss", "f4", ("lat", "lon"))
+        mss[:] = random.uniform(-50., 50., (181, 360))
+        f.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def get_mss(self, **options):
+        mss = DTU1MinGrid()
+        mss.set_filename(self.filename)
+        if len(options) > 0:
+            mss.set_options(**options)
+        mss.set_roi(LatitudeROI())
+        mss.initialize()
+        return mss
+
+    def assertLegacySubset(self, mss):
+        elevation, longitude, latitude = legacy_dtu_subset(
+            self.filename, [60.0, 90.0])
+        np.testing.assert_array_equal(mss.elevation, elevation)
+        np.testing.assert_array_equal(mss.longitude, longitude)
+        np.testing.assert_array_equal(mss.latitude, latitude)
+
+    def testRoiSubset(self):
+        self.assertLegacySubset(self.get_mss())
+
+    def testSubsetCache(self):
+        cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.assertLegacySubset(self.get_mss(subset_cache_dir=cache_dir))
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        mss = self.get_mss(subset_cache_dir=cache_dir)
+        self.assertTrue(isinstance(mss.elevation, np.memmap))
+        self.assertLegacySubset(mss)
+        track = mss.get_track(np.array([10.5, -20.0]), np.array([70.2, 80.]))
+        self.assertEqual(track.shape, (2, ))
+
+    def testSubsetCacheMask(self):
+        f = Dataset(self.filename, "a")
+        f.variables["mss"].setncattr("missing_value", np.float32(-999.))
+        f.variables["mss"][170:175, 10:20] = -999.
+        f.close()
+        cache_dir = os.path.join(self.tmp_dir, "cache")
+        mss = self.get_mss(subset_cache_dir=cache_dir)
+        cached_mss = self.get_mss(subset_cache_dir=cache_dir)
+        mask = np.ma.getmaskarray(mss.elevation)
+        self.assertEqual(mask.sum(), 50)
+        np.testing.assert_array_equal(
+            np.ma.getmaskarray(cached_mss.elevation), mask)
+        np.testing.assert_array_equal(np.ma.getdata(cached_mss.elevation),
+                                      np.ma.getdata(mss.elevation))
+
+
+if __name__ == '__main__':
+    unittest.main()
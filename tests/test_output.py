@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from netCDF4 import Dataset
+from treedict import TreeDict
+
+from pysiral.output import NCStorageProfiles, get_l1bdata_storage_def
+
+
+def get_storage_def():
+    return TreeDict.fromdict({
+        "default": {"zlib": True, "complevel": 4, "shuffle": True,
+                    "chunksizes": "full"},
+        "quantized_mm": {"least_significant_digit": 3},
+        "waveform": {"chunksizes": [100, None]},
+        "waveform_range": {"chunksizes": [100, None],
+                           "least_significant_digit": 4},
+        "packed_mm": {"packing": {"dtype": "i4", "scale_factor": 0.001,
+                                  "add_offset": 0.0}}}, expand_nested=True)
+
+
+def get_synthetic_orbit(n_records, n_range_bins=256, seed=3):
+    """ Elevation, waveform power and range of a synthetic orbit """
+    random = np.random.RandomState(seed)
+    elevation = np.cumsum(random.normal(0.0, 0.05, n_records))
+    elevation[random.uniform(0, 1, n_records) < 0.1] = np.nan
+    bins = np.arange(n_range_bins)
+    delay = bins - random.uniform(50, 150, n_records)[:, np.newaxis]
+    power = np.exp(-0.5*(delay/3.)**2) + 0.1*(delay > 0)*np.exp(-delay/50.)
+    power *= random.uniform(1e-13, 1e-11, (n_records, 1))
+    rng = 720000. + np.cumsum(random.normal(0.0, 0.5, n_records))
+    rng = rng[:, np.newaxis] + bins*0.2342
+    return elevation, power.astype(np.float32), rng
+
+
+def benchmark_storage_profiles(filename, n_records=200000, n_repeat=3):
+    """ Returns file size (MB), write and read throughput (MB/s of
+    uncompressed data) of a synthetic orbit for each storage profile """
+    elevation, power, rng = get_synthetic_orbit(n_records)
+    n_mbytes = (elevation.nbytes + power.nbytes + rng.nbytes)/1024.**2
+    results = {}
+    for name, storage_def in [("netcdf4_default", None),
+                              ("storage_profiles", get_storage_def())]:
+        storage = NCStorageProfiles(storage_def)
+        profiles = ("quantized_mm", "waveform", "waveform_range") \
+            if storage_def else (None, None, None)
+        t0 = time.time()
+        for i in range(n_repeat):
+            with Dataset(filename, "w") as nc:
+                nc.createDimension("n_records", n_records)
+                nc.createDimension("n_bins", power.shape[1])
+                storage.write_variable(nc, "elevation", elevation,
+                                       ("n_records", ), {}, profiles[0])
+                storage.write_variable(nc, "power", power,
+                                       ("n_records", "n_bins"), {},
+                                       profiles[1])
+                storage.write_variable(nc, "range", rng,
+                                       ("n_records", "n_bins"), {},
+                                       profiles[2])
+        t1 = time.time()
+        for i in range(n_repeat):
+            with Dataset(filename) as nc:
+                nc.variables["elevation"][:]
+                nc.variables["power"][:]
+                nc.variables["range"][:]
+        t2 = time.time()
+        results[name] = (os.path.getsize(filename)/1024.**2,
+                         n_mbytes*n_repeat/(t1-t0),
+                         n_mbytes*n_repeat/(t2-t1))
+    return results
+
+
+class TestNCStorageProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "storage.nc")
+        self.storage = NCStorageProfiles(get_storage_def())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def testProfiles(self):
+        profile = self.storage.get_profile("quantized_mm")
+        self.assertEqual(profile["complevel"], 4)
+        self.assertEqual(profile["least_significant_digit"], 3)
+        self.assertEqual(NCStorageProfiles().get_profile(), {"zlib": True})
+        self.assertEqual(self.storage.get_chunksizes([100, None], (3, 50)),
+                         [3, 50])
+        self.assertEqual(self.storage.get_chunksizes([100, None],
+                                                     (1, 300, 50)),
+                         [1, 100, 50])
+        self.assertRaises(ValueError, self.storage.get_profile, "unknown")
+
+    def testWriteVariables(self):
+        elevation, power, rng = get_synthetic_orbit(1000)
+        attributes = {"units": "m", "scale_factor": 1.0, "add_offset": 0.0}
+        with Dataset(self.filename, "w") as nc:
+            nc.createDimension("n_records", 1000)
+            nc.createDimension("n_bins", power.shape[1])
+            for name, profile in [("default", None),
+                                  ("quantized", "quantized_mm"),
+                                  ("packed", "packed_mm")]:
+                self.storage.write_variable(nc, name, elevation,
+                                            ("n_records", ), attributes,
+                                            profile)
+            self.storage.write_variable(nc, "power", power,
+                                        ("n_records", "n_bins"), {},
+                                        "waveform")
+        with Dataset(self.filename) as nc:
+            var = nc.variables["default"]
+            self.assertEqual(var.chunking(), [1000])
+            self.assertEqual(var.filters()["complevel"], 4)
+            self.assertEqual(var.units, "m")
+            np.testing.assert_array_equal(var[:].filled(np.nan), elevation)
+            self.assertEqual(nc.variables["power"].chunking(),
+                             [100, power.shape[1]])
+            for name in ["quantized", "packed"]:
+                data = nc.variables[name][:].filled(np.nan)
+                np.testing.assert_allclose(data, elevation, atol=5.0e-4)
+            self.assertEqual(nc.variables["packed"].dtype, np.int32)
+
+    def testL1bdataStorageDefinition(self):
+        storage_def = get_l1bdata_storage_def()
+        storage = NCStorageProfiles(storage_def.storage)
+        profile = storage.get_profile(storage_def.variables.waveform.power)
+        self.assertEqual(profile["chunksizes"], [1000, None])
+
+    def testBenchmark(self):
+        results = benchmark_storage_profiles(self.filename, n_records=5000,
+                                             n_repeat=1)
+        self.assertLess(results["storage_profiles"][0],
+                        results["netcdf4_default"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
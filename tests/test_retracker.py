@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+import logbook
+
+import pysiral.retracker
+from pysiral.retracker import (TFMRA, SICCI2TfmraEnvisat, cTFMRA,
+                               tfmra_batch_retrack, CYTFMRA_OK, P_lead,
+                               P_lead_and_jacobian, sicci_lead_batch_fit,
+                               power_in_echo_tail, power_in_echo_tail_batch,
+                               rms_echo_and_model, rms_echo_and_model_batch,
+                               get_range_at_bins, get_retracker_class)
+if CYTFMRA_OK:
+    from pysiral.bnfunc.cytfmra import cytfmra_retrack
+
+
+def get_synthetic_waveforms(n_records, n_range_bins=128, seed=1):
+    """ Returns range, power and radar mode of synthetic echo waveforms """
+    random = np.random.RandomState(seed)
+    bins = np.arange(n_range_bins)
+    range_offset = 720000. + random.uniform(-2000., 2000., n_records)
+    rng = range_offset[:, np.newaxis] + bins[np.newaxis, :]*0.2342
+    delay = bins[np.newaxis, :] - random.uniform(30, 90, n_records)[:, None]
+    width = random.uniform(0.5, 5.0, n_records)[:, np.newaxis]
+    peak_power = random.uniform(1e-13, 1e-11, n_records)[:, np.newaxis]
+    wfm = peak_power * np.exp(-0.5*(delay/width)**2)
+    wfm += peak_power * 0.5 * (delay > 0) * np.exp(-np.abs(delay)/20.)
+    # Add an early secondary peak to some of the waveforms
+    early_peak = random.uniform(0, 1, n_records) < 0.3
+    wfm[early_peak] += 0.5 * peak_power[early_peak] * np.exp(
+        -0.5*(delay[early_peak]+8.)**2)
+    wfm += peak_power * 0.02 * random.uniform(0, 1, wfm.shape)
+    radar_mode = random.randint(0, 3, n_records).astype(np.int8)
+    return rng.astype(np.float32), wfm.astype(np.float32), radar_mode
+
+
+class TestTFMRABatchRetracker(unittest.TestCase):
+
+    def setUp(self):
+        self.n_records = 500
+        self.rng, self.wfm, self.radar_mode = get_synthetic_waveforms(
+            self.n_records)
+
+    def testBatchEqualsSingleWaveformTFMRA(self):
+        retracker = TFMRA()
+        retracker.set_default_options()
+        threshold = np.full(self.n_records, 0.5)
+        single = retracker._retrack_waveforms(
+            self.rng, self.wfm, self.radar_mode, threshold)
+        batch = tfmra_batch_retrack(
+            self.rng, self.wfm, self.radar_mode, threshold,
+            retracker._options, chunk_size=77)
+        self.assertRetrackerResultsEqual(single, batch)
+
+    def testBatchEqualsSingleWaveformSICCI2TFMRA(self):
+        retracker = SICCI2TfmraEnvisat()
+        retracker.set_default_options()
+        threshold = np.linspace(0.3, 0.8, self.n_records)
+        single = retracker._retrack_waveforms(
+            self.rng, self.wfm, self.radar_mode, threshold)
+        batch = tfmra_batch_retrack(
+            self.rng, self.wfm, self.radar_mode, threshold,
+            retracker._options, last_crossing=True)
+        self.assertRetrackerResultsEqual(single, batch)
+
+    @unittest.skipUnless(CYTFMRA_OK, "pysiral.bnfunc.cytfmra not compiled")
+    def testBatchEqualsSingleWaveformcTFMRA(self):
+        retracker = cTFMRA()
+        retracker.set_default_options()
+        batch = tfmra_batch_retrack(
+            self.rng, self.wfm, self.radar_mode, 0.5, retracker._options)
+        for i in np.arange(self.n_records):
+            filt_rng, filt_wfm, fmi, norm = retracker.get_filtered_wfm(
+                self.rng[i, :], self.wfm[i, :], self.radar_mode[i])
+            if fmi == -1:
+                continue
+            tfmra_range, tfmra_power = retracker.get_threshold_range(
+                filt_rng, filt_wfm, fmi, 0.5)
+            self.assertAlmostEqual(tfmra_range, batch[0][i], delta=1e-6)
+
+    @unittest.skipUnless(CYTFMRA_OK, "pysiral.bnfunc.cytfmra not compiled")
+    def testCompiledKernelEqualsBatch(self):
+        retracker = SICCI2TfmraEnvisat()
+        retracker.set_default_options()
+        opt = retracker._options
+        threshold = np.linspace(0.3, 0.8, self.n_records)
+        for last_crossing in [False, True]:
+            batch = tfmra_batch_retrack(
+                self.rng, self.wfm, self.radar_mode, threshold, opt,
+                last_crossing=last_crossing)
+            kernel = cytfmra_retrack(
+                self.rng.astype(np.float64), self.wfm.astype(np.float64),
+                self.radar_mode, threshold, opt.wfm_oversampling_factor,
+                np.array(opt.wfm_smoothing_window_size, dtype=np.int32),
+                np.array(opt.first_maximum_normalized_threshold),
+                last_crossing=last_crossing)
+            np.testing.assert_array_equal(np.isnan(batch[0]),
+                                          np.isnan(kernel[0]))
+            is_valid = np.isfinite(batch[0])
+            np.testing.assert_allclose(batch[0][is_valid],
+                                       kernel[0][is_valid], rtol=0, atol=1e-6)
+            np.testing.assert_allclose(batch[1][is_valid],
+                                       kernel[1][is_valid], rtol=1e-6)
+
+    def assertRetrackerResultsEqual(self, single, batch):
+        for single_values, batch_values in zip(single, batch):
+            np.testing.assert_array_equal(
+                np.isnan(single_values), np.isnan(batch_values))
+            is_valid = np.isfinite(single_values)
+            np.testing.assert_allclose(single_values[is_valid],
+                                       batch_values[is_valid],
+                                       rtol=1e-9, atol=0.0)
+
+
+class TestSICCILeadBatchFit(unittest.TestCase):
+
+    def setUp(self):
+        self.n_records = 100
+        random = np.random.RandomState(3)
+        self.time = np.arange(128).astype(float)
+        self.p_true = np.column_stack([
+            random.uniform(25, 40, self.n_records),
+            random.uniform(0.5, 5, self.n_records),
+            random.uniform(0.5, 3, self.n_records),
+            random.uniform(1, 100, self.n_records)])
+        wfm = self.get_model(self.p_true)
+        self.wfm = wfm * (1. + 0.05*random.randn(*wfm.shape))
+        self.p0 = np.tile([30., 5., 5., 1.], (self.n_records, 1))
+        self.p0[:, 3] = np.max(self.wfm, axis=1)
+
+    def get_model(self, p):
+        return P_lead(self.time[np.newaxis, :], p[:, 0:1], p[:, 1:2],
+                      p[:, 2:3], p[:, 3:4])
+
+    def testJacobian(self):
+        p = self.p_true[:10]
+        model, jacobian = P_lead_and_jacobian(
+            self.time[np.newaxis, :], p[:, 0:1], p[:, 1:2], p[:, 2:3],
+            p[:, 3:4])
+        np.testing.assert_allclose(model, self.get_model(p), atol=1e-12)
+        for i in np.arange(4):
+            delta = np.zeros(4)
+            delta[i] = 1.0e-6
+            numerical = (self.get_model(p+delta) -
+                         self.get_model(p-delta)) / 2.0e-6
+            np.testing.assert_allclose(
+                jacobian[:, i, :], numerical, rtol=0,
+                atol=1.0e-6*np.max(np.abs(numerical)))
+
+    def testBatchFitEqualsMinpack(self):
+        from scipy.optimize import leastsq
+        maxfev = 1000
+        popt, converged = sicci_lead_batch_fit(
+            self.time, self.wfm, self.p0, maxfev)
+        self.assertGreater(np.sum(converged), 0.9*self.n_records)
+        for i in np.arange(self.n_records):
+            # Reference: MINPACK lmder with the same Jacobian
+            residual = lambda p: P_lead(self.time, *p) - self.wfm[i]
+            jacobian = lambda p: P_lead_and_jacobian(
+                self.time[np.newaxis, :], *p[:, np.newaxis, np.newaxis])[1][0]
+            reference, cov, infodict, msg, ier = leastsq(
+                residual, self.p0[i], Dfun=jacobian, col_deriv=True,
+                maxfev=maxfev, full_output=True)
+            # The batch fit counts Jacobians as n_params evaluations
+            n_evaluations = infodict["nfev"] + 4*infodict["njev"]
+            if ier in [1, 2, 3, 4] and n_evaluations < maxfev:
+                self.assertTrue(converged[i])
+            if converged[i]:
+                self.assertTrue(ier in [1, 2, 3, 4])
+                cost = np.sum(residual(popt[i])**2)
+                reference_cost = np.sum(residual(reference)**2)
+                self.assertAlmostEqual(cost/reference_cost, 1.0, places=8)
+
+    def testDerivedParameterEqualsSingleWaveform(self):
+        random = np.random.RandomState(4)
+        rng = 720000. + np.arange(128)[np.newaxis, :]*0.2342 + \
+            random.uniform(-100, 100, (self.n_records, 1))
+        wfm = self.wfm.astype(np.float32)
+        # Includes bins outside the range window
+        retracked_bin = np.linspace(-5, 135, self.n_records)
+        retracked_bin = retracked_bin.astype(np.float32)
+        k, sigma, alpha = [x.astype(np.float32) for x in self.p_true.T[1:]]
+        tail = power_in_echo_tail_batch(wfm, retracked_bin, alpha)
+        rms = rms_echo_and_model_batch(wfm, retracked_bin, k, sigma, alpha)
+        rng_at_bins = get_range_at_bins(rng, retracked_bin)
+        for i in np.arange(self.n_records):
+            self.assertAlmostEqual(
+                tail[i], power_in_echo_tail(wfm[i], retracked_bin[i],
+                                            alpha[i]), places=4)
+            self.assertAlmostEqual(
+                rms[i], rms_echo_and_model(wfm[i], retracked_bin[i], k[i],
+                                           sigma[i], alpha[i]), places=6)
+            if 0 <= retracked_bin[i] <= 127:
+                reference = np.interp(retracked_bin[i], np.arange(128),
+                                      rng[i])
+                self.assertAlmostEqual(rng_at_bins[i], reference, places=6)
+            else:
+                self.assertTrue(np.isnan(rng_at_bins[i]))
+
+
+class TestGetRetrackerClass(unittest.TestCase):
+
+    def testcTFMRAFallback(self):
+        cytfmra_ok = pysiral.retracker.CYTFMRA_OK
+        pysiral.retracker.CYTFMRA_OK = False
+        try:
+            with logbook.TestHandler() as handler:
+                retracker = get_retracker_class("cTFMRA")
+        finally:
+            pysiral.retracker.CYTFMRA_OK = cytfmra_ok
+        self.assertIsInstance(retracker, TFMRA)
+        self.assertTrue(handler.has_warnings)
+        self.assertTrue("using TFMRA" in handler.formatted_records[0])
+
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(
+        TestTFMRABatchRetracker)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+
+from pysiral.rolling import (rolling_nanmean, rolling_nanstd,
+                             rolling_nanmean_above)
+from pysiral.surface_type import ICESatKhvorostovskyTPEnhanced
+
+
+def get_synthetic_track(n_records, seed=7):
+    """ Elevation and reflectivity with lead-like dips and data gaps """
+    random = np.random.RandomState(seed)
+    elevation = np.cumsum(random.randn(n_records))*0.01 + 20.0
+    reflectivity = random.uniform(0.4, 0.9, n_records)
+    leads = random.uniform(size=n_records) < 0.05
+    elevation[leads] -= random.uniform(0.2, 0.5, np.sum(leads))
+    reflectivity[leads] -= 0.3
+    reflectivity[random.uniform(size=n_records) < 0.01] = 1.5
+    gaps = random.uniform(size=n_records) < 0.2
+    gaps[500:800] = True
+    elevation[gaps] = np.nan
+    reflectivity[gaps] = np.nan
+    return elevation, reflectivity
+
+
+def get_window(n, i, window_size):
+    pad = int((window_size-1)/2)
+    return slice(max(i-pad, 0), min(i+pad+1, n))
+
+
+class TestRollingStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.elevation, self.reflectivity = get_synthetic_track(3000)
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def testEqualsLoop(self):
+        x, n = self.elevation, len(self.elevation)
+        threshold = np.linspace(19.5, 20.5, n)
+        for window_size in [1, 4, 25, 147, 5001]:
+            windows = [x[get_window(n, i, window_size)] for i in range(n)]
+            np.testing.assert_allclose(
+                rolling_nanmean(x, window_size),
+                [np.nanmean(w) for w in windows], rtol=1e-12)
+            np.testing.assert_allclose(
+                rolling_nanstd(x, window_size),
+                [np.nanstd(w) for w in windows], rtol=1e-10, atol=1e-12)
+            np.testing.assert_allclose(
+                rolling_nanmean_above(x, window_size, threshold,
+                                      chunk_size=1000),
+                [np.nanmean(w[w > t]) for w, t in zip(windows, threshold)],
+                rtol=1e-12)
+
+    def testKhvorostovskyParameterEqualsLoop(self):
+        classifier = ICESatKhvorostovskyTPEnhanced()
+        window_size, sdev_factor = 25, 1.5
+        elevation, reflectivity = self.elevation, self.reflectivity.copy()
+        hr, hr_mean, hr_sigma, index_list = \
+            classifier.get_elevation_parameters(elevation, window_size)
+        delta_r = classifier.get_delta_r(
+            reflectivity, window_size, sdev_factor, index_list)
+
+        # Reference: per-record loop
+        n = len(elevation)
+        hr_ref = np.full(n, np.nan)
+        for i in index_list:
+            hr_ref[i] = elevation[i] - np.nanmean(
+                elevation[get_window(n, i, window_size)])
+        np.testing.assert_allclose(hr, hr_ref, rtol=1e-10, atol=1e-12)
+        hr_mean_ref, hr_sigma_ref, delta_r_ref = np.full((3, n), np.nan)
+        for i in index_list:
+            hr_subset = hr_ref[get_window(n, i, window_size)]
+            hr_mean_ref[i] = np.nanmean(hr_subset)
+            hr_sigma_ref[i] = np.nanstd(hr_subset)
+            subset = reflectivity[get_window(n, i, window_size)]
+            threshold = np.nanmean(subset) - sdev_factor*np.nanstd(subset)
+            delta_r_ref[i] = np.nanmean(subset[subset > threshold]) - \
+                reflectivity[i]
+        np.testing.assert_allclose(hr_mean, hr_mean_ref, atol=1e-10)
+        np.testing.assert_allclose(hr_sigma, hr_sigma_ref, atol=1e-10)
+        np.testing.assert_allclose(delta_r, delta_r_ref, atol=1e-10)
+
+    def testInfiniteValues(self):
+        x, n = self.elevation.copy(), len(self.elevation)
+        x[[100, 110, 2000]] = np.inf
+        x[[105, 2500]] = -np.inf
+        threshold = np.full(n, 20.0)
+        window_size = 25
+        windows = [x[get_window(n, i, window_size)] for i in range(n)]
+        for result, reference in [
+                (rolling_nanmean(x, window_size),
+                 [np.nanmean(w) for w in windows]),
+                (rolling_nanstd(x, window_size),
+                 [np.nanstd(w) for w in windows]),
+                (rolling_nanmean_above(x, window_size, threshold),
+                 [np.nanmean(w[w > 20.0]) for w in windows])]:
+            reference = np.array(reference)
+            np.testing.assert_array_equal(np.isnan(result),
+                                          np.isnan(reference))
+            np.testing.assert_array_equal(np.isinf(result),
+                                          np.isinf(reference))
+            np.testing.assert_allclose(result, reference, rtol=1e-10,
+                                       atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+@author: Stefan
+"""
+
+import unittest
+
+import numpy as np
+
+from pysiral.waveform import SARSigma0, get_sar_sigma0, sar_sigma0
+
+
+def get_sar_sigma0_input(n_records, seed=5):
+    random = np.random.RandomState(seed)
+    peak_power = 10.**random.uniform(-14, -9, n_records)
+    tx_power = random.uniform(20, 30, n_records)
+    altitude = random.uniform(7.0e5, 7.5e5, n_records)
+    velocity = random.uniform(7400, 7600, n_records)
+    return peak_power, tx_power, altitude, velocity
+
+
+def get_sar_sigma0_loop(peak_power, tx_power, altitude, velocity, **par):
+    return np.array([sar_sigma0(*args, **par) for args in zip(
+        peak_power, tx_power, altitude, velocity)])
+
+
+class TestSARSigma0(unittest.TestCase):
+
+    def setUp(self):
+        self.args = get_sar_sigma0_input(1000)
+
+    def testEqualsScalarFormula(self):
+        for parameter in [{}, {"wf": 1.486, "bias_sigma0": -2.0,
+                               "wf_thermal_noise_watt": 1.0e-14}]:
+            reference = get_sar_sigma0_loop(*self.args, **parameter)
+            sigma0 = get_sar_sigma0(*self.args, **parameter)
+            np.testing.assert_allclose(sigma0, reference, rtol=1e-13)
+
+    def testBroadcastingAndDtype(self):
+        peak_power, tx_power, altitude, velocity = self.args
+        sigma0 = SARSigma0().get(peak_power, 25.0, altitude, 7500.,
+                                 dtype=np.float32)
+        self.assertEqual(sigma0.dtype, np.float32)
+        reference = get_sar_sigma0_loop(
+            peak_power, np.full(1000, 25.0), altitude, np.full(1000, 7500.))
+        np.testing.assert_allclose(sigma0, reference, rtol=1e-6)
+        self.assertRaises(TypeError, SARSigma0, invalid_parameter=1.0)
+
+    def testDefaultParameter(self):
+        parameter = SARSigma0(wf=1.486).parameter
+        self.assertEqual(len(parameter), 11)
+        self.assertEqual(parameter["wf"], 1.486)
+        self.assertEqual(parameter["ptr_width"], 2.819e-09)
+
+
+if __name__ == '__main__':
+    unittest.main()